@@ -1,12 +1,71 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import Socio, Movimiento, Cargo, Directiva, Prestamo, PagoPrestamo, Configuracion, GastosAdministrativos
+from .models import Socio, Movimiento, SaldoSocio, Cargo, Directiva, Prestamo, PagoPrestamo, Configuracion, GastosAdministrativos, ResumenMensual, SecuenciaLibro, Tarea, CorteCartera, CarteraPrestamo, Perfil
+from .perfilado import reporte
 
 admin.site.register(Socio),
 admin.site.register(Movimiento),
+admin.site.register(SaldoSocio),
 admin.site.register(Cargo),
 admin.site.register(Directiva),
 admin.site.register(Prestamo),
 admin.site.register(PagoPrestamo),
 admin.site.register(Configuracion),
-admin.site.register(GastosAdministrativos)
\ No newline at end of file
+admin.site.register(GastosAdministrativos),
+admin.site.register(ResumenMensual),
+admin.site.register(SecuenciaLibro),
+admin.site.register(Tarea),
+admin.site.register(CorteCartera),
+admin.site.register(CarteraPrestamo)
+
+
+@admin.register(Perfil)
+class PerfilAdmin(admin.ModelAdmin):
+    """Perfiles guardados por perfilado.py: funciones más costosas, memoria y descarga del .prof."""
+    list_display = ('creado', 'nombre', 'origen', 'motivo', 'duracion_ms', 'memoria_pico_kb', 'usuario')
+    list_filter = ('origen', 'motivo', 'nombre')
+    search_fields = ('nombre', 'ruta')
+    fields = ('nombre', 'origen', 'motivo', 'ruta', 'usuario', 'creado', 'duracion_ms', 'memoria_pico_kb',
+              'descarga', 'por_tiempo_acumulado', 'por_tiempo_propio', 'memoria')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/descargar/', self.admin_site.admin_view(self.descargar),
+                 name='app_cajaAhorros_perfil_descargar'),
+        ] + super().get_urls()
+
+    def descargar(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        perfil = get_object_or_404(Perfil, pk=pk)
+        return FileResponse(perfil.archivo.open('rb'), as_attachment=True,
+                            filename=perfil.archivo.name.rsplit('/', 1)[-1])
+
+    @admin.display(description='Archivo')
+    def descarga(self, obj):
+        return format_html('<a href="{}">Descargar .prof</a> (se abre con pstats o snakeviz)',
+                           reverse('admin:app_cajaAhorros_perfil_descargar', args=[obj.pk]))
+
+    @admin.display(description='Por tiempo acumulado')
+    def por_tiempo_acumulado(self, obj):
+        return format_html('<pre>{}</pre>', reporte(obj, 'cumulative'))
+
+    @admin.display(description='Por tiempo propio')
+    def por_tiempo_propio(self, obj):
+        return format_html('<pre>{}</pre>', reporte(obj, 'tottime'))
+
+    @admin.display(description='Memoria que quedó asignada')
+    def memoria(self, obj):
+        return format_html('<pre>{}</pre>', obj.memoria_detalle)
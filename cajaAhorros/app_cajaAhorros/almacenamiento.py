@@ -0,0 +1,29 @@
+# app_cajaAhorros/almacenamiento.py
+
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class AlmacenPrivado(FileSystemStorage):
+    """
+    Archivos que no se publican: resultados de tareas, reportes en caché y perfiles.
+    Viven en settings.ARCHIVOS_PRIVADOS, fuera de MEDIA_ROOT, y no tienen URL: solo se
+    descargan por las vistas que revisan permisos (descargar_tarea, la caché de reportes
+    y el admin de perfiles). La carpeta se lee en cada uso, así las pruebas pueden cambiarla.
+    """
+
+    @property
+    def base_location(self):
+        return settings.ARCHIVOS_PRIVADOS
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError('Los archivos privados no tienen URL pública.')
+
+
+almacen_privado = AlmacenPrivado()
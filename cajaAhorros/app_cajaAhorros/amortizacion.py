@@ -0,0 +1,129 @@
+# app_cajaAhorros/amortizacion.py
+
+from collections import namedtuple
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone
+
+from .cartera import programar_corte
+from .models import PagoPrestamo, Prestamo
+from .versiones import marcar_cambio
+
+CENTAVO = Decimal('0.01')
+
+# Datos mínimos para calcular la tabla de un préstamo (método francés).
+# Si `cuota` es None se calcula a partir del monto, el interés anual y el plazo.
+DatosPrestamo = namedtuple('DatosPrestamo', ['monto', 'interes_anual', 'plazo', 'cuota', 'fecha_inicio'])
+
+COLUMNAS = ['cuota_pago', 'saldo_pago', 'capital_pago', 'interes_pago', 'plazo_pago', 'valor_cuota_pago', 'fecha_a_pagar']
+
+
+def _centavos(valor):
+    return valor.quantize(CENTAVO)
+
+
+def tasa_mensual(interes_anual):
+    return (Decimal(interes_anual) / 100) / 12
+
+
+def calcular_cuota(monto, interes_anual, plazo):
+    """Cuota fija del método francés, sin redondear."""
+    monto = Decimal(monto)
+    tasa = tasa_mensual(interes_anual)
+    if tasa == 0:
+        return monto / plazo
+    factor = (1 + tasa) ** plazo
+    return monto * (tasa * factor) / (factor - 1)
+
+
+def calcular_tablas(prestamos):
+    """
+    Calcula las tablas de amortización de varios préstamos a la vez.
+    Avanza cuota por cuota sobre todos los préstamos y devuelve, por préstamo,
+    un diccionario de columnas (listas) listo para escribirse en lote.
+    Los montos se redondean al centavo igual que el cálculo fila por fila original.
+    """
+    prestamos = list(prestamos)
+    tasas = [tasa_mensual(p.interes_anual) for p in prestamos]
+    cuotas = [
+        Decimal(p.cuota) if p.cuota else calcular_cuota(p.monto, p.interes_anual, p.plazo)
+        for p in prestamos
+    ]
+    saldos = [Decimal(p.monto) for p in prestamos]
+    tablas = [dict((columna, []) for columna in COLUMNAS) for _ in prestamos]
+
+    for i in range(max((p.plazo for p in prestamos), default=0)):
+        for k, p in enumerate(prestamos):
+            if i >= p.plazo:
+                continue
+            saldo, cuota = saldos[k], cuotas[k]
+
+            if i == p.plazo - 1:
+                # Última cuota ajustada: se cancela todo el saldo pendiente
+                capital = saldo
+                interes = _centavos(max(Decimal('0'), cuota - capital))
+            else:
+                interes_exacto = saldo * tasas[k]
+                interes = _centavos(interes_exacto)
+                capital = _centavos(cuota - interes_exacto)
+
+            tabla = tablas[k]
+            tabla['cuota_pago'].append(i + 1)
+            tabla['saldo_pago'].append(_centavos(saldo))
+            tabla['capital_pago'].append(capital)
+            tabla['interes_pago'].append(interes)
+            tabla['plazo_pago'].append(p.plazo - i)
+            tabla['valor_cuota_pago'].append(_centavos(capital + interes))
+            tabla['fecha_a_pagar'].append(p.fecha_inicio + relativedelta(months=i))
+
+            saldos[k] = _centavos(saldo - capital)
+
+    for tabla, cuota in zip(tablas, cuotas):
+        tabla['cuota'] = _centavos(cuota)
+    return tablas
+
+
+def datos_de_prestamo(prestamo):
+    return DatosPrestamo(
+        monto=prestamo.cantidad_aprobada,
+        interes_anual=prestamo.interes,
+        plazo=prestamo.plazo,
+        cuota=prestamo.cuota,
+        fecha_inicio=prestamo.fecha_aprobacion or timezone.now().date(),
+    )
+
+
+def construir_pagos(prestamo, tabla):
+    """Convierte una tabla calculada en instancias de PagoPrestamo sin guardar."""
+    return [
+        PagoPrestamo(
+            prestamo=prestamo,
+            estado=False,
+            **dict((columna, tabla[columna][i]) for columna in COLUMNAS)
+        )
+        for i in range(len(tabla['cuota_pago']))
+    ]
+
+
+def generar_amortizacion(prestamo):
+    """
+    Genera y guarda la tabla de amortización de un préstamo aprobado.
+    Escribe la cuota y todas las filas con un UPDATE y un INSERT en lote.
+    """
+    if prestamo.estado != 'Aprobado' or prestamo.pagos.exists():
+        return []
+
+    tabla = calcular_tablas([datos_de_prestamo(prestamo)])[0]
+    pagos = construir_pagos(prestamo, tabla)
+    with transaction.atomic():
+        if not prestamo.cuota:
+            prestamo.cuota = tabla['cuota']
+            Prestamo.objects.filter(pk=prestamo.pk).update(cuota=prestamo.cuota)
+        PagoPrestamo.objects.bulk_create(pagos, batch_size=500)
+        marcar_cambio('prestamos', prestamo.pk)
+        marcar_cambio('pagos', prestamo.pk)
+        # Un préstamo con fecha pasada puede tener cuotas ya vencidas
+        programar_corte()
+    return pagos
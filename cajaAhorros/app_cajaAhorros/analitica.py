@@ -0,0 +1,184 @@
+# app_cajaAhorros/analitica.py
+
+import hashlib
+from collections import namedtuple
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+
+from .cartera import CAMPOS_TRAMO, TRAMOS, obtener_corte
+from .models import CorteCartera, Prestamo, ResumenMensual, Socio
+from .versiones import clave_datos, obtener_versiones
+
+# Versión del formato de las respuestas: va en la URL (api/v1/...) y en el ETag.
+# Se incrementa si cambia la forma de algún JSON, para no mezclarlo con lo que tenga el navegador.
+VERSION_API = 'v1'
+
+# Las respuestas se guardan por versión de datos, así que nunca quedan viejas; el tiempo solo
+# libera la memoria de las versiones que ya nadie pide.
+DURACION_CACHE = 60 * 60 * 24
+
+# funcion(desde, hasta) -> dict; tablas de las que depende (ver versiones.marcar_cambio);
+# diaria: cambia también con la fecha aunque no cambien los datos
+Serie = namedtuple('Serie', ['funcion', 'dependencias', 'diaria'])
+
+SERIES = {}
+
+
+def registrar_serie(nombre, dependencias, diaria=False):
+    def registrar(funcion):
+        SERIES[nombre] = Serie(funcion, dependencias, diaria)
+        return funcion
+    return registrar
+
+
+def rango_de_fechas(parametros):
+    """Lee `desde` y `hasta` (AAAA-MM-DD, opcionales) de la URL. ValueError si no son válidas."""
+    fechas = []
+    for nombre in ('desde', 'hasta'):
+        valor = parametros.get(nombre)
+        try:
+            fechas.append(date.fromisoformat(valor) if valor else None)
+        except ValueError:
+            raise ValueError(f"'{nombre}' debe ser una fecha AAAA-MM-DD") from None
+    desde, hasta = fechas
+    if desde and hasta and desde > hasta:
+        raise ValueError("'desde' es posterior a 'hasta'")
+    return desde, hasta
+
+
+def version_serie(nombre, desde=None, hasta=None, hoy=None):
+    """
+    Huella de la respuesta de una serie: las marcas de versión de sus tablas y el rango pedido.
+    Solo lee la caché compartida, sin consultar la base de datos; sirve de ETag.
+    """
+    serie = SERIES[nombre]
+    partes = [VERSION_API, nombre, str(desde or ''), str(hasta or '')]
+    partes += obtener_versiones(*(clave_datos(tabla) for tabla in serie.dependencias))
+    if serie.diaria:
+        partes.append((hoy or date.today()).isoformat())
+    return hashlib.sha1(':'.join(partes).encode()).hexdigest()[:32]
+
+
+def datos_serie(nombre, desde=None, hasta=None, version=None):
+    """Datos de la serie, de la caché si ya se calcularon para esta versión."""
+    version = version or version_serie(nombre, desde, hasta)
+    clave = f'analitica:{version}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = SERIES[nombre].funcion(desde, hasta)
+        datos.update(serie=nombre, version=VERSION_API, desde=desde, hasta=hasta)
+        cache.set(clave, datos, DURACION_CACHE)
+    return datos
+
+
+def respuesta_serie(request, nombre, desde=None, hasta=None):
+    """
+    JSON de la serie con ETag. Si el navegador ya tiene esta versión responde 304 sin
+    consultar la base de datos; el navegador la guarda pero vuelve a preguntar cada vez.
+    """
+    version = version_serie(nombre, desde, hasta)
+    etag = f'"{version}"'
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = JsonResponse(datos_serie(nombre, desde, hasta, version))
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def _en_rango(campo, desde, hasta):
+    filtro = {}
+    if desde:
+        filtro[f'{campo}__gte'] = desde
+    if hasta:
+        filtro[f'{campo}__lte'] = hasta
+    return filtro
+
+
+def _numero(valor):
+    return float(valor or 0)
+
+
+# --- Series ---
+
+@registrar_serie('flujo_caja', ['movimientos', 'prestamos', 'pagos'])
+def flujo_caja(desde, hasta):
+    """Aportes, retiros, préstamos entregados y cuotas cobradas por mes, del resumen mensual."""
+    if desde:
+        desde = desde.replace(day=1)
+    meses = [
+        {
+            'mes': fila.mes.strftime('%Y-%m'),
+            'entradas': _numero(fila.entradas),
+            'salidas': _numero(fila.salidas),
+            'neto': _numero(fila.entradas - fila.salidas),
+            'prestado': _numero(fila.monto_aprobado),
+            'cobrado': _numero(fila.monto_cobrado),
+        }
+        for fila in ResumenMensual.objects.filter(**_en_rango('mes', desde, hasta)).order_by('mes')
+    ]
+    entradas = round(sum(mes['entradas'] for mes in meses), 2)
+    salidas = round(sum(mes['salidas'] for mes in meses), 2)
+    return {'meses': meses, 'totales': {'entradas': entradas, 'salidas': salidas,
+                                        'saldo': round(entradas - salidas, 2)}}
+
+
+@registrar_serie('prestamos_por_estado', ['prestamos'])
+def prestamos_por_estado(desde, hasta):
+    """Cantidad y montos de los préstamos solicitados en el rango, por estado."""
+    estados = (
+        Prestamo.objects.filter(**_en_rango('fecha_prestamo', desde, hasta))
+        .values('estado')
+        .annotate(cantidad=Count('id'), solicitado=Sum('cantidad_solicitada'), aprobado=Sum('cantidad_aprobada'))
+        .order_by('estado')
+    )
+    return {'estados': [
+        {'estado': fila['estado'], 'cantidad': fila['cantidad'],
+         'solicitado': _numero(fila['solicitado']), 'aprobado': _numero(fila['aprobado'])}
+        for fila in estados
+    ]}
+
+
+@registrar_serie('cartera', ['cartera'])
+def cartera(desde, hasta):
+    """Cartera vencida del último corte por tramos de atraso y los totales de los cortes del rango."""
+    corte = obtener_corte() or CorteCartera()
+    historial = CorteCartera.objects.filter(**_en_rango('fecha', desde, hasta)).order_by('fecha')
+    return {
+        'fecha': corte.fecha,
+        'tramos': [{'campo': campo, 'etiqueta': etiqueta, 'monto': _numero(getattr(corte, campo))}
+                   for campo, etiqueta, _, _ in TRAMOS],
+        'total_vencido': _numero(corte.total_vencido),
+        'prestamos_vencidos': corte.prestamos_vencidos,
+        'cuotas_vencidas': corte.cuotas_vencidas,
+        'historial': [
+            dict({'fecha': anterior.fecha, 'total_vencido': _numero(anterior.total_vencido)},
+                 **dict((campo, _numero(getattr(anterior, campo))) for campo in CAMPOS_TRAMO))
+            for anterior in historial
+        ],
+    }
+
+
+@registrar_serie('socios', ['socios'])
+def socios(desde, hasta):
+    """Socios que ingresaron cada mes del rango y el total acumulado al cierre de cada mes."""
+    if desde:
+        desde = desde.replace(day=1)
+    acumulado = Socio.objects.filter(fecha_ingreso__lt=desde).count() if desde else 0
+    meses = []
+    por_mes = (
+        Socio.objects.filter(**_en_rango('fecha_ingreso', desde, hasta))
+        .annotate(mes=TruncMonth('fecha_ingreso'))
+        .values('mes')
+        .annotate(nuevos=Count('id'))
+        .order_by('mes')
+    )
+    for fila in por_mes:
+        acumulado += fila['nuevos']
+        meses.append({'mes': fila['mes'].strftime('%Y-%m'), 'nuevos': fila['nuevos'], 'total': acumulado})
+    return {'meses': meses, 'activos': Socio.objects.filter(activo=True).count()}
@@ -0,0 +1,65 @@
+# app_cajaAhorros/aportes_mensuales.py
+
+from collections import namedtuple
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from .libros import bloquear_socios, registrar_movimientos
+from .models import Movimiento, SaldoSocio, Socio
+
+# Fila de la vista previa: el socio, su saldo actual, si ya tiene un aporte en el mes y el monto propuesto
+FilaAporte = namedtuple('FilaAporte', ['socio', 'saldo', 'ya_aporto', 'monto'])
+
+
+def detalle_por_defecto(mes):
+    return f"Aporte mensual {mes:%m/%Y}"
+
+
+def _socios_con_aporte(mes, detalle=None):
+    movimientos = Movimiento.objects.filter(
+        entrada__gt=0, fecha_movimiento__gte=mes, fecha_movimiento__lt=mes + relativedelta(months=1),
+    )
+    if detalle is not None:
+        movimientos = movimientos.filter(detalle_movimiento=detalle)
+    return set(movimientos.values_list('socio_id', flat=True).distinct())
+
+
+def filas_aporte_mensual(mes, monto):
+    """
+    Socios activos para el aporte del `mes` (primer día), con su saldo y si ya aportaron ese mes.
+    Son tres consultas sin importar el número de socios.
+    """
+    socios = list(Socio.objects.filter(activo=True).only('id', 'cedula', 'nombre', 'apellido').order_by('apellido', 'nombre', 'id'))
+    saldos = dict(SaldoSocio.objects.filter(socio__activo=True).values_list('socio_id', 'saldo'))
+    con_aporte = _socios_con_aporte(mes)
+    return [
+        FilaAporte(socio, saldos.get(socio.pk, Decimal('0.00')), socio.pk in con_aporte, monto)
+        for socio in socios
+    ]
+
+
+def registrar_aportes(montos, fecha, detalle, mes):
+    """
+    Registra el aporte de cada socio de `montos` ({socio_id: monto}) en una sola transacción
+    con un INSERT en lote. Los socios que ya tienen un aporte con el mismo detalle en el mes
+    se saltan, así que volver a enviar el mismo lote no duplica nada.
+    Devuelve los movimientos creados.
+    """
+    with transaction.atomic():
+        activos = set(Socio.objects.filter(pk__in=list(montos), activo=True).values_list('pk', flat=True))
+        # Con los libros tomados, un envío repetido al mismo tiempo espera y luego ve los aportes del primero
+        bloquear_socios(activos)
+        repetidos = _socios_con_aporte(mes, detalle)
+        return registrar_movimientos(
+            Movimiento(
+                socio_id=socio_id,
+                detalle_movimiento=detalle,
+                entrada=monto,
+                salida=Decimal('0.00'),
+                fecha_movimiento=fecha,
+            )
+            for socio_id, monto in montos.items()
+            if monto > 0 and socio_id in activos and socio_id not in repetidos
+        )
@@ -0,0 +1,122 @@
+# app_cajaAhorros/busqueda.py
+
+import re
+
+from django.db import connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Socio
+
+# Tabla virtual FTS5 con los datos de búsqueda de cada socio (rowid = id del socio).
+# La crea la migración 0023 si el SQLite tiene FTS5; en otras bases se busca con LIKE.
+TABLA = 'app_cajaAhorros_socio_busqueda'
+COLUMNAS = ['cedula', 'nombre', 'apellido', 'email', 'telefono']
+
+# Socios por sentencia al indexar (límite de parámetros de SQLite)
+LOTE = 500
+
+_PALABRAS = re.compile(r'\w+')
+
+
+def palabras(texto):
+    """Palabras del texto buscado; la puntuación separa palabras (como el tokenizador de FTS5)."""
+    return _PALABRAS.findall(texto or '')
+
+
+def consulta_fts(texto):
+    """
+    Consulta MATCH de FTS5: cada palabra es un prefijo y deben aparecer todas, en cualquier
+    columna. Solo se usan letras y dígitos, así que el texto del usuario no puede inyectar
+    operadores de FTS5.
+    """
+    return ' '.join(f'"{palabra}"*' for palabra in palabras(texto))
+
+
+def _conexion(escritura=False):
+    alias = router.db_for_write(Socio) if escritura else router.db_for_read(Socio)
+    return connections[alias]
+
+
+def usa_fts(conexion=None):
+    conexion = conexion or _conexion()
+    if conexion.vendor != 'sqlite':
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA])
+        return cursor.fetchone() is not None
+
+
+def _copiar_socios(cursor, conexion, condicion='', parametros=()):
+    socio = conexion.ops.quote_name(Socio._meta.db_table)
+    valores = ', '.join(f"COALESCE({conexion.ops.quote_name(columna)}, '')" for columna in COLUMNAS)
+    cursor.execute(
+        f"INSERT INTO {TABLA} (rowid, {', '.join(COLUMNAS)}) SELECT id, {valores} FROM {socio} {condicion}",
+        parametros,
+    )
+
+
+def indexar(socio_ids):
+    """Vuelve a copiar al índice los socios indicados (los que ya no existen solo se quitan)."""
+    socio_ids = list(socio_ids)
+    conexion = _conexion(escritura=True)
+    if not socio_ids or not usa_fts(conexion):
+        return
+    with conexion.cursor() as cursor:
+        for inicio in range(0, len(socio_ids), LOTE):
+            lote = socio_ids[inicio:inicio + LOTE]
+            marcas = ', '.join(['%s'] * len(lote))
+            cursor.execute(f"DELETE FROM {TABLA} WHERE rowid IN ({marcas})", lote)
+            _copiar_socios(cursor, conexion, f"WHERE id IN ({marcas})", lote)
+
+
+def reconstruir():
+    """Vacía el índice y lo llena con todos los socios. Devuelve cuántos quedaron indexados."""
+    conexion = _conexion(escritura=True)
+    if not usa_fts(conexion):
+        return 0
+    with conexion.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA}")
+        _copiar_socios(cursor, conexion)
+        # Junta los segmentos que dejó la carga en uno solo: las consultas leen menos páginas
+        cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLA}")
+        return cursor.fetchone()[0]
+
+
+def buscar(queryset, texto):
+    """
+    Filtra `queryset` (de Socio) por el texto buscado y lo ordena por relevancia, sin
+    evaluarlo: la paginación sigue haciéndose en la base con LIMIT/OFFSET.
+    Con FTS5 la relevancia es bm25 (pesa más la cédula, luego apellido y nombre); sin FTS5
+    se busca por prefijo con LIKE y primero van las coincidencias de cédula y de apellido.
+    """
+    if not palabras(texto):
+        return queryset.none()
+    conexion = connections[queryset.db]
+    if usa_fts(conexion):
+        socio = conexion.ops.quote_name(Socio._meta.db_table)
+        return queryset.extra(
+            tables=[TABLA],
+            where=[f'{TABLA}.rowid = {socio}.id', f'{TABLA} MATCH %s'],
+            params=[consulta_fts(texto)],
+            select={'rango': f'{TABLA}.rank'},
+        ).order_by('rango', 'id')
+    return _buscar_con_like(queryset, palabras(texto))
+
+
+def _buscar_con_like(queryset, lista):
+    for palabra in lista:
+        queryset = queryset.filter(
+            Q(cedula__startswith=palabra) | Q(nombre__istartswith=palabra) | Q(apellido__istartswith=palabra)
+            # Segundo apellido o segundo nombre
+            | Q(apellido__icontains=f' {palabra}') | Q(nombre__icontains=f' {palabra}')
+            | Q(email__istartswith=palabra) | Q(telefono__startswith=palabra)
+        )
+    primera = lista[0]
+    return queryset.annotate(rango=Case(
+        When(cedula__startswith=primera, then=Value(0)),
+        When(apellido__istartswith=primera, then=Value(1)),
+        When(nombre__istartswith=primera, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )).order_by('rango', 'apellido', 'nombre', 'id')
@@ -0,0 +1,94 @@
+# app_cajaAhorros/cache_reportes.py
+
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .almacenamiento import almacen_privado
+from .reportes import REPORTES
+from .versiones import clave_datos, obtener_versiones
+
+CARPETA = 'cache_reportes'
+
+# Datos de los que depende cada reporte: (tabla, atributo del objeto del reporte que da el id).
+# Con atributo None depende de toda la tabla; con atributo, solo de ese objeto y de los
+# cambios en lote que no indican objeto (ver versiones.marcar_cambio).
+DEPENDENCIAS = {
+    'socios_pdf': [('socios', None)],
+    'socios_excel': [('socios', None)],
+    'prestamos_pdf': [('prestamos', None), ('socios', None)],
+    'prestamos_excel': [('prestamos', None), ('socios', None)],
+    'gastos_pdf': [('gastos', None)],
+    'gastos_excel': [('gastos', None)],
+    'aportaciones_pdf': [('socios', 'pk'), ('movimientos', 'pk')],
+    'amortizacion_pdf': [('prestamos', 'pk'), ('pagos', 'pk'), ('socios', 'socio_id')],
+    'amortizacion_excel': [('prestamos', 'pk'), ('pagos', 'pk'), ('socios', 'socio_id')],
+}
+
+
+def version_reporte(reporte, objeto=None):
+    """
+    Huella de los datos que usa el reporte. Solo lee las marcas de versión de la caché
+    compartida, sin consultar la base de datos; cambia en cuanto cambia alguno de esos datos.
+    """
+    claves = []
+    for tabla, atributo in DEPENDENCIAS[reporte]:
+        if atributo is None:
+            claves.append(clave_datos(tabla))
+        else:
+            claves += [clave_datos(tabla, getattr(objeto, atributo)), clave_datos(tabla, '*')]
+    huella = ':'.join((reporte,) + obtener_versiones(*claves))
+    return hashlib.sha1(huella.encode()).hexdigest()[:32]
+
+
+def _carpeta(reporte, objeto_id=None):
+    return posixpath.join(CARPETA, reporte, str(objeto_id or 'todos'))
+
+
+def ruta_en_cache(reporte, version, objeto_id=None):
+    extension = '.pdf' if reporte.endswith('_pdf') else '.xlsx'
+    return posixpath.join(_carpeta(reporte, objeto_id), version + extension)
+
+
+def guardar_en_cache(reporte, version, archivo, objeto_id=None):
+    """Guarda el reporte generado para `version` y borra las versiones anteriores del mismo reporte."""
+    ruta = ruta_en_cache(reporte, version, objeto_id)
+    if almacen_privado.exists(ruta):
+        return ruta
+    ruta = almacen_privado.save(ruta, File(archivo))
+    carpeta = _carpeta(reporte, objeto_id)
+    for nombre in almacen_privado.listdir(carpeta)[1]:
+        anterior = posixpath.join(carpeta, nombre)
+        if anterior != ruta:
+            almacen_privado.delete(anterior)
+    return ruta
+
+
+def respuesta_guardada(request, ruta, nombre, content_type, version):
+    """
+    Envía un reporte ya generado con ETag y Last-Modified. Si el navegador tiene la misma
+    versión responde 304 sin leer el archivo.
+    """
+    etag = f'"{version}"'
+    ultima_modificacion = int(almacen_privado.get_modified_time(ruta).timestamp())
+    respuesta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if respuesta is None:
+        respuesta = FileResponse(almacen_privado.open(ruta, 'rb'), as_attachment=True,
+                                 filename=nombre, content_type=content_type)
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(ultima_modificacion)
+    # El navegador puede guardarlo, pero debe volver a preguntar si sigue vigente
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def respuesta_en_cache(request, reporte, nombre, version, objeto_id=None):
+    """Devuelve la respuesta del reporte si ya está generado para `version`, o None."""
+    ruta = ruta_en_cache(reporte, version, objeto_id)
+    if not almacen_privado.exists(ruta):
+        return None
+    return respuesta_guardada(request, ruta, nombre, REPORTES[reporte][1], version)
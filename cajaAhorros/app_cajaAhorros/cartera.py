@@ -0,0 +1,161 @@
+# app_cajaAhorros/cartera.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from .models import CarteraPrestamo, CorteCartera, PagoPrestamo, Tarea
+from .tareas import encolar
+from .versiones import clave_datos, marcar_cambio, obtener_version
+
+# Tramos de días de atraso: (campo, etiqueta, días desde, días hasta o None)
+TRAMOS = [
+    ('monto_1_30', 'De 1 a 30 días', 1, 30),
+    ('monto_31_60', 'De 31 a 60 días', 31, 60),
+    ('monto_61_90', 'De 61 a 90 días', 61, 90),
+    ('monto_mas_90', 'Más de 90 días', 91, None),
+]
+CAMPOS_TRAMO = [campo for campo, _, _, _ in TRAMOS]
+CENTAVO = Decimal('0.01')
+
+
+def _en_tramo(hoy, desde, hasta):
+    # Los días de atraso son hoy - fecha_a_pagar: cada tramo es un rango de fechas de pago
+    condicion = Q(fecha_a_pagar__lte=hoy - timedelta(days=desde))
+    if hasta is not None:
+        condicion &= Q(fecha_a_pagar__gte=hoy - timedelta(days=hasta))
+    return condicion
+
+
+def consulta_cartera(hoy):
+    """
+    Lo vencido de cada préstamo al día `hoy`, por tramo, en una sola consulta agrupada.
+    Solo lee las cuotas pendientes con fecha de pago anterior a hoy (índice parcial de cuotas
+    pendientes por fecha); las cuotas que aún no vencen no entran en la cartera vencida.
+    """
+    sumas = dict(
+        (campo, Sum('valor_cuota_pago', filter=_en_tramo(hoy, desde, hasta)))
+        for campo, _, desde, hasta in TRAMOS
+    )
+    return (
+        PagoPrestamo.objects.filter(estado=False, fecha_a_pagar__lt=hoy)
+        .values('prestamo_id')
+        .annotate(socio_id=F('prestamo__socio_id'), cuotas=Count('id'), mas_antigua=Min('fecha_a_pagar'), **sumas)
+        .order_by()
+    )
+
+
+def calcular_cartera(hoy):
+    """Resultado de consulta_cartera como instancias de CarteraPrestamo sin guardar."""
+    return [
+        CarteraPrestamo(
+            prestamo_id=fila['prestamo_id'],
+            socio_id=fila['socio_id'],
+            cuotas_vencidas=fila['cuotas'],
+            dias_atraso=(hoy - fila['mas_antigua']).days,
+            **dict((campo, (fila[campo] or Decimal('0')).quantize(CENTAVO)) for campo in CAMPOS_TRAMO)
+        )
+        for fila in consulta_cartera(hoy)
+    ]
+
+
+def generar_corte(hoy=None, version=''):
+    """
+    Calcula y guarda el corte de cartera del día con su detalle por préstamo.
+    Solo se conserva el detalle del último corte; de los días anteriores quedan los totales.
+    Un corte de una fecha pasada (con cortes más recientes ya guardados) se guarda sin detalle
+    y no toca el de los demás.
+    """
+    hoy = hoy or date.today()
+    detalle = calcular_cartera(hoy)
+    totales = dict(
+        (campo, sum((getattr(fila, campo) for fila in detalle), Decimal('0.00'))) for campo in CAMPOS_TRAMO
+    )
+    try:
+        with transaction.atomic():
+            corte, _ = CorteCartera.objects.update_or_create(fecha=hoy, defaults=dict(
+                version=version,
+                cuotas_vencidas=sum(fila.cuotas_vencidas for fila in detalle),
+                prestamos_vencidos=len(detalle),
+                **totales
+            ))
+            if CorteCartera.objects.filter(fecha__gt=hoy).exists():
+                CarteraPrestamo.objects.filter(corte=corte).delete()
+            else:
+                CarteraPrestamo.objects.filter(Q(corte=corte) | Q(corte__fecha__lt=hoy)).delete()
+                for fila in detalle:
+                    fila.corte = corte
+                CarteraPrestamo.objects.bulk_create(detalle, batch_size=500)
+            marcar_cambio('cartera')
+    except IntegrityError:
+        # Otro proceso guardó el corte del día al mismo tiempo
+        corte = CorteCartera.objects.get(fecha=hoy)
+    return corte
+
+
+def actualizar_corte():
+    """Recalcula el corte de hoy con la versión actual de los pagos (tarea 'corte_cartera')."""
+    return generar_corte(date.today(), obtener_version(clave_datos('pagos')))
+
+
+def programar_corte():
+    """
+    Encola el recálculo del corte de hoy después de un cambio en los pagos, salvo que ya
+    haya uno pendiente: varios pagos seguidos se recalculan una sola vez.
+    """
+    if not Tarea.objects.filter(tipo='corte_cartera', estado=Tarea.PENDIENTE).exists():
+        encolar('corte_cartera')
+
+
+def obtener_corte():
+    """
+    Último corte de cartera guardado, o None si todavía no se calculó ninguno. Solo lee:
+    el corte lo recalcula la tarea 'corte_cartera' cuando cambian los pagos y el comando
+    corte_cartera cada noche. Si el último corte no es de hoy (el comando no está programado
+    y no hubo pagos) se encola su recálculo; mientras tanto las páginas muestran su fecha.
+    """
+    corte = CorteCartera.objects.order_by('-fecha').first()
+    if corte is None or corte.desactualizado:
+        programar_corte()
+    return corte
+
+
+def tramos_del_corte(corte):
+    """Lista de (campo, etiqueta, monto) del corte para mostrar en pantalla."""
+    return [(campo, etiqueta, getattr(corte, campo) if corte else Decimal('0.00')) for campo, etiqueta, _, _ in TRAMOS]
+
+
+def _total_vencido():
+    return sum((F(campo) for campo in CAMPOS_TRAMO[1:]), F(CAMPOS_TRAMO[0]))
+
+
+def detalle_del_corte(corte, tramo=None):
+    """Préstamos con cuotas vencidas en el corte (solo los que tienen algo en `tramo`, si se indica)."""
+    if corte is None:
+        return CarteraPrestamo.objects.none()
+    detalle = corte.prestamos.select_related('prestamo', 'socio')
+    if tramo in CAMPOS_TRAMO:
+        detalle = detalle.filter(**{f'{tramo}__gt': 0})
+    return detalle.order_by('-dias_atraso', 'prestamo_id')
+
+
+def cartera_por_socio(corte, tramo=None):
+    """Totales vencidos del corte agrupados por socio, del mayor al menor."""
+    if corte is None:
+        return CarteraPrestamo.objects.none()
+    detalle = corte.prestamos.all()
+    if tramo in CAMPOS_TRAMO:
+        detalle = detalle.filter(**{f'{tramo}__gt': 0})
+    return (
+        detalle.values('socio_id', 'socio__cedula', 'socio__nombre', 'socio__apellido')
+        .annotate(
+            prestamos=Count('id'),
+            cuotas=Sum('cuotas_vencidas'),
+            dias_atraso=Max('dias_atraso'),
+            total=Sum(_total_vencido()),
+            **dict((campo, Sum(campo)) for campo in CAMPOS_TRAMO)
+        )
+        .order_by('-total', 'socio_id')
+    )
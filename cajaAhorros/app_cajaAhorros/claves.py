@@ -0,0 +1,43 @@
+# app_cajaAhorros/claves.py
+#
+# Este módulo no importa modelos: los procesos del pool lo cargan antes de que Django esté listo.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Por debajo de esta cantidad no vale la pena levantar procesos
+MINIMO_PARA_POOL = 16
+TAMANO_LOTE = 25
+
+
+def _inicializar_proceso(modulo_configuracion):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', modulo_configuracion)
+    import django
+    django.setup()
+
+
+def _hashear_lote(claves):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(clave) for clave in claves]
+
+
+def hashear_claves(claves, procesos=1):
+    """
+    Calcula el hash de cada contraseña, repartiendo el trabajo entre `procesos` procesos
+    (None = uno por CPU). El hash (PBKDF2) es deliberadamente lento, así que en altas
+    masivas domina el tiempo. El pool es solo para el comando importar_socios: dentro de
+    una petición se calcula en el mismo proceso (el valor por defecto).
+    Devuelve los hashes en el mismo orden que las claves.
+    """
+    claves = list(claves)
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(claves) < MINIMO_PARA_POOL:
+        return _hashear_lote(claves)
+
+    lotes = [claves[i:i + TAMANO_LOTE] for i in range(0, len(claves), TAMANO_LOTE)]
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        initializer=_inicializar_proceso,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'cajaAhorros.settings'),),
+    ) as pool:
+        return [hash_ for lote in pool.map(_hashear_lote, lotes) for hash_ in lote]
@@ -0,0 +1,28 @@
+# app_cajaAhorros/configuracion.py
+
+from .models import Configuracion
+from .versiones import obtener_version, renovar_version
+
+_CLAVE_VERSION = 'configuracion:version'
+
+# Copia local del proceso: la configuración cambia muy rara vez
+_local = {'version': None, 'valor': None}
+
+
+def obtener_configuracion():
+    """
+    Devuelve la configuración activa de la caja sin consultar la base de datos en cada uso.
+    La copia local solo se recarga cuando cambia la versión guardada en la caché compartida,
+    que se renueva al guardar o eliminar la configuración desde cualquier proceso.
+    """
+    version = obtener_version(_CLAVE_VERSION)
+    if _local['version'] != version:
+        _local['valor'] = Configuracion.objects.first()
+        _local['version'] = version
+    return _local['valor']
+
+
+def invalidar_configuracion():
+    _local['version'] = None
+    _local['valor'] = None
+    renovar_version(_CLAVE_VERSION)
@@ -1,6 +1,14 @@
-from .models import Configuracion
+from .configuracion import obtener_configuracion
+from .decorators import obtener_roles
 
 def configuracion(request):
     return {
-        'configuracion': Configuracion.objects.first()
+        'configuracion': obtener_configuracion()
+    }
+
+def roles(request):
+    # Primer grupo del usuario, resuelto una sola vez por petición
+    roles_usuario = obtener_roles(request) if hasattr(request, 'user') else []
+    return {
+        'rol_usuario': roles_usuario[0] if roles_usuario else None
     }
@@ -1,8 +1,51 @@
 # app_cajaAhorros/decorators.py
 
+from functools import wraps
+
+from django.db import transaction
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .versiones import obtener_versiones, renovar_version
+
+_CLAVE_SESION_ROLES = '_roles_usuario'
+_VERSION_ROLES = 'roles:version'
+
+
+def _version_roles_usuario(user_id):
+    return f'roles:version:{user_id}'
+
+
+def obtener_roles(request):
+    """
+    Devuelve los nombres de los grupos (roles) del usuario, ordenados por id.
+    Se consultan una sola vez por sesión: quedan guardados en la sesión junto con una
+    marca de versión que se renueva cuando cambian los grupos del usuario, y en la
+    petición para que el decorador, las vistas y las plantillas compartan el resultado.
+    """
+    if hasattr(request, '_roles'):
+        return request._roles
+
+    user = request.user
+    roles = []
+    if user.is_authenticated:
+        version = ':'.join(obtener_versiones(_VERSION_ROLES, _version_roles_usuario(user.pk)))
+        guardado = request.session.get(_CLAVE_SESION_ROLES)
+        if guardado and guardado.get('usuario') == user.pk and guardado.get('version') == version:
+            roles = guardado['roles']
+        else:
+            roles = list(user.groups.order_by('pk').values_list('name', flat=True))
+            request.session[_CLAVE_SESION_ROLES] = {'usuario': user.pk, 'version': version, 'roles': roles}
+
+    request._roles = roles
+    return roles
+
+
+def invalidar_roles(user_id=None):
+    """Invalida los roles guardados de un usuario, o de todos si no se indica ninguno."""
+    renovar_version(_version_roles_usuario(user_id) if user_id else _VERSION_ROLES)
+
+
 def role_required(allowed_roles=[]):
     """
     Decorador que verifica si un usuario pertenece a uno de los roles permitidos.
@@ -15,7 +58,7 @@ def role_required(allowed_roles=[]):
                 return view_func(request, *args, **kwargs)
 
             # Obtenemos los grupos (roles) a los que pertenece el usuario.
-            user_groups = request.user.groups.values_list('name', flat=True)
+            user_groups = obtener_roles(request)
             
             # Verificamos si alguno de los grupos del usuario está en la lista de roles permitidos.
             # El rol 'Administrador' siempre tiene acceso a todo lo que no esté explícitamente restringido a otros.
@@ -28,3 +71,18 @@ def role_required(allowed_roles=[]):
         return wrapper_func
     return decorator
 
+
+def escritura_inmediata(view_func):
+    """
+    Ejecuta las peticiones que modifican datos (todo lo que no sea GET o HEAD) en una sola
+    transacción. Con 'transaction_mode': 'IMMEDIATE' la transacción toma el candado de escritura
+    de SQLite al empezar: si otra petición está escribiendo espera su turno, y no quedan
+    escrituras a medias si la vista falla.
+    """
+    @wraps(view_func)
+    def wrapper_func(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        with transaction.atomic():
+            return view_func(request, *args, **kwargs)
+    return wrapper_func
@@ -77,7 +77,7 @@ class PrestamoForm(forms.ModelForm):
 class ConfiguracionForm(forms.ModelForm):
     class Meta:
         model = Configuracion
-        fields = ['ruc', 'nombre_empresa', 'direccion', 'telefono', 'email', 'logo', 'ciudad', 'tasa_interes', 'plazo_maximo', 'aporte_inicial', 'gastos_adm', 'tasa_prestamo' ]
+        fields = ['ruc', 'nombre_empresa', 'direccion', 'telefono', 'email', 'logo', 'ciudad', 'tasa_interes', 'plazo_maximo', 'aporte_inicial', 'aporte_mensual', 'gastos_adm', 'tasa_prestamo' ]
         widgets = {
             'ruc': forms.TextInput(attrs={'class': 'form-control'}),
             'nombre_empresa': forms.TextInput(attrs={'class': 'form-control'}),
@@ -89,6 +89,7 @@ class ConfiguracionForm(forms.ModelForm):
             'tasa_interes': forms.NumberInput(attrs={'class': 'form-control'}),
             'plazo_maximo': forms.NumberInput(attrs={'class': 'form-control'}),
             'aporte_inicial': forms.NumberInput(attrs={'class': 'form-control'}),
+            'aporte_mensual': forms.NumberInput(attrs={'class': 'form-control'}),
             'gastos_adm': forms.NumberInput(attrs={'class': 'form-control'}),
             'tasa_prestamo': forms.NumberInput(attrs={'class': 'form-control'}),
         }
@@ -105,3 +106,42 @@ class GastoAdministrativoForm(forms.ModelForm):
             'salida': forms.NumberInput(attrs={'step': '0.01', 'class': 'form-control'}),
         }
 
+
+
+class ImportarSociosForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo de socios (.csv o .xlsx)',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx', 'class': 'form-control'}),
+    )
+    simular = forms.BooleanField(
+        label='Solo validar (no guardar nada)', required=False, initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('El archivo debe ser .csv o .xlsx.')
+        return archivo
+
+
+class AporteMensualForm(forms.Form):
+    mes = forms.DateField(
+        label='Mes', input_formats=['%Y-%m'],
+        widget=forms.DateInput(format='%Y-%m', attrs={'type': 'month', 'class': 'form-control'}),
+    )
+    fecha_movimiento = forms.DateField(
+        label='Fecha del movimiento',
+        widget=forms.DateInput(format='%Y-%m-%d', attrs={'type': 'date', 'class': 'form-control'}),
+    )
+    monto = forms.DecimalField(
+        label='Monto por socio', max_digits=12, decimal_places=2, min_value=0,
+        widget=forms.NumberInput(attrs={'step': '0.01', 'class': 'form-control'}),
+    )
+    detalle = forms.CharField(
+        label='Detalle', max_length=255, required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'Aporte mensual MM/AAAA', 'class': 'form-control'}),
+    )
+
+    def clean_mes(self):
+        return self.cleaned_data['mes'].replace(day=1)
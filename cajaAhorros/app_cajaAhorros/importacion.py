@@ -0,0 +1,235 @@
+# app_cajaAhorros/importacion.py
+
+import csv
+import io
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.models import Group, User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .busqueda import indexar
+from .claves import hashear_claves
+from .configuracion import obtener_configuracion
+from .forms import SocioForm
+from .libros import registrar_gastos
+from .models import GastosAdministrativos, Movimiento, Socio
+from .saldos import actualizar_resumen
+from .versiones import marcar_cambio
+
+COLUMNAS = ['cedula', 'nombre', 'apellido', 'telefono', 'direccion', 'email',
+            'fecha_nacimiento', 'ocupacion', 'fecha_ingreso']
+OBLIGATORIAS = ['cedula', 'nombre', 'apellido', 'fecha_nacimiento', 'fecha_ingreso']
+
+# Filas validadas y guardadas por cada lote
+TAMANO_LOTE = 500
+
+
+class FilaSocioForm(SocioForm):
+    """Valida una fila del archivo; la unicidad de cédula se revisa por lote, no fila por fila."""
+
+    class Meta(SocioForm.Meta):
+        fields = COLUMNAS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo in ('fecha_nacimiento', 'fecha_ingreso'):
+            self.fields[campo].input_formats = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+
+    def validate_unique(self):
+        pass
+
+
+class ResultadoImportacion:
+    def __init__(self, simulacion):
+        self.simulacion = simulacion
+        self.filas = 0
+        self.creados = 0
+        self.errores = []  # (número de fila, cédula, mensaje)
+
+    @property
+    def validos(self):
+        return self.filas - len(self.errores)
+
+    def agregar_error(self, fila, cedula, mensaje):
+        self.errores.append((fila, cedula or '', mensaje))
+
+    def como_dict(self):
+        """Informe para guardar en Tarea.informe; la plantilla lo muestra igual que el resultado."""
+        return {
+            'simulacion': self.simulacion,
+            'filas': self.filas,
+            'validos': self.validos,
+            'creados': self.creados,
+            'errores': self.errores,
+        }
+
+
+def _normalizar(encabezado):
+    return str(encabezado or '').strip().lower().replace(' ', '_')
+
+
+def leer_filas(archivo, nombre):
+    """
+    Recorre el archivo de socios fila por fila sin cargarlo entero en memoria.
+    Acepta CSV (UTF-8, separado por comas o punto y coma) y XLSX.
+    Devuelve pares (número de fila, diccionario de columnas).
+    """
+    if nombre.lower().endswith('.xlsx'):
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = [_normalizar(celda) for celda in next(filas, ())]
+            for numero, valores in enumerate(filas, start=2):
+                if any(valor not in (None, '') for valor in valores):
+                    yield numero, dict(zip(encabezados, valores))
+        finally:
+            libro.close()
+        return
+
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    encabezados = [_normalizar(celda) for celda in next(lector, [])]
+    for numero, valores in enumerate(lector, start=2):
+        if any(valor.strip() for valor in valores):
+            yield numero, dict(zip(encabezados, valores))
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _validar_lote(lote, vistas, resultado):
+    """Valida las filas de un lote; devuelve los socios válidos sin guardar."""
+    formularios = []
+    for numero, datos in lote:
+        datos = dict((columna, '' if datos.get(columna) is None else datos.get(columna)) for columna in COLUMNAS)
+        datos['cedula'] = str(datos['cedula']).strip()
+        form = FilaSocioForm(datos)
+        if not form.is_valid():
+            mensajes = '; '.join(f'{campo}: {" ".join(errores)}' for campo, errores in form.errors.items())
+            resultado.agregar_error(numero, datos['cedula'], mensajes)
+        elif datos['cedula'] in vistas:
+            resultado.agregar_error(numero, datos['cedula'], f'Cédula repetida en el archivo (fila {vistas[datos["cedula"]]}).')
+        else:
+            vistas[datos['cedula']] = numero
+            formularios.append((numero, form))
+
+    # Unicidad contra la base: una consulta por tabla para todo el lote
+    cedulas = [form.cleaned_data['cedula'] for _, form in formularios]
+    socios_existentes = set(Socio.objects.filter(cedula__in=cedulas).values_list('cedula', flat=True))
+    usuarios_existentes = set(User.objects.filter(username__in=cedulas).values_list('username', flat=True))
+
+    validos = []
+    for numero, form in formularios:
+        cedula = form.cleaned_data['cedula']
+        if cedula in socios_existentes:
+            resultado.agregar_error(numero, cedula, 'Ya existe un socio con esta cédula.')
+        elif cedula in usuarios_existentes:
+            resultado.agregar_error(numero, cedula, 'Ya existe un usuario con esta cédula como nombre de usuario.')
+        else:
+            validos.append(form.instance)
+    return validos
+
+
+def _guardar_lote(socios, grupo, config, procesos):
+    """
+    Crea en lote los usuarios, sus grupos, los socios, el aporte inicial y el gasto
+    administrativo de ingreso, igual que crear_socio y la señal crear_usuario_para_socio.
+    """
+    claves = hashear_claves([socio.cedula for socio in socios], procesos=procesos)
+    usuarios = [
+        User(username=socio.cedula, email=socio.email or '', password=clave,
+             first_name=socio.nombre, last_name=socio.apellido)
+        for socio, clave in zip(socios, claves)
+    ]
+    aporte_inicial = config.aporte_inicial if config else Decimal('0.00')
+    gasto_adm = config.gastos_adm if config else Decimal('0.00')
+    hoy = timezone.now().date()
+
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios)
+        if grupo:
+            User.groups.through.objects.bulk_create([
+                User.groups.through(user_id=usuario.pk, group_id=grupo.pk) for usuario in usuarios
+            ])
+        for socio, usuario in zip(socios, usuarios):
+            socio.user = usuario
+        Socio.objects.bulk_create(socios)
+        indexar([socio.pk for socio in socios])
+        marcar_cambio('socios')
+
+        movimientos = [
+            Movimiento(socio=socio, detalle_movimiento="Aporte inicial", entrada=aporte_inicial,
+                       salida=Decimal('0.00'), saldo=aporte_inicial, fecha_movimiento=hoy)
+            for socio in socios
+        ]
+        Movimiento.objects.bulk_create(movimientos)
+        actualizar_resumen(agregados=movimientos)
+
+        registrar_gastos(
+            GastosAdministrativos(
+                fecha=socio.fecha_ingreso,
+                descripcion="Ingreso por nuevo socio: " + socio.nombre + " " + socio.apellido,
+                entrada=gasto_adm,
+                salida=Decimal('0.00'),
+            )
+            for socio in socios
+        )
+
+
+def importar_socios(archivo, nombre, simulacion=False, procesos=1, tamano_lote=TAMANO_LOTE):
+    """
+    Importa socios desde un archivo CSV o XLSX, validando y guardando por lotes.
+    Con `simulacion=True` solo valida y devuelve el informe, sin escribir nada.
+    Cada lote se guarda en su propia transacción: un error en un lote no deshace los anteriores.
+    Las contraseñas se calculan en el mismo proceso; solo el comando pasa `procesos` para
+    repartirlas en un pool (ver claves.hashear_claves). Desde la web la importación corre en
+    el worker de tareas y la petición solo valida las simulaciones.
+    """
+    resultado = ResultadoImportacion(simulacion)
+    filas = leer_filas(archivo, nombre)
+    primera = next(filas, None)
+    if primera is None:
+        return resultado
+    faltantes = [columna for columna in OBLIGATORIAS if columna not in primera[1]]
+    if faltantes:
+        resultado.filas = 1
+        resultado.agregar_error(1, '', 'Faltan columnas: ' + ', '.join(faltantes))
+        return resultado
+
+    grupo = Group.objects.filter(name='Socio').first()
+    config = obtener_configuracion()
+    vistas = {}
+
+    def todas():
+        yield primera
+        yield from filas
+
+    for lote in _lotes(todas(), tamano_lote):
+        resultado.filas += len(lote)
+        socios = _validar_lote(lote, vistas, resultado)
+        if simulacion or not socios:
+            continue
+        try:
+            _guardar_lote(socios, grupo, config, procesos)
+        except IntegrityError as error:
+            # Otro proceso registró alguna de estas cédulas mientras se validaba el lote
+            for socio in socios:
+                resultado.agregar_error(vistas[socio.cedula], socio.cedula, f'No se pudo guardar el lote: {error}')
+            continue
+        resultado.creados += len(socios)
+    return resultado
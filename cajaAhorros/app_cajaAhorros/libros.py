@@ -0,0 +1,133 @@
+# app_cajaAhorros/libros.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import GastosAdministrativos, Movimiento, SaldoSocio, SecuenciaLibro
+from .saldos import actualizar_resumen, obtener_resumen, recalcular_saldos
+from .versiones import marcar_cambio
+
+LIBRO_GASTOS = 'gastos'
+
+_fecha_movimiento = Movimiento._meta.get_field('fecha_movimiento')
+
+
+def _como_decimal(valor):
+    return Decimal(str(valor or 0))
+
+
+def bloquear_socio(socio_id):
+    """
+    Toma el candado del libro de movimientos de un socio hasta el final de la transacción.
+    Es un UPDATE sobre su fila de SaldoSocio: bloquea la fila en PostgreSQL y en SQLite
+    toma el candado de escritura antes de leer el saldo, de modo que dos registros
+    concurrentes del mismo socio se hacen uno después del otro.
+    """
+    if not SaldoSocio.objects.filter(pk=socio_id).update(numero_movimientos=F('numero_movimientos')):
+        SaldoSocio.objects.bulk_create([SaldoSocio(socio_id=socio_id)], ignore_conflicts=True)
+        SaldoSocio.objects.filter(pk=socio_id).update(numero_movimientos=F('numero_movimientos'))
+
+
+def bloquear_socios(socio_ids):
+    """Como bloquear_socio, para varios socios con un solo UPDATE (más un INSERT para los que no tienen resumen)."""
+    socio_ids = set(socio_ids)
+    resumenes = SaldoSocio.objects.filter(pk__in=socio_ids)
+    if resumenes.update(numero_movimientos=F('numero_movimientos')) < len(socio_ids):
+        SaldoSocio.objects.bulk_create(
+            [SaldoSocio(socio_id=socio_id) for socio_id in socio_ids], ignore_conflicts=True, batch_size=500,
+        )
+        resumenes.update(numero_movimientos=F('numero_movimientos'))
+
+
+def bloquear_gastos(asientos=1):
+    """
+    Toma el candado del libro de gastos administrativos, reserva `asientos` números
+    y devuelve el último reservado.
+    """
+    secuencia = SecuenciaLibro.objects.filter(libro=LIBRO_GASTOS)
+    if not secuencia.update(ultimo=F('ultimo') + asientos):
+        SecuenciaLibro.objects.bulk_create([SecuenciaLibro(libro=LIBRO_GASTOS)], ignore_conflicts=True)
+        secuencia.update(ultimo=F('ultimo') + asientos)
+    return secuencia.values_list('ultimo', flat=True).get()
+
+
+def ultimo_gasto():
+    """Último asiento de gastos; en el mismo día desempata el orden de registro."""
+    return GastosAdministrativos.objects.order_by('-fecha', '-id').first()
+
+
+def registrar_movimiento(movimiento):
+    """
+    Registra un movimiento nuevo calculando su saldo con el candado del socio tomado.
+    Si el movimiento tiene fecha anterior a otros, el saldo de los posteriores se
+    recalcula al guardar (ver Movimiento.save).
+    """
+    with transaction.atomic():
+        bloquear_socio(movimiento.socio_id)
+        saldo_anterior = obtener_resumen(movimiento.socio_id).saldo
+        movimiento.saldo = saldo_anterior + _como_decimal(movimiento.entrada) - _como_decimal(movimiento.salida)
+        movimiento.save()
+    return movimiento
+
+
+def registrar_movimientos(movimientos):
+    """
+    Registra varios movimientos nuevos con un solo candado y un INSERT en lote.
+    El saldo de cada uno continúa el del socio en el orden recibido, igual que registrar_movimiento;
+    los socios con algún movimiento fuera de orden (fecha anterior a otro ya registrado)
+    recalculan su tramo desde esa fecha.
+    """
+    movimientos = list(movimientos)
+    if not movimientos:
+        return movimientos
+    with transaction.atomic():
+        bloquear_socios(mov.socio_id for mov in movimientos)
+        resumenes = SaldoSocio.objects.in_bulk({mov.socio_id for mov in movimientos})
+        saldos = dict((socio_id, resumen.saldo) for socio_id, resumen in resumenes.items())
+        ultimas = dict((socio_id, resumen.ultimo_movimiento) for socio_id, resumen in resumenes.items())
+        recalcular = {}
+        for mov in movimientos:
+            fecha = _fecha_movimiento.to_python(mov.fecha_movimiento)
+            saldos[mov.socio_id] = saldos.get(mov.socio_id, Decimal('0.00')) + _como_decimal(mov.entrada) - _como_decimal(mov.salida)
+            mov.saldo = saldos[mov.socio_id]
+            ultima = ultimas.get(mov.socio_id)
+            if ultima and fecha < ultima:
+                recalcular[mov.socio_id] = min(fecha, recalcular.get(mov.socio_id, fecha))
+            else:
+                ultimas[mov.socio_id] = fecha
+
+        Movimiento.objects.bulk_create(movimientos, batch_size=500)
+        actualizar_resumen(agregados=movimientos)
+        for socio_id, desde in recalcular.items():
+            recalcular_saldos(socio_id, desde)
+    return movimientos
+
+
+def registrar_gasto(gasto):
+    """Registra un gasto administrativo nuevo calculando su saldo con el candado del libro tomado."""
+    with transaction.atomic():
+        bloquear_gastos()
+        ultimo = ultimo_gasto()
+        saldo_anterior = ultimo.saldo if ultimo else Decimal('0.00')
+        gasto.saldo = saldo_anterior + _como_decimal(gasto.entrada) - _como_decimal(gasto.salida)
+        gasto.save()
+    return gasto
+
+
+def registrar_gastos(gastos):
+    """Registra varios gastos seguidos con un solo candado y un INSERT en lote."""
+    gastos = list(gastos)
+    if not gastos:
+        return gastos
+    with transaction.atomic():
+        bloquear_gastos(len(gastos))
+        ultimo = ultimo_gasto()
+        saldo = ultimo.saldo if ultimo else Decimal('0.00')
+        for gasto in gastos:
+            saldo += _como_decimal(gasto.entrada) - _como_decimal(gasto.salida)
+            gasto.saldo = saldo
+        GastosAdministrativos.objects.bulk_create(gastos, batch_size=500)
+        marcar_cambio('gastos')
+    return gastos
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Pasa la base de datos SQLite al modo WAL, en el que las lecturas no esperan a las escrituras. '
+            'El modo queda guardado en el archivo: se ejecuta una vez al instalar el servidor.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--desactivar', action='store_true',
+                            help='Vuelve al journal de reversión (DELETE), por ejemplo antes de copiar la base.')
+
+    def handle(self, *args, **options):
+        conexion = connections[options['database']]
+        if conexion.vendor != 'sqlite':
+            raise CommandError('El modo WAL solo aplica a SQLite.')
+        if conexion.is_in_memory_db():
+            raise CommandError('Una base en memoria no admite el modo WAL.')
+        modo = 'DELETE' if options['desactivar'] else 'WAL'
+        with conexion.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {modo}')
+            resultado = cursor.fetchone()[0]
+        if resultado.upper() != modo:
+            raise CommandError(f'SQLite no cambió el modo del journal (quedó en {resultado}).')
+        self.stdout.write(self.style.SUCCESS(f'Modo del journal de {conexion.settings_dict["NAME"]}: {resultado}.'))
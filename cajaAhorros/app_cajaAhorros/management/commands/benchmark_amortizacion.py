@@ -0,0 +1,107 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app_cajaAhorros.amortizacion import generar_amortizacion
+from app_cajaAhorros.models import PagoPrestamo, Prestamo, Socio
+
+COLUMNAS_COMPARADAS = ('cuota_pago', 'saldo_pago', 'capital_pago', 'interes_pago', 'plazo_pago',
+                       'valor_cuota_pago', 'fecha_a_pagar')
+
+
+def _generar_fila_por_fila(prestamo):
+    """Camino anterior: cálculo con Decimal cuota a cuota y un INSERT por fila."""
+    capital_prestado = prestamo.cantidad_aprobada
+    plazo = prestamo.plazo
+    saldo = capital_prestado
+    tasa_mensual = (prestamo.interes / 100) / 12
+
+    if not prestamo.cuota:
+        if tasa_mensual == 0:
+            cuota = capital_prestado / plazo
+        else:
+            cuota = capital_prestado * (
+                tasa_mensual * (1 + tasa_mensual) ** plazo
+            ) / ((1 + tasa_mensual) ** plazo - 1)
+        prestamo.cuota = round(cuota, 2)
+        prestamo.save()
+    else:
+        cuota = prestamo.cuota
+
+    fecha = prestamo.fecha_aprobacion or timezone.now().date()
+    for i in range(plazo):
+        interes = saldo * tasa_mensual
+        capital = cuota - interes
+        interes = round(interes, 2)
+        capital = round(capital, 2)
+        cuota_real = round(capital + interes, 2)
+        if i == plazo - 1:
+            capital = saldo
+            interes = max(0, cuota - capital)
+            cuota_real = round(capital + interes, 2)
+        PagoPrestamo.objects.create(
+            prestamo=prestamo,
+            cuota_pago=i + 1,
+            saldo_pago=round(saldo, 2),
+            capital_pago=capital,
+            interes_pago=interes,
+            plazo_pago=plazo - i,
+            valor_cuota_pago=cuota_real,
+            estado=False,
+            fecha_a_pagar=fecha + relativedelta(months=i),
+        )
+        saldo -= capital
+        saldo = round(saldo, 2)
+
+
+class Command(BaseCommand):
+    help = ('Compara la generación de tablas de amortización fila por fila contra el cálculo '
+            'en lote con un solo INSERT. Todo se ejecuta en una transacción que se revierte al final.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plazos', type=int, nargs='+', default=[12, 60, 120])
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--monto', type=Decimal, default=Decimal('5000.00'))
+        parser.add_argument('--interes', type=Decimal, default=Decimal('12.00'))
+
+    def _medir(self, generador, socio, plazo, opciones):
+        tiempos, consultas, tablas = [], 0, []
+        for _ in range(opciones['repeticiones']):
+            prestamo = Prestamo.objects.create(
+                socio=socio, cantidad_solicitada=opciones['monto'], plazo=plazo,
+                interes=opciones['interes'], estado='Aprobado', fecha_aprobacion=date(2025, 1, 31),
+            )
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                generador(prestamo)
+                tiempos.append(time.perf_counter() - inicio)
+            consultas = len(capturadas)
+            tablas.append(list(prestamo.pagos.order_by('cuota_pago').values_list(*COLUMNAS_COMPARADAS)))
+        return min(tiempos), consultas, tablas
+
+    def handle(self, *args, **opciones):
+        with transaction.atomic():
+            socio = Socio(
+                cedula='benchmark-amortizacion', nombre='Benchmark', apellido='Amortizacion',
+                fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1),
+            )
+            Socio.objects.bulk_create([socio])  # sin la señal que crea el usuario
+            socio = Socio.objects.get(cedula=socio.cedula)
+
+            self.stdout.write(f"{'Plazo':>6} {'Fila por fila':>16} {'Consultas':>10} {'En lote':>12} {'Consultas':>10} {'Mejora':>8}")
+            for plazo in opciones['plazos']:
+                t_antes, q_antes, tablas_antes = self._medir(_generar_fila_por_fila, socio, plazo, opciones)
+                t_ahora, q_ahora, tablas_ahora = self._medir(generar_amortizacion, socio, plazo, opciones)
+                if tablas_antes != tablas_ahora:
+                    self.stderr.write(self.style.ERROR(f'Las tablas de {plazo} meses no coinciden.'))
+                self.stdout.write(
+                    f"{plazo:>6} {t_antes * 1000:>13.2f} ms {q_antes:>10} {t_ahora * 1000:>9.2f} ms "
+                    f"{q_ahora:>10} {t_antes / t_ahora:>7.1f}x"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,79 @@
+import json
+import platform
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app_cajaAhorros.medicion_vistas import comparar, medir_vistas, volumen_de_datos
+
+
+class Command(BaseCommand):
+    help = ('Mide cada URL de cajaAhorros/urls.py con el cliente de pruebas: tiempo total, número de consultas '
+            'y tiempo en SQL. Guarda el resultado en JSON y, con --comparar, marca las regresiones '
+            'respecto de una corrida anterior. Todo se ejecuta en una transacción que se revierte al final.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Peticiones medidas por URL después de la primera (por defecto 5)')
+        parser.add_argument('--salida', default='benchmark_vistas.json',
+                            help='Archivo JSON donde se guarda el resultado')
+        parser.add_argument('--comparar', metavar='ARCHIVO',
+                            help='JSON de una corrida anterior con el que se compara')
+        parser.add_argument('--umbral', type=float, default=0.2,
+                            help='Fracción de aumento del tiempo que se considera regresión (por defecto 0.2)')
+        parser.add_argument('--minimo-ms', type=float, default=5.0,
+                            help='Diferencia mínima en ms para marcar una regresión de tiempo (por defecto 5)')
+        parser.add_argument('--vista', action='append', dest='vistas',
+                            help='Mide solo la URL con este nombre (se puede repetir)')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+
+        with transaction.atomic():
+            datos = volumen_de_datos()
+            try:
+                vistas = medir_vistas(options['repeticiones'], options['vistas'])
+            except ValueError as error:
+                raise CommandError(error)
+            transaction.set_rollback(True)
+
+        corrida = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeticiones': options['repeticiones'],
+            'datos': datos,
+            'vistas': vistas,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(corrida, archivo, indent=2, ensure_ascii=False)
+
+        self.stdout.write(f"{'Vista':<36} {'Estado':>6} {'Frío ms':>9} {'ms':>9} {'Consultas':>9} {'SQL ms':>9}")
+        for nombre, dato in vistas.items():
+            if 'omitida' in dato:
+                self.stdout.write(self.style.WARNING(f"{nombre:<36} omitida: {dato['omitida']}"))
+                continue
+            estilo = self.style.ERROR if dato['estado'] >= 400 else str
+            self.stdout.write(estilo(
+                f"{nombre:<36} {dato['estado']:>6} {dato['tiempo_frio_ms']:>9.1f} {dato['tiempo_ms']:>9.1f} "
+                f"{dato['consultas']:>9} {dato['tiempo_sql_ms']:>9.1f}"
+            ))
+        self.stdout.write(f"Resultado guardado en {options['salida']}")
+
+        if anterior is None:
+            return
+        if anterior.get('datos') != datos:
+            self.stdout.write(self.style.WARNING(
+                f"El volumen de datos cambió desde la corrida anterior: {anterior.get('datos')} -> {datos}"
+            ))
+        regresiones = comparar(vistas, anterior.get('vistas', {}), options['umbral'], options['minimo_ms'])
+        for nombre, descripcion in regresiones:
+            self.stderr.write(self.style.ERROR(f'Regresión en {nombre}: {descripcion}'))
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} regresiones respecto de {options["comparar"]}')
+        self.stdout.write(self.style.SUCCESS(f'Sin regresiones respecto de {options["comparar"]}'))
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from app_cajaAhorros.cartera import actualizar_corte, generar_corte, tramos_del_corte
+
+
+class Command(BaseCommand):
+    help = 'Calcula el corte de cartera vencida por días de atraso (para programarlo cada noche).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat,
+                            help='Fecha del corte en formato AAAA-MM-DD. Por defecto, hoy.')
+
+    def handle(self, *args, **options):
+        fecha = options['fecha']
+        # Solo el corte de hoy queda asociado a la versión actual de los pagos
+        corte = generar_corte(fecha) if fecha and fecha != date.today() else actualizar_corte()
+        for _, etiqueta, monto in tramos_del_corte(corte):
+            self.stdout.write(f'{etiqueta}: $ {monto}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Corte del {corte.fecha:%d/%m/%Y}: {corte.prestamos_vencidos} préstamos, '
+            f'{corte.cuotas_vencidas} cuotas vencidas, $ {corte.total_vencido}'
+        ))
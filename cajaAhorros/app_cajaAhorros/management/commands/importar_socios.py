@@ -0,0 +1,54 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_cajaAhorros.importacion import TAMANO_LOTE, importar_socios
+
+
+class Command(BaseCommand):
+    help = ('Importa socios desde un archivo CSV o XLSX: crea socios, usuarios, grupo, '
+            'aporte inicial y gasto administrativo de ingreso por lotes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo valida el archivo y muestra el informe, sin guardar nada.')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para calcular las contraseñas (por defecto, uno por CPU).')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help=f'Filas por lote (por defecto {TAMANO_LOTE}).')
+        parser.add_argument('--reporte', help='Guarda los errores por fila en este archivo CSV.')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+
+        with open(ruta, 'rb') as archivo:
+            resultado = importar_socios(
+                archivo, ruta,
+                simulacion=options['simular'],
+                procesos=options['procesos'],
+                tamano_lote=options['lote'],
+            )
+
+        for fila, cedula, mensaje in resultado.errores:
+            self.stdout.write(self.style.WARNING(f'Fila {fila} ({cedula or "sin cédula"}): {mensaje}'))
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                escritor = csv.writer(salida)
+                escritor.writerow(['fila', 'cedula', 'error'])
+                escritor.writerows(resultado.errores)
+
+        if resultado.simulacion:
+            self.stdout.write(self.style.SUCCESS(
+                f'Simulación: {resultado.filas} filas leídas, {resultado.validos} válidas, '
+                f'{len(resultado.errores)} con errores. No se guardó nada.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{resultado.filas} filas leídas, {resultado.creados} socios creados, '
+                f'{len(resultado.errores)} con errores.'
+            ))
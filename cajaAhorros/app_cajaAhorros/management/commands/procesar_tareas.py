@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_cajaAhorros.tareas import tomar_y_ejecutar
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano guardadas en la base de datos (reportes, amortizaciones, etc.).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa las tareas pendientes y termina, sin esperar nuevas')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera cuando no hay tareas (por defecto 2)')
+        parser.add_argument('--maximo', type=int, default=0,
+                            help='Termina después de procesar esta cantidad de tareas (0 = sin límite)')
+
+    def handle(self, *args, **options):
+        procesadas = 0
+        try:
+            while not options['maximo'] or procesadas < options['maximo']:
+                tarea = tomar_y_ejecutar()
+                if tarea is None:
+                    if options['una_vez']:
+                        break
+                    # Mientras espera no retiene conexiones vencidas o rotas
+                    close_old_connections()
+                    time.sleep(options['intervalo'])
+                    continue
+                procesadas += 1
+                estilo = self.style.SUCCESS if tarea.estado == tarea.TERMINADA else self.style.WARNING
+                self.stdout.write(estilo(f'{tarea} en el intento {tarea.intentos}'))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Tareas procesadas: {procesadas}'))
@@ -0,0 +1,172 @@
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test.utils import override_settings
+
+from app_cajaAhorros.libros import registrar_movimiento
+from app_cajaAhorros.models import Movimiento, SaldoSocio, Socio
+
+# Configuración de Django por defecto: journal de reversión, sin modo de transacción
+# y una conexión nueva por petición
+PERFIL_POR_DEFECTO = {
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {},
+    'PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+}
+
+
+def _perfil_ajustado():
+    base = connection.settings_dict
+    return {
+        'CONN_MAX_AGE': base['CONN_MAX_AGE'],
+        'OPTIONS': dict(base['OPTIONS']),
+        # La copia temporal pasa a WAL como quedaría la base del servidor con activar_wal
+        'PRAGMAS': dict(getattr(settings, 'SQLITE_PRAGMAS', {}), journal_mode='WAL'),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Prueba de carga de SQLite: varios hilos leen saldos e historiales y registran aportes a la vez, '
+            'con la configuración por defecto de Django y con la ajustada de settings. '
+            'Trabaja sobre una copia temporal de la base de datos; la base real no se modifica.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=10.0,
+                            help='Duración de cada perfil (por defecto 10)')
+        parser.add_argument('--escrituras', type=float, default=0.3,
+                            help='Fracción de peticiones que registran un aporte (por defecto 0.3)')
+        parser.add_argument('--socios', type=int, default=50,
+                            help='Socios de prueba sobre los que se reparten las peticiones')
+
+    @contextmanager
+    def _copia_temporal(self):
+        """Apunta la conexión 'default' a una copia de la base mientras dura la prueba."""
+        if connection.vendor != 'sqlite':
+            raise CommandError('La prueba de carga está escrita para SQLite.')
+        # En el mismo disco que la base real, para que las sincronizaciones cuesten lo mismo
+        carpeta = tempfile.mkdtemp(prefix='prueba_carga_', dir=os.path.dirname(connection.settings_dict['NAME']))
+        copia = os.path.join(carpeta, 'db.sqlite3')
+        connection.ensure_connection()
+        destino = sqlite3.connect(copia)
+        with destino:
+            connection.connection.backup(destino)
+        destino.close()
+        original = deepcopy(connection.settings_dict)
+        connections.close_all()
+        connection.settings_dict['NAME'] = copia
+        try:
+            yield
+        finally:
+            connections.close_all()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    def _preparar_socios(self, cantidad):
+        socios = [
+            Socio(cedula=f'prueba-carga-{i}', nombre='Prueba', apellido=f'Carga {i}',
+                  fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+            for i in range(cantidad)
+        ]
+        Socio.objects.bulk_create(socios, ignore_conflicts=True)  # sin la señal que crea el usuario
+        return list(Socio.objects.filter(cedula__startswith='prueba-carga-').values_list('pk', flat=True))
+
+    def _peticion(self, socio_ids, fraccion_escrituras, azar):
+        """Una petición como las de las vistas: lectura del historial o registro de un aporte."""
+        socio_id = azar.choice(socio_ids)
+        if azar.random() < fraccion_escrituras:
+            # Como agregar_aporte con escritura_inmediata
+            with transaction.atomic():
+                registrar_movimiento(Movimiento(
+                    socio_id=socio_id, detalle_movimiento='Prueba de carga', fecha_movimiento=date.today(),
+                    entrada=Decimal('10.00'), salida=Decimal('0.00'),
+                ))
+            return 'escritura'
+        SaldoSocio.objects.filter(pk=socio_id).first()
+        list(Movimiento.objects.filter(socio_id=socio_id).order_by('-fecha_movimiento', '-id')[:25])
+        return 'lectura'
+
+    def _hilo(self, numero, socio_ids, fin, opciones, resultados):
+        azar = random.Random(numero)
+        contados = {'lectura': 0, 'escritura': 0, 'errores': 0, 'tiempos': []}
+        try:
+            while time.perf_counter() < fin:
+                # Como request_started / request_finished: cierra la conexión si su perfil no la reutiliza
+                close_old_connections()
+                inicio = time.perf_counter()
+                try:
+                    tipo = self._peticion(socio_ids, opciones['escrituras'], azar)
+                except OperationalError:
+                    contados['errores'] += 1
+                else:
+                    contados[tipo] += 1
+                    contados['tiempos'].append(time.perf_counter() - inicio)
+                close_old_connections()
+        finally:
+            connections.close_all()
+            resultados.append(contados)
+
+    def _medir(self, nombre, perfil, socio_ids, opciones):
+        ajustes = connection.settings_dict
+        ajustes['CONN_MAX_AGE'] = perfil['CONN_MAX_AGE']
+        ajustes['OPTIONS'] = dict(perfil['OPTIONS'])
+        with override_settings(SQLITE_PRAGMAS=perfil['PRAGMAS']):
+            # Una primera conexión cambia el modo del journal antes de que empiecen los hilos
+            connection.ensure_connection()
+            connections.close_all()
+            resultados = []
+            fin = time.perf_counter() + opciones['segundos']
+            hilos = [
+                threading.Thread(target=self._hilo, args=(n, socio_ids, fin, opciones, resultados))
+                for n in range(opciones['hilos'])
+            ]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        lecturas = sum(r['lectura'] for r in resultados)
+        escrituras = sum(r['escritura'] for r in resultados)
+        errores = sum(r['errores'] for r in resultados)
+        tiempos = sorted(t for r in resultados for t in r['tiempos'])
+        p95 = tiempos[int(len(tiempos) * 0.95)] if tiempos else 0
+        por_segundo = (lecturas + escrituras) / opciones['segundos']
+        self.stdout.write(
+            f"{nombre:<12} {lecturas / opciones['segundos']:>11.1f} {escrituras / opciones['segundos']:>12.1f} "
+            f"{por_segundo:>10.1f} {errores:>8} {statistics.median(tiempos) * 1000 if tiempos else 0:>10.2f} "
+            f"{p95 * 1000:>10.2f}"
+        )
+        return por_segundo
+
+    def handle(self, *args, **opciones):
+        # Se lee antes de empezar: la prueba cambia los ajustes de la conexión para cada perfil
+        ajustado = _perfil_ajustado()
+        # Las marcas de versión van a la caché local del proceso: se mide solo la base de datos
+        with override_settings(CACHE_COMPARTIDA='default'), self._copia_temporal():
+            socio_ids = self._preparar_socios(opciones['socios'])
+            self.stdout.write(
+                f"{opciones['hilos']} hilos, {opciones['segundos']:.0f} s por perfil, "
+                f"{opciones['escrituras']:.0%} de escrituras"
+            )
+            self.stdout.write(
+                f"{'Perfil':<12} {'Lecturas/s':>11} {'Escrituras/s':>12} {'Total/s':>10} {'Errores':>8} "
+                f"{'Mediana ms':>10} {'p95 ms':>10}"
+            )
+            antes = self._medir('Por defecto', PERFIL_POR_DEFECTO, socio_ids, opciones)
+            ahora = self._medir('Ajustado', ajustado, socio_ids, opciones)
+        if antes:
+            self.stdout.write(self.style.SUCCESS(f'Mejora: {ahora / antes:.1f}x'))
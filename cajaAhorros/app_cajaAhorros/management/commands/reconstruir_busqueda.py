@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app_cajaAhorros.busqueda import reconstruir, usa_fts
+
+
+class Command(BaseCommand):
+    help = ('Vuelve a llenar el índice de búsqueda de socios (FTS5) con todos los socios. '
+            'Las altas y cambios lo mantienen al día; esto es para reparar el índice o después '
+            'de cargar socios por fuera de la aplicación.')
+
+    def handle(self, *args, **options):
+        if not usa_fts():
+            self.stdout.write(self.style.WARNING(
+                'La base de datos no tiene el índice FTS5: la búsqueda de socios usa LIKE y no hay nada que reconstruir.'
+            ))
+            return
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido: {total} socios.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_cajaAhorros.resumen_mensual import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los totales mensuales del panel de control a partir de movimientos, préstamos y pagos.'
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Meses reconstruidos: {total}'))
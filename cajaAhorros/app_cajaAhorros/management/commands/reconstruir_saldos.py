@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app_cajaAhorros.saldos import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen de saldos por socio a partir de la tabla de movimientos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socio', type=int, action='append', dest='socios',
+                            help='ID del socio a reconstruir (se puede repetir). Por defecto, todos.')
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumenes(options['socios'])
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes de saldo reconstruidos: {total}'))
@@ -0,0 +1,37 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_cajaAhorros.sembrado import sembrar
+
+
+class Command(BaseCommand):
+    help = ('Llena la base con una caja de ahorros sintética y reproducible (socios, aportes mensuales, '
+            'préstamos en todos los estados con sus cuotas y gastos) para pruebas de rendimiento. '
+            'Úsese sobre una base de datos nueva, nunca sobre la de producción.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socios', type=int, default=500)
+        parser.add_argument('--anios', type=int, default=5, help='Años de historia (por defecto 5)')
+        parser.add_argument('--prestamos-por-socio', type=float, default=0.8)
+        parser.add_argument('--semilla', type=int, default=1,
+                            help='Con la misma semilla y la misma fecha se generan los mismos datos')
+        parser.add_argument('--hasta', type=date.fromisoformat,
+                            help='Fecha final de los datos (AAAA-MM-DD). Por defecto, hoy.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            resultado = sembrar(
+                socios=options['socios'], anios=options['anios'],
+                prestamos_por_socio=options['prestamos_por_socio'],
+                semilla=options['semilla'], hoy=options['hasta'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Sembrados en {time.perf_counter() - inicio:.1f} s: {resultado.socios} socios, '
+            f'{resultado.movimientos} movimientos, {resultado.prestamos} préstamos, '
+            f'{resultado.pagos} cuotas y {resultado.gastos} gastos.'
+        ))
@@ -0,0 +1,199 @@
+# app_cajaAhorros/medicion_vistas.py
+
+import logging
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from .models import GastosAdministrativos, Movimiento, PagoPrestamo, Prestamo, Socio, Tarea
+
+# Objetos de muestra con los que se arman las URL que llevan parámetros
+Muestras = namedtuple('Muestras', ['socio', 'aporte', 'prestamo', 'pago', 'gasto', 'tarea'])
+
+# Parámetros de cada URL con nombre, a partir de las muestras. Las URL con parámetros que no
+# estén aquí se informan como omitidas: al agregar una vista nueva, agregue también sus parámetros.
+PARAMETROS = {
+    'editar_socio': lambda m: {'pk': m.socio.pk},
+    'eliminar_socio': lambda m: {'pk': m.socio.pk},
+    'detalle_socio': lambda m: {'pk': m.socio.pk},
+    'ver_aportaciones_socio': lambda m: {'socio_id': m.socio.pk},
+    'movimientos_socio': lambda m: {'socio_id': m.socio.pk},
+    'agregar_aporte': lambda m: {'socio_id': m.socio.pk},
+    'exportar_aportaciones_pdf': lambda m: {'socio_id': m.socio.pk},
+    'editar_aporte': lambda m: {'aporte_id': m.aporte.pk},
+    'eliminar_aporte': lambda m: {'aporte_id': m.aporte.pk},
+    'prestamo_edit': lambda m: {'pk': m.prestamo.pk},
+    'pagos_prestamo': lambda m: {'prestamo_id': m.prestamo.pk},
+    'exportar_amortizacion_pdf': lambda m: {'pk': m.prestamo.pk},
+    'exportar_amortizacion_excel': lambda m: {'pk': m.prestamo.pk},
+    'gastos_administrativos_action': lambda m: {'action': 'agregar'},
+    'gasto_editar': lambda m: {'pk': m.gasto.pk},
+    'gastos_administrativos_action_pk': lambda m: {'action': 'editar', 'pk': m.gasto.pk},
+    'estado_tarea': lambda m: {'pk': m.tarea.pk},
+    'analitica': lambda m: {'serie': 'flujo_caja'},
+}
+
+# Vistas que solo aceptan POST: se omiten, la medición solo hace peticiones GET
+SOLO_POST = {'agregar_cargo', 'editar_cargo', 'eliminar_cargo', 'aprobar_prestamo', 'prestamo_rechazado',
+             'registrar_pago'}
+
+# Sin el archivo del resultado generado por el worker la descarga no tiene qué enviar
+OMITIDAS = {'descargar_tarea': 'necesita una tarea terminada'}
+
+
+def rutas_con_nombre(patrones=None):
+    """URL con nombre del proyecto, sin las de aplicaciones incluidas (admin, allauth)."""
+    vistos = set()
+    for patron in patrones if patrones is not None else get_resolver().url_patterns:
+        if isinstance(patron, URLPattern) and patron.name and patron.name not in vistos:
+            vistos.add(patron.name)
+            yield patron
+
+
+def preparar_muestras(usuario):
+    """
+    Elige los objetos más pesados de la base para las URL con parámetros: el socio con más
+    movimientos, el préstamo en curso con más cuotas, etc. El usuario queda enlazado al
+    socio para medir las vistas del propio socio.
+    """
+    socio = Socio.objects.filter(activo=True, user__isnull=True).order_by('-resumen_saldo__numero_movimientos', 'pk').first()
+    if socio is None:
+        raise ValueError('No hay socios para medir; siembre datos con `manage.py sembrar_datos`.')
+    Socio.objects.filter(pk=socio.pk).update(user=usuario)
+    prestamo = Prestamo.objects.filter(estado='Aprobado').order_by('-plazo', 'pk').first()
+    return Muestras(
+        socio=socio,
+        aporte=Movimiento.objects.filter(socio=socio).order_by('-fecha_movimiento', '-id').first(),
+        prestamo=prestamo,
+        pago=PagoPrestamo.objects.filter(prestamo=prestamo, estado=False).order_by('cuota_pago').first() if prestamo else None,
+        gasto=GastosAdministrativos.objects.order_by('-fecha', '-id').first(),
+        tarea=Tarea.objects.create(tipo='exportar_reporte', usuario=usuario),
+    )
+
+
+def _url(patron, muestras):
+    """Devuelve (url, motivo): la URL lista para pedir, o None y el motivo por el que se omite."""
+    if patron.name in SOLO_POST:
+        return None, 'solo acepta POST'
+    if patron.name in OMITIDAS:
+        return None, OMITIDAS[patron.name]
+    if not patron.pattern.regex.groupindex:
+        return reverse(patron.name), None
+    if patron.name not in PARAMETROS:
+        return None, 'sin parámetros de muestra'
+    try:
+        return reverse(patron.name, kwargs=PARAMETROS[patron.name](muestras)), None
+    except AttributeError:
+        return None, 'no hay datos de muestra'
+
+
+class _MedidorSQL:
+    """Envoltorio de ejecución que cuenta las consultas y suma su tiempo con precisión de reloj."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _pedir(cliente, url):
+    medidor = _MedidorSQL()
+    with connection.execute_wrapper(medidor):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(url)
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        tiempo = time.perf_counter() - inicio
+    return respuesta.status_code, tiempo, medidor.consultas, medidor.tiempo
+
+
+@contextmanager
+def _sin_registro_de_errores():
+    registro = logging.getLogger('django.request')
+    nivel = registro.level
+    registro.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        registro.setLevel(nivel)
+
+
+def medir_vistas(repeticiones=5, solo=None):
+    """
+    Pide cada URL del proyecto con el cliente de pruebas, como superusuario, y devuelve
+    {nombre: datos}. La primera petición de cada URL se mide aparte (cachés frías);
+    de las siguientes se guarda el menor tiempo total y en SQL, que es el que menos
+    varía entre corridas.
+    Llamar dentro de una transacción que se revierta: crea el usuario y una tarea de muestra.
+    """
+    usuario = User.objects.create_superuser('benchmark-vistas', 'benchmark@ejemplo.com', None)
+    muestras = preparar_muestras(usuario)
+    cliente = Client(raise_request_exception=False)
+    cliente.force_login(usuario)
+
+    resultados = {}
+    for patron in rutas_con_nombre():
+        if solo and patron.name not in solo:
+            continue
+        url, motivo = _url(patron, muestras)
+        if url is None:
+            resultados[patron.name] = {'omitida': motivo}
+            continue
+        # El cliente de pruebas se presenta como 'testserver'. Los errores 500 quedan en el estado
+        # de la vista en lugar de repetir la traza en cada petición.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), _sin_registro_de_errores():
+            estado, frio, _, _ = _pedir(cliente, url)
+            medidas = [_pedir(cliente, url) for _ in range(repeticiones)]
+        resultados[patron.name] = {
+            'url': url,
+            'estado': estado,
+            'tiempo_frio_ms': round(frio * 1000, 2),
+            'tiempo_ms': round(min(m[1] for m in medidas) * 1000, 2),
+            'consultas': max(m[2] for m in medidas),
+            'tiempo_sql_ms': round(min(m[3] for m in medidas) * 1000, 2),
+        }
+    return resultados
+
+
+def volumen_de_datos():
+    """Cantidad de filas de las tablas principales, para saber si dos corridas son comparables."""
+    return {
+        'socios': Socio.objects.count(),
+        'movimientos': Movimiento.objects.count(),
+        'prestamos': Prestamo.objects.count(),
+        'pagos': PagoPrestamo.objects.count(),
+        'gastos': GastosAdministrativos.objects.count(),
+    }
+
+
+def comparar(actual, anterior, umbral=0.2, minimo_ms=5.0):
+    """
+    Compara dos corridas ({nombre: datos}) y devuelve las regresiones como (nombre, descripción).
+    Es regresión una vista con más consultas que antes, o más lenta que antes en más del
+    `umbral` (fracción) y en más de `minimo_ms` milisegundos (para no marcar el ruido de las vistas rápidas).
+    """
+    regresiones = []
+    for nombre, dato in actual.items():
+        previo = anterior.get(nombre)
+        if not previo or 'omitida' in dato or 'omitida' in previo:
+            continue
+        if dato['consultas'] > previo['consultas']:
+            regresiones.append((nombre, f"consultas {previo['consultas']} -> {dato['consultas']}"))
+        if (dato['tiempo_ms'] > previo['tiempo_ms'] * (1 + umbral)
+                and dato['tiempo_ms'] - previo['tiempo_ms'] > minimo_ms):
+            regresiones.append((nombre, f"tiempo {previo['tiempo_ms']:.1f} ms -> {dato['tiempo_ms']:.1f} ms"))
+    return regresiones
@@ -0,0 +1,192 @@
+# app_cajaAhorros/middleware.py
+
+import logging
+import re
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve, reverse
+
+from .models import Perfil
+from .perfilado import PARAMETRO, Perfilado, toca_muestreo
+
+logger = logging.getLogger('app_cajaAhorros.peticiones_lentas')
+
+# Una consulta que se repite al menos estas veces en la misma petición se informa como repetida
+# (casi siempre es un bucle que consulta fila por fila: N+1)
+MINIMO_REPETIDAS = 3
+
+# Consultas que se escriben en el registro de peticiones lentas
+CONSULTAS_EN_REGISTRO = 5
+
+_medicion_actual = ContextVar('medicion_peticion', default=None)
+
+_ESPACIOS = re.compile(r'\s+')
+
+
+class MedicionPeticion:
+    """Tiempos y consultas de una petición. También es el envoltorio de ejecución de las conexiones."""
+
+    __slots__ = ('inicio', 'total', 'consultas', 'tiempo_sql', 'tiempo_plantillas', 'en_plantilla', 'por_sql')
+
+    def __init__(self):
+        self.inicio = perf_counter()
+        self.total = 0.0
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.en_plantilla = False
+        # SQL con los parámetros sin reemplazar (la huella de la consulta) -> [veces, tiempo]
+        self.por_sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_sql += duracion
+            acumulado = self.por_sql.get(sql)
+            if acumulado is None:
+                self.por_sql[sql] = [1, duracion]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += duracion
+
+    def repetidas(self):
+        """Huellas ejecutadas MINIMO_REPETIDAS veces o más, de la más repetida a la menos."""
+        return sorted(
+            ((sql, veces, tiempo) for sql, (veces, tiempo) in self.por_sql.items() if veces >= MINIMO_REPETIDAS),
+            key=lambda fila: -fila[1],
+        )
+
+    def mas_costosas(self, cantidad=CONSULTAS_EN_REGISTRO):
+        return sorted(
+            ((sql, veces, tiempo) for sql, (veces, tiempo) in self.por_sql.items()),
+            key=lambda fila: -fila[2],
+        )[:cantidad]
+
+    def server_timing(self):
+        metricas = [
+            f'total;dur={self.total * 1000:.1f}',
+            f'sql;dur={self.tiempo_sql * 1000:.1f};desc="{self.consultas} consultas"',
+            f'plantillas;dur={self.tiempo_plantillas * 1000:.1f}',
+        ]
+        repetidas = self.repetidas()
+        if repetidas:
+            metricas.append(f'repetidas;desc="{len(repetidas)} consultas repetidas, hasta {repetidas[0][1]} veces"')
+        return ', '.join(metricas)
+
+
+def medir_plantilla(render, *args, **kwargs):
+    """
+    Llama a `render` sumando su tiempo al de plantillas de la petición en curso, si la hay.
+    Solo cuenta el render de nivel superior (no el de una plantilla dentro de otra).
+    Lo usa el motor de plantillas de plantillas.py.
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None or medicion.en_plantilla:
+        return render(*args, **kwargs)
+    medicion.en_plantilla = True
+    inicio = perf_counter()
+    try:
+        return render(*args, **kwargs)
+    finally:
+        medicion.tiempo_plantillas += perf_counter() - inicio
+        medicion.en_plantilla = False
+
+
+def _sql_resumido(sql, largo=300):
+    sql = _ESPACIOS.sub(' ', sql)
+    return sql if len(sql) <= largo else sql[:largo] + '...'
+
+
+class MedicionPeticionesMiddleware:
+    """
+    Mide cada petición: tiempo total, de plantillas, número y tiempo de consultas SQL, y las
+    consultas repetidas. Agrega la cabecera Server-Timing (en DEBUG o para usuarios del staff)
+    y registra en 'app_cajaAhorros.peticiones_lentas' las que superan PETICIONES_LENTAS_MS,
+    con sus consultas más costosas. Por consulta solo cuesta dos lecturas del reloj y una
+    entrada de diccionario, así que puede quedar activo en producción.
+    Debe ir primero en MIDDLEWARE para que el tiempo total incluya a los demás. El tiempo
+    de plantillas solo se mide con el motor de plantillas.PlantillasMedidas en TEMPLATES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.umbral = getattr(settings, 'PETICIONES_LENTAS_MS', 500) / 1000
+
+    def __call__(self, request):
+        medicion = MedicionPeticion()
+        request.medicion = medicion
+        marca = _medicion_actual.set(medicion)
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(marca)
+        medicion.total = perf_counter() - medicion.inicio
+
+        if settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False):
+            response['Server-Timing'] = medicion.server_timing()
+        if medicion.total >= self.umbral:
+            self._registrar_lenta(request, response, medicion)
+        return response
+
+    def _registrar_lenta(self, request, response, medicion):
+        vista = request.resolver_match.view_name if request.resolver_match else '-'
+        lineas = [
+            f'{request.method} {request.get_full_path()} vista={vista} estado={response.status_code} '
+            f'total={medicion.total * 1000:.0f}ms sql={medicion.tiempo_sql * 1000:.0f}ms '
+            f'consultas={medicion.consultas} plantillas={medicion.tiempo_plantillas * 1000:.0f}ms'
+        ]
+        for sql, veces, tiempo in medicion.mas_costosas():
+            lineas.append(f'  {tiempo * 1000:8.1f}ms {veces:4}x  {_sql_resumido(sql)}')
+        for sql, veces, tiempo in medicion.repetidas():
+            lineas.append(f'  repetida {veces}x ({tiempo * 1000:.1f}ms)  {_sql_resumido(sql)}')
+        logger.warning('\n'.join(lineas))
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila la petición con cProfile y tracemalloc (ver perfilado.py) cuando un usuario del
+    staff agrega ?perfilar=1 a la URL, o cuando le toca por PERFILADO_MUESTREO. El perfil
+    queda en el admin; a quien lo pidió se le indica en la cabecera Perfil.
+    Debe ir después de AuthenticationMiddleware, para conocer al usuario.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        motivo = self._motivo(request)
+        if motivo is None:
+            return self.get_response(request)
+
+        perfilado = Perfilado(_nombre_vista(request), Perfil.PETICION, motivo,
+                              ruta=f'{request.method} {request.get_full_path()}', usuario=request.user)
+        with perfilado:
+            response = self.get_response(request)
+        if motivo == Perfil.PARAMETRO and perfilado.perfil is not None:
+            response['Perfil'] = reverse('admin:app_cajaAhorros_perfil_change', args=[perfilado.perfil.pk])
+        return response
+
+    def _motivo(self, request):
+        if request.GET.get(PARAMETRO) and getattr(request.user, 'is_staff', False):
+            return Perfil.PARAMETRO
+        if getattr(settings, 'PERFILADO_MUESTREO', 0) and toca_muestreo(_nombre_vista(request)):
+            return Perfil.MUESTREO
+        return None
+
+
+def _nombre_vista(request):
+    try:
+        return resolve(request.path_info).view_name
+    except Resolver404:
+        return request.path_info
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def poblar_saldos(apps, schema_editor):
+    Movimiento = apps.get_model('app_cajaAhorros', 'Movimiento')
+    SaldoSocio = apps.get_model('app_cajaAhorros', 'SaldoSocio')
+    totales = Movimiento.objects.values('socio_id').annotate(
+        total_aportes=models.Sum('entrada'),
+        total_retiros=models.Sum('salida'),
+        ultimo_movimiento=models.Max('fecha_movimiento'),
+        numero_movimientos=models.Count('id'),
+    ).order_by()
+    SaldoSocio.objects.bulk_create([
+        SaldoSocio(
+            socio_id=fila['socio_id'],
+            total_aportes=fila['total_aportes'] or 0,
+            total_retiros=fila['total_retiros'] or 0,
+            saldo=(fila['total_aportes'] or 0) - (fila['total_retiros'] or 0),
+            ultimo_movimiento=fila['ultimo_movimiento'],
+            numero_movimientos=fila['numero_movimientos'],
+        )
+        for fila in totales
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0013_delete_rol'),
+        ('app_cajaAhorros', '0013_socio_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoSocio',
+            fields=[
+                ('socio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_saldo', serialize=False, to='app_cajaAhorros.socio')),
+                ('total_aportes', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_retiros', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ultimo_movimiento', models.DateField(blank=True, null=True)),
+                ('numero_movimientos', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(poblar_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def marcar_terminados(apps, schema_editor):
+    # Los préstamos ya terminados repartieron su interés con la lógica anterior
+    Prestamo = apps.get_model('app_cajaAhorros', 'Prestamo')
+    Prestamo.objects.filter(estado='Terminado').update(interes_distribuido=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0014_saldosocio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prestamo',
+            name='interes_distribuido',
+            field=models.BooleanField(default=False, help_text='Indica si el interés ya se repartió entre los socios'),
+        ),
+        migrations.RunPython(marcar_terminados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def poblar_resumen(apps, schema_editor):
+    Movimiento = apps.get_model('app_cajaAhorros', 'Movimiento')
+    Prestamo = apps.get_model('app_cajaAhorros', 'Prestamo')
+    PagoPrestamo = apps.get_model('app_cajaAhorros', 'PagoPrestamo')
+    ResumenMensual = apps.get_model('app_cajaAhorros', 'ResumenMensual')
+    meses = {}
+
+    def fila(mes):
+        return meses.setdefault(mes, ResumenMensual(mes=mes))
+
+    for total in (Movimiento.objects.annotate(m=TruncMonth('fecha_movimiento')).values('m')
+                  .annotate(entradas=models.Sum('entrada'), salidas=models.Sum('salida')).order_by()):
+        resumen = fila(total['m'])
+        resumen.entradas = total['entradas'] or 0
+        resumen.salidas = total['salidas'] or 0
+
+    for total in (Prestamo.objects.filter(fecha_prestamo__isnull=False)
+                  .annotate(m=TruncMonth('fecha_prestamo')).values('m')
+                  .annotate(cantidad=models.Count('id')).order_by()):
+        fila(total['m']).prestamos_nuevos = total['cantidad']
+
+    for total in (Prestamo.objects.filter(estado__in=['Aprobado', 'Terminado'], fecha_aprobacion__isnull=False)
+                  .annotate(m=TruncMonth('fecha_aprobacion')).values('m')
+                  .annotate(cantidad=models.Count('id'), monto=models.Sum('cantidad_aprobada')).order_by()):
+        resumen = fila(total['m'])
+        resumen.prestamos_aprobados = total['cantidad']
+        resumen.monto_aprobado = total['monto'] or 0
+
+    for total in (PagoPrestamo.objects.filter(estado=True, fecha_pago__isnull=False)
+                  .annotate(m=TruncMonth('fecha_pago')).values('m')
+                  .annotate(cantidad=models.Count('id'), monto=models.Sum('valor_cuota_pago')).order_by()):
+        resumen = fila(total['m'])
+        resumen.cuotas_cobradas = total['cantidad']
+        resumen.monto_cobrado = total['monto'] or 0
+
+    ResumenMensual.objects.bulk_create(meses.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0015_prestamo_interes_distribuido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes', unique=True)),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('salidas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('prestamos_nuevos', models.PositiveIntegerField(default=0)),
+                ('prestamos_aprobados', models.PositiveIntegerField(default=0)),
+                ('monto_aprobado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cuotas_cobradas', models.PositiveIntegerField(default=0)),
+                ('monto_cobrado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
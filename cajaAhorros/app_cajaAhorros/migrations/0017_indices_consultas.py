@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0016_resumenmensual'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['socio', 'fecha_movimiento'], name='movimiento_socio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(condition=models.Q(('entrada__gt', 0)), fields=['socio', 'fecha_movimiento'], name='movimiento_aporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['estado'], name='prestamo_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['garante', 'estado'], name='prestamo_garante_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagoprestamo',
+            index=models.Index(fields=['prestamo', 'estado'], name='pago_prestamo_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagoprestamo',
+            index=models.Index(condition=models.Q(('estado', False)), fields=['fecha_a_pagar'], name='pago_pendiente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastosadministrativos',
+            index=models.Index(fields=['fecha'], name='gasto_fecha_idx'),
+        ),
+    ]
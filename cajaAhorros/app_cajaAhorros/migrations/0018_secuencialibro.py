@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def crear_secuencia_gastos(apps, schema_editor):
+    GastosAdministrativos = apps.get_model('app_cajaAhorros', 'GastosAdministrativos')
+    SecuenciaLibro = apps.get_model('app_cajaAhorros', 'SecuenciaLibro')
+    SecuenciaLibro.objects.create(libro='gastos', ultimo=GastosAdministrativos.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0017_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaLibro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('libro', models.CharField(max_length=50, unique=True)),
+                ('ultimo', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(crear_secuencia_gastos, migrations.RunPython.noop),
+    ]
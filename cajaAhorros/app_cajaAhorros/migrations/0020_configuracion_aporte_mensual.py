@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0019_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracion',
+            name='aporte_mensual',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Monto propuesto al registrar los aportes del mes', max_digits=12),
+        ),
+    ]
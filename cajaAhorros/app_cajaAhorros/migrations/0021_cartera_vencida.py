@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0020_configuracion_aporte_mensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteCartera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('version', models.CharField(blank=True, help_text='Versión de los pagos con la que se calculó', max_length=64)),
+                ('generado', models.DateTimeField(auto_now=True)),
+                ('monto_1_30', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_mas_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cuotas_vencidas', models.PositiveIntegerField(default=0)),
+                ('prestamos_vencidos', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CarteraPrestamo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto_1_30', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monto_mas_90', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cuotas_vencidas', models.PositiveIntegerField(default=0)),
+                ('dias_atraso', models.PositiveIntegerField(default=0, help_text='Días de atraso de la cuota vencida más antigua')),
+                ('corte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prestamos', to='app_cajaAhorros.cortecartera')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cartera', to='app_cajaAhorros.prestamo')),
+                ('socio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cartera', to='app_cajaAhorros.socio')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('corte', 'prestamo'), name='cartera_corte_prestamo_unica')],
+            },
+        ),
+    ]
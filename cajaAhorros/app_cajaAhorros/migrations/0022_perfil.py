@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0021_cartera_vencida'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='perfilar',
+            field=models.BooleanField(default=False, help_text='Se encoló desde una petición perfilada: se perfila también'),
+        ),
+        migrations.CreateModel(
+            name='Perfil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Vista o tipo de tarea', max_length=200)),
+                ('origen', models.CharField(choices=[('Petición', 'Petición'), ('Tarea', 'Tarea')], max_length=20)),
+                ('motivo', models.CharField(choices=[('Parámetro', 'Pedido con ?perfilar=1'), ('Muestreo', 'Muestreo')], max_length=20)),
+                ('ruta', models.CharField(blank=True, help_text='Método y URL de la petición, o número de la tarea', max_length=500)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('duracion_ms', models.FloatField()),
+                ('memoria_pico_kb', models.PositiveIntegerField(help_text='Pico de memoria asignada durante la ejecución')),
+                ('memoria_detalle', models.TextField(blank=True, help_text='Líneas que más memoria dejaron asignada al terminar')),
+                ('archivo', models.FileField(help_text='Estadísticas de cProfile (pstats)', upload_to='perfiles/')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='perfiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'perfiles',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
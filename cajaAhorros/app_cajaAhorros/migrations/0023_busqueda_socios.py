@@ -0,0 +1,49 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+TABLA = 'app_cajaAhorros_socio_busqueda'
+
+
+def crear_indice(apps, schema_editor):
+    """
+    Índice de texto completo de los socios (ver busqueda.py). Solo en SQLite con FTS5; en otras
+    bases, o si el SQLite no trae FTS5, la búsqueda usa LIKE y esta migración no hace nada.
+    """
+    conexion = schema_editor.connection
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        try:
+            with transaction.atomic(using=conexion.alias):
+                # remove_diacritics: "perez" encuentra a "Pérez"; prefix: índices para prefijos cortos
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {TABLA} USING fts5("
+                    "cedula, nombre, apellido, email, telefono, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+                )
+        except OperationalError:
+            return
+        # Pesos de bm25 por columna para el orden por relevancia (rank)
+        cursor.execute(f"INSERT INTO {TABLA} ({TABLA}, rank) VALUES ('rank', 'bm25(10.0, 4.0, 5.0, 2.0, 3.0)')")
+        cursor.execute(
+            f"INSERT INTO {TABLA} (rowid, cedula, nombre, apellido, email, telefono) "
+            "SELECT id, cedula, nombre, apellido, COALESCE(email, ''), COALESCE(telefono, '') "
+            "FROM app_cajaAhorros_socio"
+        )
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0022_perfil'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
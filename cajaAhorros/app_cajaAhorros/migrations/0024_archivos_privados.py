@@ -0,0 +1,22 @@
+import app_cajaAhorros.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0023_busqueda_socios'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarea',
+            name='resultado',
+            field=models.FileField(blank=True, null=True, storage=app_cajaAhorros.almacenamiento.AlmacenPrivado(), upload_to='tareas/'),
+        ),
+        migrations.AlterField(
+            model_name='perfil',
+            name='archivo',
+            field=models.FileField(help_text='Estadísticas de cProfile (pstats)', storage=app_cajaAhorros.almacenamiento.AlmacenPrivado(), upload_to='perfiles/'),
+        ),
+    ]
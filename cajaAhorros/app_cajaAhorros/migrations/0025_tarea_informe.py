@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cajaAhorros', '0024_archivos_privados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='informe',
+            field=models.JSONField(blank=True, default=dict, help_text='Resumen que la tarea muestra en su página de estado'),
+        ),
+    ]
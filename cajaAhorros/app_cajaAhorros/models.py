@@ -1,5 +1,9 @@
-from django.db import models
+from datetime import date
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .almacenamiento import almacen_privado
 class Rol(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
     descripcion = models.TextField(blank=True, null=True)
@@ -34,10 +38,60 @@ class Movimiento(models.Model):
     saldo = models.DecimalField(max_digits=12, decimal_places=2)
     fecha_movimiento = models.DateField()
 
+    class Meta:
+        indexes = [
+            # Historial del socio ordenado por fecha (aportaciones, perfil, saldos)
+            models.Index(fields=['socio', 'fecha_movimiento'], name='movimiento_socio_fecha_idx'),
+            # Solo los aportes: morosidad y meses con aporte
+            models.Index(fields=['socio', 'fecha_movimiento'], condition=models.Q(entrada__gt=0), name='movimiento_aporte_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # El resumen de saldos del socio y el saldo acumulado de los movimientos posteriores
+        # se actualizan en la misma transacción que el movimiento
+        from .libros import bloquear_socio
+        from .saldos import actualizar_resumen, recalcular_saldos
+        with transaction.atomic():
+            bloquear_socio(self.socio_id)
+            anterior = Movimiento.objects.filter(pk=self.pk).first() if self.pk else None
+            super().save(*args, **kwargs)
+            actualizar_resumen(agregados=[self], quitados=[anterior] if anterior else [])
+
+            desde = self._meta.get_field('fecha_movimiento').to_python(self.fecha_movimiento)
+            if anterior and anterior.socio_id != self.socio_id:
+                bloquear_socio(anterior.socio_id)
+                recalcular_saldos(anterior.socio_id, anterior.fecha_movimiento)
+            elif anterior:
+                desde = min(desde, anterior.fecha_movimiento)
+            recalcular_saldos(self.socio_id, desde)
+
+    def delete(self, *args, **kwargs):
+        from .libros import bloquear_socio
+        from .saldos import actualizar_resumen, recalcular_saldos
+        with transaction.atomic():
+            bloquear_socio(self.socio_id)
+            resultado = super().delete(*args, **kwargs)
+            actualizar_resumen(quitados=[self])
+            recalcular_saldos(self.socio_id, self.fecha_movimiento)
+        return resultado
+
     def __str__(self):
         return f"Movimiento {self.pk} - Socio: {self.socio.nombre} - {self.fecha_movimiento}"
 
 
+class SaldoSocio(models.Model):
+    """Resumen materializado de los movimientos de un socio, para leer su saldo sin recorrer el historial."""
+    socio = models.OneToOneField(Socio, on_delete=models.CASCADE, primary_key=True, related_name='resumen_saldo')
+    total_aportes = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_retiros = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ultimo_movimiento = models.DateField(blank=True, null=True)
+    numero_movimientos = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Saldo de {self.socio_id}: {self.saldo}"
+
+
 class Cargo(models.Model):
     nombre_cargo = models.CharField(max_length=100)
     estado = models.BooleanField(default=True)
@@ -68,6 +122,7 @@ class Configuracion(models.Model):
     tasa_interes = models.DecimalField(max_digits=5, decimal_places=2)   
     plazo_maximo = models.IntegerField()
     aporte_inicial = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    aporte_mensual = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Monto propuesto al registrar los aportes del mes")
     gastos_adm = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     tasa_prestamo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     def __str__(self):
@@ -94,6 +149,13 @@ class Prestamo(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default='Solicitado')
     nota = models.TextField(blank=True, null=True)
     fecha_aprobacion = models.DateField(blank=True, null=True)
+    interes_distribuido = models.BooleanField(default=False, help_text="Indica si el interés ya se repartió entre los socios")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado'], name='prestamo_estado_idx'),
+            models.Index(fields=['garante', 'estado'], name='prestamo_garante_estado_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         
@@ -116,6 +178,14 @@ class PagoPrestamo(models.Model):
     detalle_pago = models.TextField(blank=True, null=True)
     comprobante_pago = models.ImageField(upload_to='comprobante_pago/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['prestamo', 'estado'], name='pago_prestamo_estado_idx'),
+            # Django escribe estado=False como NOT "estado", que no aprovecha un índice que empiece
+            # por estado; las cuotas pendientes se indexan con un índice parcial por fecha.
+            models.Index(fields=['fecha_a_pagar'], condition=models.Q(estado=False), name='pago_pendiente_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Pago {self.pk} - Prestamo {self.prestamo.pk} - Cuota {self.cuota_pago}"  
     
@@ -127,5 +197,163 @@ class GastosAdministrativos(models.Model):
     salida = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     saldo = models.DecimalField(max_digits=12, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha'], name='gasto_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Gasto Administrativo {self.pk} - {self.fecha}"
+
+
+class SecuenciaLibro(models.Model):
+    """Contador de asientos de un libro; su fila sirve de candado para registrar en orden."""
+    libro = models.CharField(max_length=50, unique=True)
+    ultimo = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.libro}: {self.ultimo}"
+
+
+class ResumenMensual(models.Model):
+    """Totales por mes que alimentan el panel de control sin recorrer las tablas de movimientos."""
+    mes = models.DateField(unique=True, help_text="Primer día del mes")
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    salidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    prestamos_nuevos = models.PositiveIntegerField(default=0)
+    prestamos_aprobados = models.PositiveIntegerField(default=0)
+    monto_aprobado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cuotas_cobradas = models.PositiveIntegerField(default=0)
+    monto_cobrado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Resumen {self.mes:%m/%Y}"
+
+
+class Tarea(models.Model):
+    """Trabajo pesado que se ejecuta fuera de la petición con el comando procesar_tareas."""
+    PENDIENTE = 'Pendiente'
+    EN_PROCESO = 'En proceso'
+    TERMINADA = 'Terminada'
+    FALLIDA = 'Fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (TERMINADA, 'Terminada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=3)
+    ejecutar_desde = models.DateTimeField(default=timezone.now, help_text="No se toma antes de esta hora (reintentos)")
+    resultado = models.FileField(upload_to='tareas/', storage=almacen_privado, blank=True, null=True)
+    perfilar = models.BooleanField(default=False, help_text="Se encoló desde una petición perfilada: se perfila también")
+    nombre_resultado = models.CharField(max_length=200, blank=True)
+    informe = models.JSONField(default=dict, blank=True, help_text="Resumen que la tarea muestra en su página de estado")
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(blank=True, null=True)
+    terminada = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_desde'], name='tarea_estado_fecha_idx'),
+        ]
+
+    @property
+    def finalizada(self):
+        return self.estado in (self.TERMINADA, self.FALLIDA)
+
+    def __str__(self):
+        return f"Tarea {self.pk} - {self.tipo} ({self.estado})"
+
+
+class CorteCartera(models.Model):
+    """
+    Foto diaria de la cartera vencida: cuotas impagas cuya fecha de pago ya pasó, por tramos de días
+    de atraso. Se recalcula cuando cambian los pagos (ver cartera.programar_corte).
+    """
+    fecha = models.DateField(unique=True)
+    version = models.CharField(max_length=64, blank=True, help_text="Versión de los pagos con la que se calculó")
+    generado = models.DateTimeField(auto_now=True)
+    monto_1_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_31_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_61_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_mas_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cuotas_vencidas = models.PositiveIntegerField(default=0)
+    prestamos_vencidos = models.PositiveIntegerField(default=0)
+
+    @property
+    def total_vencido(self):
+        return self.monto_1_30 + self.monto_31_60 + self.monto_61_90 + self.monto_mas_90
+
+    @property
+    def desactualizado(self):
+        """El corte es de un día anterior: sus días de atraso ya no corresponden a hoy."""
+        return self.fecha < date.today()
+
+    def __str__(self):
+        return f"Cartera vencida al {self.fecha:%d/%m/%Y}"
+
+
+class CarteraPrestamo(models.Model):
+    """Detalle del corte de cartera: lo vencido de un préstamo en cada tramo."""
+    corte = models.ForeignKey(CorteCartera, on_delete=models.CASCADE, related_name='prestamos')
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='cartera')
+    socio = models.ForeignKey(Socio, on_delete=models.CASCADE, related_name='cartera')
+    monto_1_30 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_31_60 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_61_90 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    monto_mas_90 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cuotas_vencidas = models.PositiveIntegerField(default=0)
+    dias_atraso = models.PositiveIntegerField(default=0, help_text="Días de atraso de la cuota vencida más antigua")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['corte', 'prestamo'], name='cartera_corte_prestamo_unica'),
+        ]
+
+    @property
+    def total_vencido(self):
+        return self.monto_1_30 + self.monto_31_60 + self.monto_61_90 + self.monto_mas_90
+
+    def __str__(self):
+        return f"Cartera {self.corte.fecha:%d/%m/%Y} - Prestamo {self.prestamo_id}"
+
+
+class Perfil(models.Model):
+    """Perfil de CPU (cProfile) y memoria (tracemalloc) de una petición o una tarea, ver perfilado.py."""
+    PETICION = 'Petición'
+    TAREA = 'Tarea'
+    ORIGENES = [
+        (PETICION, 'Petición'),
+        (TAREA, 'Tarea'),
+    ]
+    PARAMETRO = 'Parámetro'
+    MUESTREO = 'Muestreo'
+    MOTIVOS = [
+        (PARAMETRO, 'Pedido con ?perfilar=1'),
+        (MUESTREO, 'Muestreo'),
+    ]
+
+    nombre = models.CharField(max_length=200, help_text="Vista o tipo de tarea")
+    origen = models.CharField(max_length=20, choices=ORIGENES)
+    motivo = models.CharField(max_length=20, choices=MOTIVOS)
+    ruta = models.CharField(max_length=500, blank=True, help_text="Método y URL de la petición, o número de la tarea")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='perfiles')
+    creado = models.DateTimeField(auto_now_add=True)
+    duracion_ms = models.FloatField()
+    memoria_pico_kb = models.PositiveIntegerField(help_text="Pico de memoria asignada durante la ejecución")
+    memoria_detalle = models.TextField(blank=True, help_text="Líneas que más memoria dejaron asignada al terminar")
+    archivo = models.FileField(upload_to='perfiles/', storage=almacen_privado, help_text="Estadísticas de cProfile (pstats)")
+
+    class Meta:
+        ordering = ['-creado']
+        verbose_name_plural = 'perfiles'
+
+    def __str__(self):
+        return f"Perfil {self.pk} - {self.nombre} ({self.duracion_ms:.0f} ms)"
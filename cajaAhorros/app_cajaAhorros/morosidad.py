@@ -0,0 +1,76 @@
+# app_cajaAhorros/morosidad.py
+
+from datetime import date
+
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, Min, Q, Value
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncMonth
+from dateutil.relativedelta import relativedelta
+
+from .models import Movimiento
+
+
+def anotar_morosidad(socios, hoy=None):
+    """
+    Anota cada socio con su primer mes de aporte, los meses distintos en los que
+    aportó y los meses que le faltan hasta el mes actual.
+    Todo se resuelve en una sola consulta agrupada, sin recorrer socios en Python.
+    """
+    mes_actual = (hoy or date.today()).replace(day=1)
+    mes_siguiente = mes_actual + relativedelta(months=1)
+    con_aporte = Q(movimientos__entrada__gt=0)
+
+    return socios.annotate(
+        primer_aporte=Min('movimientos__fecha_movimiento', filter=con_aporte),
+        meses_aportados=Count(
+            TruncMonth('movimientos__fecha_movimiento'),
+            filter=con_aporte & Q(movimientos__fecha_movimiento__lt=mes_siguiente),
+            distinct=True,
+        ),
+    ).annotate(
+        # Meses desde el primer aporte hasta el mes actual (inclusive) menos los meses con aporte.
+        meses_faltantes=ExpressionWrapper(
+            Value(mes_actual.year * 12 + mes_actual.month + 1)
+            - ExtractYear('primer_aporte') * 12
+            - ExtractMonth('primer_aporte')
+            - F('meses_aportados'),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def filtrar_por_estado(socios, filtro, hoy=None):
+    """
+    Aplica el filtro 'al_dia' / 'deudores' de la lista de socios en la base de datos.
+    Un socio sin aportes se considera deudor.
+    """
+    if filtro == 'al_dia':
+        return anotar_morosidad(socios, hoy).filter(meses_faltantes__lte=0)
+    if filtro == 'deudores':
+        return anotar_morosidad(socios, hoy).filter(Q(primer_aporte__isnull=True) | Q(meses_faltantes__gt=0))
+    return socios
+
+
+def meses_faltantes(socio, hoy=None):
+    """
+    Meses sin aporte desde el primer movimiento del socio hasta el mes actual.
+    Una sola consulta agrupada por mes; su tamaño depende de los meses, no de los movimientos.
+    """
+    meses = (
+        Movimiento.objects.filter(socio=socio)
+        .annotate(mes=TruncMonth('fecha_movimiento')).values('mes')
+        .annotate(mayor_entrada=Max('entrada')).order_by('mes')
+        .values_list('mes', 'mayor_entrada')
+    )
+    meses = list(meses)
+    if not meses:
+        return []
+    con_aporte = set(mes for mes, mayor_entrada in meses if mayor_entrada and mayor_entrada > 0)
+
+    faltantes = []
+    actual = meses[0][0]
+    fin = (hoy or date.today()).replace(day=1)
+    while actual <= fin:
+        if actual not in con_aporte:
+            faltantes.append(actual.strftime('%B %Y'))
+        actual += relativedelta(months=1)
+    return faltantes
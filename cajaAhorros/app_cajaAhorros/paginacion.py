@@ -0,0 +1,108 @@
+# app_cajaAhorros/paginacion.py
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+TAMANO_PAGINA = 20
+
+_SAL = 'app_cajaAhorros.paginacion'
+
+
+class PaginaKeyset:
+    """
+    Página obtenida por clave (keyset): en lugar de OFFSET se filtra a partir de los
+    valores de orden de la última fila vista, así el costo no crece con el número de página.
+    """
+
+    def __init__(self, objetos, siguiente=None, anterior=None):
+        self.objetos = objetos
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def has_next(self):
+        return self.siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.anterior is not None
+
+
+def _campo(queryset, nombre):
+    if nombre in queryset.query.annotations:
+        return queryset.query.annotations[nombre].output_field
+    return queryset.model._meta.get_field(nombre)
+
+
+def _valores(objeto, campos):
+    return [getattr(objeto, nombre) for nombre, _ in campos]
+
+
+def codificar_cursor(valores):
+    return signing.dumps([None if v is None else str(v) for v in valores], salt=_SAL)
+
+
+def decodificar_cursor(queryset, campos, cursor):
+    """Devuelve los valores del cursor convertidos al tipo de cada campo, o None si no es válido."""
+    try:
+        crudos = signing.loads(cursor, salt=_SAL)
+    except signing.BadSignature:
+        return None
+    if not isinstance(crudos, list) or len(crudos) != len(campos):
+        return None
+    try:
+        return [_campo(queryset, nombre).to_python(valor) for (nombre, _), valor in zip(campos, crudos)]
+    except ValidationError:
+        return None
+
+
+def _despues_de(campos, valores, hacia_atras=False):
+    """
+    Condición "viene después de `valores`" para el orden dado:
+    (a > x) OR (a = x AND b > y) OR ...  respetando la dirección de cada campo.
+    """
+    condicion = Q()
+    iguales = Q()
+    for (nombre, descendente), valor in zip(campos, valores):
+        menor = descendente != hacia_atras
+        condicion |= iguales & Q(**{f'{nombre}__{"lt" if menor else "gt"}': valor})
+        iguales &= Q(**{nombre: valor})
+    return condicion
+
+
+def paginar_por_clave(queryset, orden, despues=None, antes=None, tamano=TAMANO_PAGINA):
+    """
+    Pagina `queryset` según `orden` (lista de campos, con '-' para descendente; el último
+    debe ser único, normalmente 'id'). Los campos de orden no pueden ser nulos: para columnas
+    que admiten NULL conviene anotar antes un Coalesce.
+    `despues` y `antes` son los cursores recibidos de una página anterior.
+    """
+    campos = [(nombre.lstrip('-'), nombre.startswith('-')) for nombre in orden]
+    invertido = ['%s%s' % ('' if desc else '-', nombre) for nombre, desc in campos]
+
+    valores_antes = decodificar_cursor(queryset, campos, antes) if antes else None
+    valores_despues = decodificar_cursor(queryset, campos, despues) if despues and not valores_antes else None
+
+    if valores_antes:
+        filas = list(queryset.filter(_despues_de(campos, valores_antes, hacia_atras=True)).order_by(*invertido)[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        anterior = codificar_cursor(_valores(filas[0], campos)) if hay_mas and filas else None
+        siguiente = codificar_cursor(_valores(filas[-1], campos)) if filas else None
+        return PaginaKeyset(filas, siguiente, anterior)
+
+    if valores_despues:
+        queryset = queryset.filter(_despues_de(campos, valores_despues))
+    filas = list(queryset.order_by(*orden)[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    siguiente = codificar_cursor(_valores(filas[-1], campos)) if hay_mas else None
+    anterior = codificar_cursor(_valores(filas[0], campos)) if valores_despues and filas else None
+    return PaginaKeyset(filas, siguiente, anterior)
@@ -0,0 +1,137 @@
+# app_cajaAhorros/perfilado.py
+
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import threading
+import tracemalloc
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .models import Perfil
+
+logger = logging.getLogger(__name__)
+
+# Parámetro de la URL con el que un usuario del staff pide perfilar una petición
+PARAMETRO = 'perfilar'
+
+# Líneas del detalle de memoria y funciones del reporte que se muestra en el admin
+LINEAS_MEMORIA = 15
+FUNCIONES_EN_REPORTE = 40
+
+# cProfile y tracemalloc son globales del intérprete: un solo perfil a la vez por proceso.
+# Si llega otra petición mientras tanto, simplemente no se perfila.
+_en_curso = threading.Lock()
+_perfilando = ContextVar('perfilando', default=False)
+
+
+def perfilado_activo():
+    """True dentro de una ejecución perfilada (las tareas que encole se perfilan también)."""
+    return _perfilando.get()
+
+
+def toca_muestreo(nombre):
+    """Sorteo de PERFILADO_MUESTREO, limitado a las vistas o tareas de PERFILADO_SOLO si se indican."""
+    tasa = getattr(settings, 'PERFILADO_MUESTREO', 0)
+    if not tasa or random.random() >= tasa:
+        return False
+    solo = getattr(settings, 'PERFILADO_SOLO', None)
+    return not solo or nombre in solo
+
+
+class Perfilado:
+    """
+    Perfila lo que se ejecuta dentro del bloque `with` con cProfile y tracemalloc, y guarda
+    el resultado como un Perfil (en `self.perfil`, o None si no se pudo perfilar porque
+    había otro perfil en curso). tracemalloc hace varias veces más lenta la ejecución:
+    solo para peticiones pedidas o muestreadas, nunca para todas.
+    """
+
+    def __init__(self, nombre, origen, motivo, ruta='', usuario=None):
+        self.datos = dict(nombre=nombre[:200], origen=origen, motivo=motivo, ruta=ruta[:500],
+                          usuario=usuario if usuario is not None and usuario.is_authenticated else None)
+        self.perfil = None
+        self.activo = False
+
+    def __enter__(self):
+        self.activo = _en_curso.acquire(blocking=False)
+        if not self.activo:
+            return self
+        self.iniciar_memoria = not tracemalloc.is_tracing()
+        if self.iniciar_memoria:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.memoria_inicial = tracemalloc.get_traced_memory()[0]
+        self.instantanea_inicial = tracemalloc.take_snapshot()
+        self.marca = _perfilando.set(True)
+        self.perfilador = cProfile.Profile()
+        self.inicio = perf_counter()
+        self.perfilador.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if not self.activo:
+            return False
+        try:
+            self.perfilador.disable()
+            duracion = perf_counter() - self.inicio
+            _perfilando.reset(self.marca)
+            pico = tracemalloc.get_traced_memory()[1] - self.memoria_inicial
+            diferencias = tracemalloc.take_snapshot().compare_to(self.instantanea_inicial, 'lineno')
+            if self.iniciar_memoria:
+                tracemalloc.stop()
+        finally:
+            _en_curso.release()
+        try:
+            self.perfil = self._guardar(duracion, pico, diferencias)
+        except Exception:
+            # El perfil es un diagnóstico: si no se puede guardar, la petición sigue igual
+            logger.exception("No se pudo guardar el perfil de %s", self.datos['nombre'])
+        return False
+
+    def _guardar(self, duracion, pico, diferencias):
+        self.perfilador.create_stats()
+        perfil = Perfil(
+            duracion_ms=round(duracion * 1000, 2),
+            memoria_pico_kb=max(pico, 0) // 1024,
+            memoria_detalle='\n'.join(str(fila) for fila in diferencias[:LINEAS_MEMORIA]),
+            **self.datos
+        )
+        nombre = f"{timezone.now():%Y%m%d-%H%M%S}-{self.datos['nombre'].replace(':', '_')}.prof"
+        perfil.archivo.save(nombre, ContentFile(marshal.dumps(self.perfilador.stats)), save=True)
+        _descartar_viejos()
+        return perfil
+
+
+def _descartar_viejos():
+    """Conserva los últimos PERFILADO_MAXIMO perfiles; los demás se borran con su archivo."""
+    maximo = getattr(settings, 'PERFILADO_MAXIMO', 200)
+    for viejo in Perfil.objects.order_by('-creado', '-id')[maximo:]:
+        viejo.archivo.delete(save=False)
+        viejo.delete()
+
+
+class _Guardadas:
+    """Estadísticas leídas de un archivo de perfil, con la interfaz que pstats.Stats acepta."""
+
+    def __init__(self, datos):
+        self.stats = marshal.loads(datos)
+
+    def create_stats(self):
+        pass
+
+
+def reporte(perfil, orden='cumulative', lineas=FUNCIONES_EN_REPORTE):
+    """Las `lineas` funciones más costosas del perfil según `orden`, como texto de pstats."""
+    with perfil.archivo.open('rb') as archivo:
+        guardadas = _Guardadas(archivo.read())
+    salida = io.StringIO()
+    pstats.Stats(guardadas, stream=salida).sort_stats(orden).print_stats(lineas)
+    return salida.getvalue()
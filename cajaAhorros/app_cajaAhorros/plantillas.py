@@ -0,0 +1,24 @@
+# app_cajaAhorros/plantillas.py
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import medir_plantilla
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        return medir_plantilla(super().render, context, request)
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """
+    El motor de plantillas de Django, con el tiempo de render sumado a la medición de la
+    petición en curso (ver middleware.MedicionPeticionesMiddleware). Fuera de una petición
+    medida se comporta igual que DjangoTemplates.
+    """
+
+    def from_string(self, template_code):
+        return PlantillaMedida(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name).template, self)
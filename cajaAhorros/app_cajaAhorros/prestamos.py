@@ -0,0 +1,69 @@
+# app_cajaAhorros/prestamos.py
+
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, DateField, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Prestamo
+
+# Orden de la lista de préstamos: nombre -> campos (el último siempre 'id' para desempatar)
+ORDENES = {
+    'recientes': ('-fecha_orden', '-id'),
+    'antiguos': ('fecha_orden', 'id'),
+    'monto_mayor': ('-cantidad_solicitada', '-id'),
+    'monto_menor': ('cantidad_solicitada', 'id'),
+    'estado': ('estado', '-id'),
+}
+ORDEN_POR_DEFECTO = 'recientes'
+
+_fecha = Prestamo._meta.get_field('fecha_prestamo')
+
+
+def anotar_avance(prestamos):
+    """
+    Anota cada préstamo con sus cuotas pagadas y totales, el capital pendiente y la
+    próxima fecha de pago, todo en la misma consulta agrupada sobre PagoPrestamo.
+    """
+    pendiente = Q(pagos__estado=False)
+    return prestamos.select_related('socio', 'garante').annotate(
+        cuotas_total=Count('pagos'),
+        cuotas_pagadas=Count('pagos', filter=Q(pagos__estado=True)),
+        saldo_pendiente=Sum('pagos__capital_pago', filter=pendiente),
+        proximo_pago=Min('pagos__fecha_a_pagar', filter=pendiente),
+        # Los préstamos sin fecha van al final del orden por fecha
+        fecha_orden=Coalesce('fecha_prestamo', Value(date.min), output_field=DateField()),
+    )
+
+
+def _fecha_o_none(valor):
+    try:
+        return _fecha.to_python(valor) if valor else None
+    except ValidationError:
+        return None
+
+
+def filtrar_prestamos(prestamos, parametros):
+    """
+    Aplica los filtros de la lista de préstamos (estado, socio y rango de fechas de solicitud).
+    Devuelve el queryset filtrado y los filtros efectivamente aplicados.
+    """
+    filtros = {}
+    estado = parametros.get('estado')
+    if estado in dict(Prestamo.ESTADOS):
+        prestamos = prestamos.filter(estado=estado)
+        filtros['estado'] = estado
+    socio = parametros.get('socio')
+    if socio and socio.isdigit():
+        prestamos = prestamos.filter(socio_id=int(socio))
+        filtros['socio'] = socio
+    desde = _fecha_o_none(parametros.get('desde'))
+    if desde:
+        prestamos = prestamos.filter(fecha_prestamo__gte=desde)
+        filtros['desde'] = desde.isoformat()
+    hasta = _fecha_o_none(parametros.get('hasta'))
+    if hasta:
+        prestamos = prestamos.filter(fecha_prestamo__lte=hasta)
+        filtros['hasta'] = hasta.isoformat()
+    return prestamos, filtros
@@ -0,0 +1,16 @@
+# app_cajaAhorros/registro.py
+
+import os
+from logging.handlers import RotatingFileHandler
+
+
+class ArchivoRotativo(RotatingFileHandler):
+    """
+    RotatingFileHandler que crea su carpeta al abrir el archivo (con delay=True, al escribir el
+    primer registro) y no al cargar los ajustes: un despliegue de solo lectura que nunca
+    escribe en el registro no necesita la carpeta.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
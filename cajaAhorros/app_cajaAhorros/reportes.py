@@ -0,0 +1,411 @@
+# app_cajaAhorros/reportes.py
+
+import tempfile
+from itertools import chain, islice
+
+from django.db.models import Sum
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .models import GastosAdministrativos, Movimiento, Prestamo, Socio
+from .saldos import obtener_resumen
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CONTENT_TYPE_PDF = 'application/pdf'
+
+# Filas leídas de la base de datos por cada viaje al recorrer listados grandes
+TAMANO_LOTE = 2000
+
+# Filas por cada tabla del PDF: aproximadamente una página, para que el armado no dependa del total
+FILAS_POR_TABLA = 40
+
+# Los reportes grandes se arman en memoria hasta este tamaño y luego pasan a disco
+MAXIMO_EN_MEMORIA = 5 * 1024 * 1024
+
+_NEGRITA = Font(bold=True)
+
+# Estilos construidos una sola vez por proceso y compartidos por todos los reportes
+ESTILOS = getSampleStyleSheet()
+
+ESTILO_TABLA_LISTADO = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+ESTILO_TABLA_GASTOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+ESTILO_TABLA_APORTACIONES = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+])
+
+ESTILO_TABLA_AMORTIZACION = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#d3d3d3')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+
+def escribir_excel(archivo, hoja, encabezados, filas, cabecera=(), pie=(), encabezado_negrita=True):
+    """
+    Escribe un libro de una hoja en modo write-only: las filas se vuelcan a disco a medida
+    que llegan, así que la memoria no crece con el tamaño del listado.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    for fila in cabecera:
+        ws.append(fila)
+    if encabezado_negrita:
+        celdas = []
+        for encabezado in encabezados:
+            celda = WriteOnlyCell(ws, value=encabezado)
+            celda.font = _NEGRITA
+            celdas.append(celda)
+        ws.append(celdas)
+    else:
+        ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    for fila in pie:
+        ws.append(fila)
+    wb.save(archivo)
+
+
+def tablas_por_partes(encabezados, filas, estilo, anchos, filas_por_tabla=FILAS_POR_TABLA):
+    """
+    Reparte las filas en tablas pequeñas (de aproximadamente una página) con la cabecera repetida.
+    Armar muchas tablas cortas es lineal en la cantidad de filas; una sola tabla gigante no.
+    """
+    filas = iter(filas)
+    while True:
+        parte = list(islice(filas, filas_por_tabla))
+        if not parte:
+            return
+        tabla = Table([encabezados] + parte, colWidths=anchos, repeatRows=1)
+        tabla.setStyle(estilo)
+        yield tabla
+
+
+def escribir_pdf(archivo, encabezado, tablas, pie=()):
+    doc = SimpleDocTemplate(archivo, pagesize=A4)
+    # Lista normal de flowables, como pide SimpleDocTemplate.build: con las filas repartidas en
+    # tablas cortas, el costo de la lista es pequeño frente al de armar las páginas
+    doc.build(list(chain(encabezado, tablas, pie)))
+
+
+def _firma(cargo):
+    return [
+        Spacer(1, 24),
+        Paragraph("__________________________", ESTILOS['Normal']),
+        Paragraph(f"Firma del {cargo}", ESTILOS['Normal']),
+    ]
+
+
+def _titulo(titulo):
+    # Sin fecha de generación: el PDF se guarda en la caché de reportes y puede enviarse días
+    # después mientras sus datos no cambien (ver cache_reportes.py)
+    return [
+        Paragraph(titulo, ESTILOS['Title']),
+        Spacer(1, 12),
+    ]
+
+
+def respuesta_archivo(generar, nombre, content_type, *args):
+    """
+    Genera el reporte en un archivo temporal y lo envía por partes con FileResponse.
+    El archivo se cierra (y se borra) cuando termina la respuesta.
+    """
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAXIMO_EN_MEMORIA)
+    generar(archivo, *args)
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename=nombre, content_type=content_type)
+
+
+def respuesta_excel(generar, nombre, *args):
+    return respuesta_archivo(generar, nombre, CONTENT_TYPE_XLSX, *args)
+
+
+def respuesta_pdf(generar, nombre, *args):
+    return respuesta_archivo(generar, nombre, CONTENT_TYPE_PDF, *args)
+
+
+# --- Listados en Excel ---
+
+def excel_socios(archivo):
+    socios = Socio.objects.filter(activo=True).order_by('apellido')
+    filas = (
+        [
+            i,
+            socio.cedula,
+            socio.nombre,
+            socio.apellido,
+            socio.telefono or '',
+            socio.email or '',
+            socio.fecha_ingreso.strftime('%d/%m/%Y'),
+        ]
+        for i, socio in enumerate(socios.iterator(chunk_size=TAMANO_LOTE), start=1)
+    )
+    escribir_excel(archivo, "Socios Activos",
+                   ['#', 'Cédula', 'Nombres', 'Apellidos', 'Teléfono', 'Email', 'Fecha de Ingreso'], filas)
+
+
+def excel_prestamos(archivo):
+    prestamos = Prestamo.objects.select_related('socio', 'garante').order_by('-fecha_aprobacion')
+    filas = (
+        [
+            p.fecha_aprobacion.strftime('%d/%m/%Y') if p.fecha_aprobacion else '',
+            f"{p.socio.nombre} {p.socio.apellido}",
+            f"{p.garante.nombre} {p.garante.apellido}" if p.garante else '',
+            float(p.cantidad_solicitada),
+            float(p.cantidad_aprobada or 0),
+            p.plazo,
+            p.estado,
+        ]
+        for p in prestamos.iterator(chunk_size=TAMANO_LOTE)
+    )
+    escribir_excel(archivo, "Préstamos",
+                   ['Fecha Aprobación', 'Solicitante', 'Garante',
+                    'Cantidad Solicitada', 'Cantidad Aprobada', 'Plazo', 'Estado'], filas)
+
+
+def totales_gastos():
+    """Totales de gastos administrativos calculados en la base de datos."""
+    totales = GastosAdministrativos.objects.aggregate(entrada=Sum('entrada'), salida=Sum('salida'))
+    total_entrada = totales['entrada'] or 0
+    total_salida = totales['salida'] or 0
+    return total_entrada, total_salida, total_entrada - total_salida
+
+
+def excel_gastos(archivo):
+    total_entrada, total_salida, saldo_actual = totales_gastos()
+    gastos = GastosAdministrativos.objects.order_by('fecha')
+    filas = (
+        [
+            g.fecha.strftime('%d/%m/%Y'),
+            g.descripcion,
+            float(g.entrada),
+            float(g.salida),
+            float(g.saldo),
+        ]
+        for g in gastos.iterator(chunk_size=TAMANO_LOTE)
+    )
+    pie = [
+        [],
+        ['', 'Total Entradas', float(total_entrada)],
+        ['', 'Total Salidas', float(total_salida)],
+        ['', 'Saldo Actual', float(saldo_actual)],
+    ]
+    escribir_excel(archivo, "Gastos Administrativos",
+                   ['Fecha', 'Descripción', 'Entrada', 'Salida', 'Saldo'], filas, pie=pie)
+
+
+def excel_amortizacion(archivo, prestamo):
+    socio = prestamo.socio
+    cabecera = [
+        ["Solicitante:", f"{socio.nombre} {socio.apellido}"],
+        ["Fecha del Aprobación:", prestamo.fecha_aprobacion.strftime('%d/%m/%Y') if prestamo.fecha_aprobacion else ""],
+        ["Plazo (meses):", prestamo.plazo],
+        ["Monto Aprobado:", float(prestamo.cantidad_aprobada)],
+        ["Interés (%):", float(prestamo.interes)],
+        [],  # Fila vacía
+    ]
+    filas = (
+        [
+            pago.cuota_pago,
+            pago.saldo_pago,
+            pago.capital_pago,
+            pago.interes_pago,
+            pago.valor_cuota_pago,
+            pago.fecha_a_pagar.strftime('%d/%m/%Y'),
+            'Pagado' if pago.estado else 'Pendiente',
+        ]
+        for pago in prestamo.pagos.order_by('cuota_pago').iterator(chunk_size=TAMANO_LOTE)
+    )
+    escribir_excel(archivo, "Amortización",
+                   ['#', 'Saldo', 'Capital', 'Interés', 'Cuota', 'Fecha a Pagar', 'Estado'], filas,
+                   cabecera=cabecera, encabezado_negrita=False)
+
+
+# --- Listados en PDF ---
+
+def pdf_socios(archivo):
+    socios = Socio.objects.filter(activo=True).order_by('apellido')
+    filas = (
+        [
+            i,
+            socio.cedula,
+            socio.nombre,
+            socio.apellido,
+            socio.telefono or '',
+            socio.email or '',
+            socio.fecha_ingreso.strftime('%d/%m/%Y'),
+        ]
+        for i, socio in enumerate(socios.iterator(chunk_size=TAMANO_LOTE), start=1)
+    )
+    tablas = tablas_por_partes(
+        ['#', 'Cédula', 'Nombres', 'Apellidos', 'Teléfono', 'Email', 'Fecha de Ingreso'], filas,
+        ESTILO_TABLA_LISTADO, anchos=[30, 60, 75, 75, 60, 110, 70],
+    )
+    escribir_pdf(archivo, _titulo("Listado de Socios Activos"), tablas, _firma("Secretario(a)"))
+
+
+def pdf_prestamos(archivo):
+    prestamos = Prestamo.objects.select_related('socio', 'garante').order_by('-fecha_aprobacion')
+    filas = (
+        [
+            p.fecha_aprobacion.strftime('%d/%m/%Y') if p.fecha_aprobacion else '',
+            f"{p.socio.nombre} {p.socio.apellido}",
+            f"{p.garante.nombre} {p.garante.apellido}" if p.garante else '---',
+            f"${p.cantidad_solicitada:,.2f}",
+            f"${p.cantidad_aprobada:,.2f}" if p.cantidad_aprobada else '$0.00',
+            f"{p.plazo} meses",
+            p.estado,
+        ]
+        for p in prestamos.iterator(chunk_size=TAMANO_LOTE)
+    )
+    tablas = tablas_por_partes(
+        ['Fecha Aprob', 'Solicitante', 'Garante', 'Solicitado', 'Aprobado', 'Plazo', 'Estado'], filas,
+        ESTILO_TABLA_LISTADO, anchos=[60, 95, 95, 60, 60, 50, 60],
+    )
+    escribir_pdf(archivo, _titulo("📄 Lista de Préstamos"), tablas, _firma("Tesorero"))
+
+
+def pdf_gastos(archivo):
+    total_entrada, total_salida, saldo_actual = totales_gastos()
+    gastos = GastosAdministrativos.objects.order_by('fecha')
+    filas = (
+        [
+            g.fecha.strftime('%d/%m/%Y'),
+            g.descripcion,
+            f"${g.entrada:,.2f}",
+            f"${g.salida:,.2f}",
+        ]
+        for g in gastos.iterator(chunk_size=TAMANO_LOTE)
+    )
+    tablas = tablas_por_partes(['Fecha', 'Descripción', 'Entrada', 'Salida'], filas,
+                               ESTILO_TABLA_GASTOS, anchos=[60, 251, 70, 70])
+    pie = [
+        Spacer(1, 12),
+        Paragraph(f"<strong>Total Entradas:</strong> ${total_entrada:,.2f}", ESTILOS['Normal']),
+        Paragraph(f"<strong>Total Salidas:</strong> ${total_salida:,.2f}", ESTILOS['Normal']),
+        Paragraph(f"<strong>Saldo Actual:</strong> ${saldo_actual:,.2f}", ESTILOS['Normal']),
+        Spacer(1, 36),
+    ] + _firma("Tesorero")
+    escribir_pdf(archivo, _titulo("📄 Reporte de Gastos Administrativos"), tablas, pie)
+
+
+def pdf_aportaciones(archivo, socio):
+    resumen = obtener_resumen(socio)
+    movimientos = Movimiento.objects.filter(socio=socio).order_by('fecha_movimiento', 'id')
+
+    encabezado = [
+        Paragraph(f"Aportaciones del socio: <b>{socio.nombre} {socio.apellido}</b>", ESTILOS['Title']),
+        Paragraph(f"Cédula: {socio.cedula}", ESTILOS['Normal']),
+        Spacer(1, 12),
+    ]
+    filas = (
+        [
+            m.fecha_movimiento.strftime('%d/%m/%Y'),
+            m.detalle_movimiento,
+            f"${m.entrada:,.2f}" if m.entrada else "",
+            f"${m.salida:,.2f}" if m.salida else "",
+        ]
+        for m in movimientos.iterator(chunk_size=TAMANO_LOTE)
+    )
+    tablas = tablas_por_partes(['Fecha', 'Descripción', 'Entrada', 'Salida'], filas,
+                               ESTILO_TABLA_APORTACIONES, anchos=[60, 251, 70, 70])
+    pie = [
+        Spacer(1, 12),
+        Paragraph(f"<b>Total Aportes:</b> ${resumen.total_aportes:,.2f}", ESTILOS['Normal']),
+        Paragraph(f"<b>Total Retiros:</b> ${resumen.total_retiros:,.2f}", ESTILOS['Normal']),
+        Paragraph(f"<b>Saldo:</b> ${resumen.saldo:,.2f}", ESTILOS['Normal']),
+        Spacer(1, 36),
+        Paragraph("Firma Tesorero: _________________________", ESTILOS['Normal']),
+    ]
+    escribir_pdf(archivo, encabezado, tablas, pie)
+
+
+def pdf_amortizacion(archivo, prestamo):
+    socio = prestamo.socio
+    info_solicitante = f"""
+        <strong>Solicitante:</strong> {socio.nombre} {socio.apellido}<br/>
+        <strong>Fecha del Aprobación:</strong> {prestamo.fecha_aprobacion.strftime('%d/%m/%Y')}<br/>
+        <strong>Plazo:</strong> {prestamo.plazo} meses<br/>
+        <strong>Monto Aprobado:</strong> ${prestamo.cantidad_aprobada:,.2f}<br/>
+        <strong>Interés:</strong> {prestamo.interes:,.2f}%
+    """
+    encabezado = [
+        Paragraph(f'Tabla de Amortización - Préstamo #{prestamo.pk}', ESTILOS['Title']),
+        Spacer(1, 12),
+        Paragraph(info_solicitante, ESTILOS['Normal']),
+        Spacer(1, 12),
+    ]
+    filas = (
+        [
+            pago.cuota_pago,
+            f"${pago.saldo_pago}",
+            f"${pago.capital_pago}",
+            f"${pago.interes_pago}",
+            f"${pago.valor_cuota_pago}",
+            pago.fecha_a_pagar.strftime('%d/%m/%Y'),
+            "Pagado" if pago.estado else "Pendiente",
+        ]
+        for pago in prestamo.pagos.order_by('cuota_pago').iterator(chunk_size=TAMANO_LOTE)
+    )
+    tablas = tablas_por_partes(['#', 'Saldo', 'Capital', 'Interés', 'Cuota', 'Fecha a Pagar', 'Estado'], filas,
+                               ESTILO_TABLA_AMORTIZACION, anchos=[30, 70, 65, 60, 65, 75, 60])
+    escribir_pdf(archivo, encabezado, tablas, _firma("Tesorero"))
+
+
+# --- Reportes generados fuera de la petición (ver tareas.py) ---
+
+# clave: (función que escribe el archivo, content_type, modelo del objeto que recibe o None)
+REPORTES = {
+    'socios_pdf': (pdf_socios, CONTENT_TYPE_PDF, None),
+    'socios_excel': (excel_socios, CONTENT_TYPE_XLSX, None),
+    'prestamos_pdf': (pdf_prestamos, CONTENT_TYPE_PDF, None),
+    'prestamos_excel': (excel_prestamos, CONTENT_TYPE_XLSX, None),
+    'gastos_pdf': (pdf_gastos, CONTENT_TYPE_PDF, None),
+    'gastos_excel': (excel_gastos, CONTENT_TYPE_XLSX, None),
+    'aportaciones_pdf': (pdf_aportaciones, CONTENT_TYPE_PDF, Socio),
+    'amortizacion_pdf': (pdf_amortizacion, CONTENT_TYPE_PDF, Prestamo),
+    'amortizacion_excel': (excel_amortizacion, CONTENT_TYPE_XLSX, Prestamo),
+}
+
+
+def generar_reporte(clave, objeto_id=None):
+    """
+    Genera el reporte `clave` en un archivo temporal y lo devuelve al inicio, listo para leerse.
+    Quien lo recibe debe cerrarlo.
+    """
+    generar, _, modelo = REPORTES[clave]
+    args = []
+    if modelo is not None:
+        consulta = modelo.objects.select_related('socio') if modelo is Prestamo else modelo.objects
+        args.append(consulta.get(pk=objeto_id))
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAXIMO_EN_MEMORIA)
+    generar(archivo, *args)
+    archivo.seek(0)
+    return archivo
@@ -0,0 +1,120 @@
+# app_cajaAhorros/resumen_mensual.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Movimiento, PagoPrestamo, Prestamo, ResumenMensual
+
+CAMPOS = ['entradas', 'salidas', 'prestamos_nuevos', 'prestamos_aprobados', 'monto_aprobado',
+          'cuotas_cobradas', 'monto_cobrado']
+
+# Préstamos que cuentan como aprobados en el mes de su aprobación
+ESTADOS_APROBADOS = ['Aprobado', 'Terminado']
+
+_fecha = ResumenMensual._meta.get_field('mes')
+
+
+def primer_dia(fecha):
+    return _fecha.to_python(fecha).replace(day=1)
+
+
+def sumar(cambios):
+    """
+    Aplica incrementos a los totales mensuales.
+    `cambios` es un diccionario {mes: {campo: incremento}}. Los meses que faltan se crean
+    con INSERT ... ON CONFLICT DO NOTHING y los incrementos se aplican con UPDATE campo = campo + x,
+    así dos escrituras simultáneas en un mes nuevo no chocan ni se pisan.
+    """
+    cambios = dict((mes, deltas) for mes, deltas in cambios.items() if any(deltas.values()))
+    if not cambios:
+        return
+    with transaction.atomic():
+        ResumenMensual.objects.bulk_create([ResumenMensual(mes=mes) for mes in cambios], ignore_conflicts=True)
+        for mes, deltas in cambios.items():
+            ResumenMensual.objects.filter(mes=mes).update(
+                **dict((campo, F(campo) + delta) for campo, delta in deltas.items() if delta)
+            )
+
+
+def sumar_movimientos(agregados=(), quitados=()):
+    cambios = {}
+    for signo, movimientos in ((1, agregados), (-1, quitados)):
+        for mov in movimientos:
+            deltas = cambios.setdefault(primer_dia(mov.fecha_movimiento), {'entradas': Decimal('0'), 'salidas': Decimal('0')})
+            deltas['entradas'] += signo * Decimal(str(mov.entrada or 0))
+            deltas['salidas'] += signo * Decimal(str(mov.salida or 0))
+    sumar(cambios)
+
+
+def aporte_prestamo(prestamo):
+    """Lo que un préstamo suma a los totales mensuales, con los mismos criterios que reconstruir()."""
+    aporte = {}
+    if prestamo.fecha_prestamo:
+        aporte[primer_dia(prestamo.fecha_prestamo)] = {'prestamos_nuevos': 1}
+    if prestamo.estado in ESTADOS_APROBADOS and prestamo.fecha_aprobacion:
+        deltas = aporte.setdefault(primer_dia(prestamo.fecha_aprobacion), {})
+        deltas['prestamos_aprobados'] = 1
+        deltas['monto_aprobado'] = Decimal(str(prestamo.cantidad_aprobada or 0))
+    return aporte
+
+
+def aporte_pago(pago):
+    """Lo que una cuota suma a los totales mensuales: solo si está pagada y tiene fecha de pago."""
+    if not (pago.estado and pago.fecha_pago):
+        return {}
+    return {primer_dia(pago.fecha_pago): {
+        'cuotas_cobradas': 1,
+        'monto_cobrado': Decimal(str(pago.valor_cuota_pago or 0)),
+    }}
+
+
+def aplicar_diferencia(anterior, nuevo):
+    """Suma `nuevo` y resta `anterior` (aportes de una misma fila antes y después de guardarla)."""
+    cambios = {}
+    for signo, aporte in ((-1, anterior), (1, nuevo)):
+        for mes, deltas in aporte.items():
+            acumulado = cambios.setdefault(mes, {})
+            for campo, valor in deltas.items():
+                acumulado[campo] = acumulado.get(campo, 0) + signo * valor
+    sumar(cambios)
+
+
+def reconstruir():
+    """Vuelve a calcular todos los meses desde las tablas de origen. Devuelve la cantidad de meses."""
+    meses = {}
+
+    def fila(mes):
+        return meses.setdefault(mes, ResumenMensual(mes=mes))
+
+    for total in (Movimiento.objects.annotate(m=TruncMonth('fecha_movimiento')).values('m')
+                  .annotate(entradas=Sum('entrada'), salidas=Sum('salida')).order_by()):
+        resumen = fila(total['m'])
+        resumen.entradas = total['entradas'] or 0
+        resumen.salidas = total['salidas'] or 0
+
+    for total in (Prestamo.objects.filter(fecha_prestamo__isnull=False)
+                  .annotate(m=TruncMonth('fecha_prestamo')).values('m')
+                  .annotate(cantidad=Count('id')).order_by()):
+        fila(total['m']).prestamos_nuevos = total['cantidad']
+
+    for total in (Prestamo.objects.filter(estado__in=ESTADOS_APROBADOS, fecha_aprobacion__isnull=False)
+                  .annotate(m=TruncMonth('fecha_aprobacion')).values('m')
+                  .annotate(cantidad=Count('id'), monto=Sum('cantidad_aprobada')).order_by()):
+        resumen = fila(total['m'])
+        resumen.prestamos_aprobados = total['cantidad']
+        resumen.monto_aprobado = total['monto'] or 0
+
+    for total in (PagoPrestamo.objects.filter(estado=True, fecha_pago__isnull=False)
+                  .annotate(m=TruncMonth('fecha_pago')).values('m')
+                  .annotate(cantidad=Count('id'), monto=Sum('valor_cuota_pago')).order_by()):
+        resumen = fila(total['m'])
+        resumen.cuotas_cobradas = total['cantidad']
+        resumen.monto_cobrado = total['monto'] or 0
+
+    with transaction.atomic():
+        ResumenMensual.objects.all().delete()
+        ResumenMensual.objects.bulk_create(meses.values(), batch_size=500)
+    return len(meses)
@@ -0,0 +1,243 @@
+# app_cajaAhorros/saldos.py
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import resumen_mensual
+from .models import Movimiento, Prestamo, SaldoSocio, Socio
+from .versiones import marcar_cambio
+
+_fecha_movimiento = Movimiento._meta.get_field('fecha_movimiento')
+
+TAMANO_LOTE = 500
+
+# Saldo acumulado del socio desde una fecha: la suma de lo anterior más una suma de ventana
+# ordenada por (fecha_movimiento, id) sobre el tramo afectado. Solo se escriben las filas que cambian.
+_SQL_RECALCULAR = """
+UPDATE {tabla} SET saldo = calculo.nuevo
+FROM (
+    SELECT id, ROUND(
+        (SELECT COALESCE(SUM(entrada - salida), 0) FROM {tabla} WHERE socio_id = %s AND fecha_movimiento < %s)
+        + SUM(entrada - salida) OVER (ORDER BY fecha_movimiento, id ROWS UNBOUNDED PRECEDING),
+    2) AS nuevo
+    FROM {tabla}
+    WHERE socio_id = %s AND fecha_movimiento >= %s
+) AS calculo
+WHERE {tabla}.id = calculo.id AND {tabla}.saldo <> calculo.nuevo
+"""
+
+
+def _como_decimal(valor):
+    return Decimal(str(valor or 0))
+
+
+def obtener_resumen(socio):
+    """
+    Devuelve el resumen de saldos del socio con una sola lectura por clave primaria.
+    Si el socio aún no tiene movimientos se devuelve un resumen en cero sin guardar.
+    """
+    socio_id = getattr(socio, 'pk', socio)
+    return SaldoSocio.objects.filter(pk=socio_id).first() or SaldoSocio(socio_id=socio_id)
+
+
+def actualizar_resumen(agregados=(), quitados=()):
+    """
+    Aplica al resumen de cada socio los movimientos agregados y quitados.
+    Funciona igual para un movimiento suelto que para un lote: los totales se suman en
+    la base de datos, sin leer los resúmenes ni recorrer el historial.
+    También actualiza los totales mensuales del panel de control y la versión de los
+    movimientos de cada socio para la caché de reportes.
+    """
+    cambios = {}
+    con_quitados = set()
+
+    def acumular(mov, signo):
+        entrada = _como_decimal(mov.entrada)
+        salida = _como_decimal(mov.salida)
+        fecha = _fecha_movimiento.to_python(mov.fecha_movimiento)
+        delta = cambios.setdefault(mov.socio_id, {'aportes': Decimal('0'), 'retiros': Decimal('0'), 'numero': 0, 'fecha': None})
+        delta['aportes'] += signo * entrada
+        delta['retiros'] += signo * salida
+        delta['numero'] += signo
+        if signo > 0:
+            if delta['fecha'] is None or fecha > delta['fecha']:
+                delta['fecha'] = fecha
+        else:
+            con_quitados.add(mov.socio_id)
+
+    for mov in quitados:
+        acumular(mov, -1)
+    for mov in agregados:
+        acumular(mov, 1)
+
+    if not cambios:
+        return
+
+    with transaction.atomic():
+        existentes = set(SaldoSocio.objects.select_for_update().filter(pk__in=list(cambios)).values_list('pk', flat=True))
+        faltantes = [SaldoSocio(socio_id=socio_id) for socio_id in cambios if socio_id not in existentes]
+        if faltantes:
+            SaldoSocio.objects.bulk_create(faltantes, batch_size=TAMANO_LOTE)
+
+        # Un UPDATE por cada cambio distinto: un lote con el mismo monto para todos (aportes del mes,
+        # reparto de intereses, importación) se aplica con una sola sentencia sin leer los resúmenes.
+        por_cambio = {}
+        for socio_id, delta in cambios.items():
+            clave = (delta['aportes'], delta['retiros'], delta['numero'], delta['fecha'])
+            por_cambio.setdefault(clave, []).append(socio_id)
+        for (aportes, retiros, numero, fecha), socio_ids in por_cambio.items():
+            valores = {
+                'total_aportes': F('total_aportes') + aportes,
+                'total_retiros': F('total_retiros') + retiros,
+                'saldo': F('total_aportes') + aportes - F('total_retiros') - retiros,
+                'numero_movimientos': Greatest(F('numero_movimientos') + numero, 0),
+            }
+            if fecha:
+                valores['ultimo_movimiento'] = Greatest(Coalesce('ultimo_movimiento', Value(fecha)), Value(fecha))
+            SaldoSocio.objects.filter(pk__in=socio_ids).update(**valores)
+
+        if con_quitados:
+            # Si se quitó el movimiento más reciente hay que volver a buscar la última fecha
+            ultima = (
+                Movimiento.objects.filter(socio_id=OuterRef('pk')).order_by()
+                .values('socio_id').annotate(ultima=Max('fecha_movimiento')).values('ultima')
+            )
+            SaldoSocio.objects.filter(pk__in=list(con_quitados)).update(ultimo_movimiento=Subquery(ultima))
+
+        resumen_mensual.sumar_movimientos(agregados, quitados)
+        marcar_cambio('movimientos', *cambios)
+
+
+def reconstruir_resumenes(socio_ids=None):
+    """
+    Vuelve a calcular desde cero el resumen de saldos a partir de la tabla de movimientos.
+    Devuelve la cantidad de resúmenes escritos.
+    """
+    movimientos = Movimiento.objects.all()
+    resumenes = SaldoSocio.objects.all()
+    if socio_ids is not None:
+        movimientos = movimientos.filter(socio_id__in=socio_ids)
+        resumenes = resumenes.filter(socio_id__in=socio_ids)
+
+    totales = movimientos.values('socio_id').annotate(
+        total_aportes=Sum('entrada'),
+        total_retiros=Sum('salida'),
+        ultimo_movimiento=Max('fecha_movimiento'),
+        numero_movimientos=Count('id'),
+    ).order_by()
+
+    nuevos = [
+        SaldoSocio(
+            socio_id=fila['socio_id'],
+            total_aportes=fila['total_aportes'] or 0,
+            total_retiros=fila['total_retiros'] or 0,
+            saldo=(fila['total_aportes'] or 0) - (fila['total_retiros'] or 0),
+            ultimo_movimiento=fila['ultimo_movimiento'],
+            numero_movimientos=fila['numero_movimientos'],
+        )
+        for fila in totales
+    ]
+    with transaction.atomic():
+        resumenes.delete()
+        SaldoSocio.objects.bulk_create(nuevos, batch_size=500)
+    return len(nuevos)
+
+
+def distribuir_interes_prestamo(prestamo, fecha=None):
+    """
+    Reparte el interés generado por un préstamo terminado entre los socios activos.
+    Lee todos los saldos en una consulta, inserta los movimientos en lote dentro de una
+    sola transacción y marca el préstamo, de modo que un reintento no pague dos veces.
+    Devuelve la cantidad de movimientos creados.
+    """
+    fecha = fecha or timezone.now().date()
+    with transaction.atomic():
+        # La marca se toma con un UPDATE condicional: solo la primera ejecución la obtiene
+        if not Prestamo.objects.filter(pk=prestamo.pk, interes_distribuido=False).update(interes_distribuido=True):
+            return 0
+        prestamo.interes_distribuido = True
+
+        total_interes = prestamo.pagos.aggregate(total=Sum('interes_pago'))['total'] or Decimal('0.00')
+        socio_ids = list(Socio.objects.filter(activo=True).values_list('id', flat=True))
+        if not socio_ids or total_interes <= 0:
+            return 0
+
+        interes_por_socio = (total_interes / len(socio_ids)).quantize(Decimal('0.01'))  # Redondear a 2 decimales
+        resumenes = SaldoSocio.objects.select_for_update(of=('self',)).filter(socio__activo=True)
+        saldos = {}
+        recalcular = []
+        for socio_id, saldo, ultimo_movimiento in resumenes.values_list('socio_id', 'saldo', 'ultimo_movimiento'):
+            saldos[socio_id] = saldo
+            # Socios con movimientos posteriores a la fecha del reparto: se recalcula su tramo
+            # desde esa fecha, igual que en libros.registrar_movimientos
+            if ultimo_movimiento and fecha < ultimo_movimiento:
+                recalcular.append(socio_id)
+
+        movimientos = [
+            Movimiento(
+                socio_id=socio_id,
+                detalle_movimiento="Interes generado por prestamo",
+                entrada=interes_por_socio,
+                salida=Decimal('0.00'),
+                saldo=saldos.get(socio_id, Decimal('0.00')) + interes_por_socio,
+                fecha_movimiento=fecha,
+            )
+            for socio_id in socio_ids
+        ]
+        Movimiento.objects.bulk_create(movimientos, batch_size=500)
+        actualizar_resumen(agregados=movimientos)
+        for socio_id in recalcular:
+            recalcular_saldos(socio_id, fecha)
+    return len(movimientos)
+
+
+def _soporta_update_con_ventana():
+    if connection.vendor == 'postgresql':
+        return True
+    # UPDATE ... FROM existe en SQLite desde la versión 3.33
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 33)
+
+
+def recalcular_saldos(socio, desde):
+    """
+    Reescribe el saldo acumulado de los movimientos del socio a partir de `desde`.
+    Los movimientos anteriores no se tocan, así que una corrección en un historial largo
+    solo actualiza el tramo posterior a la fecha cambiada, en una sola sentencia.
+    Devuelve la cantidad de movimientos actualizados.
+    """
+    socio_id = getattr(socio, 'pk', socio)
+    fecha = _fecha_movimiento.to_python(desde)
+
+    if _soporta_update_con_ventana():
+        sql = _SQL_RECALCULAR.format(tabla=connection.ops.quote_name(Movimiento._meta.db_table))
+        fecha_db = connection.ops.adapt_datefield_value(fecha)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [socio_id, fecha_db, socio_id, fecha_db])
+            return cursor.rowcount
+    return _recalcular_saldos_por_lotes(socio_id, fecha)
+
+
+def _recalcular_saldos_por_lotes(socio_id, fecha):
+    """Alternativa para motores sin UPDATE con funciones de ventana: una lectura y escrituras en lote."""
+    anteriores = Movimiento.objects.filter(socio_id=socio_id, fecha_movimiento__lt=fecha).aggregate(
+        entradas=Sum('entrada'), salidas=Sum('salida'),
+    )
+    saldo = _como_decimal(anteriores['entradas']) - _como_decimal(anteriores['salidas'])
+
+    tramo = (
+        Movimiento.objects.filter(socio_id=socio_id, fecha_movimiento__gte=fecha)
+        .order_by('fecha_movimiento', 'id')
+        .values_list('id', 'entrada', 'salida', 'saldo')
+    )
+    cambiados = []
+    for mov_id, entrada, salida, guardado in tramo.iterator(chunk_size=TAMANO_LOTE):
+        saldo += _como_decimal(entrada) - _como_decimal(salida)
+        if guardado != saldo:
+            cambiados.append(Movimiento(id=mov_id, saldo=saldo))
+    with transaction.atomic():
+        Movimiento.objects.bulk_update(cambiados, ['saldo'], batch_size=TAMANO_LOTE)
+    return len(cambiados)
@@ -0,0 +1,200 @@
+# app_cajaAhorros/sembrado.py
+
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from . import busqueda, resumen_mensual
+from .amortizacion import DatosPrestamo, calcular_tablas, construir_pagos
+from .aportes_mensuales import detalle_por_defecto
+from .libros import registrar_gastos
+from .models import Configuracion, GastosAdministrativos, Movimiento, PagoPrestamo, Prestamo, Socio
+from .saldos import reconstruir_resumenes
+from .versiones import marcar_cambio
+
+# Cédulas de los socios sembrados: ninguna cédula real empieza con 99 (no es código de provincia)
+PREFIJO_CEDULA = '99'
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carmen', 'Jorge', 'Rosa', 'Carlos', 'Lucía', 'Pedro',
+           'Elena', 'Miguel', 'Sofía', 'Diego', 'Paola', 'Andrés', 'Gabriela', 'Fernando', 'Daniela', 'Raúl']
+APELLIDOS = ['Pérez', 'Gómez', 'Rodríguez', 'López', 'Torres', 'Vera', 'Mendoza', 'Castro', 'Ruiz', 'Salazar',
+             'Zambrano', 'Morales', 'Cedeño', 'Jaramillo', 'Ortiz', 'Paredes', 'Vargas', 'Romero', 'Silva', 'Andrade']
+GASTOS_MENSUALES = [('Útiles de oficina', 15, 60), ('Servicios bancarios', 5, 20), ('Movilización', 10, 40)]
+MONTOS_APORTE = [Decimal('10.00'), Decimal('20.00'), Decimal('25.00'), Decimal('50.00')]
+
+# Reparto de los préstamos por estado (pesos relativos)
+ESTADOS_PRESTAMO = [('Terminado', 40), ('Aprobado', 35), ('Rechazado', 10), ('Solicitado', 8), ('Pendiente', 7)]
+
+ResultadoSembrado = namedtuple('ResultadoSembrado', ['socios', 'movimientos', 'prestamos', 'pagos', 'gastos'])
+
+
+def _meses(desde, hasta):
+    mes = desde.replace(day=1)
+    while mes <= hasta:
+        yield mes
+        mes += relativedelta(months=1)
+
+
+def _socios(azar, cantidad, inicio, hoy):
+    dias = (hoy - inicio).days
+    return [
+        Socio(
+            cedula=f'{PREFIJO_CEDULA}{i:08d}',
+            nombre=azar.choice(NOMBRES),
+            apellido=f'{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}',
+            telefono=f'09{azar.randrange(10 ** 8):08d}',
+            email=f'socio{i}@ejemplo.com',
+            fecha_nacimiento=date(1950, 1, 1) + timedelta(days=azar.randrange(365 * 50)),
+            fecha_ingreso=inicio + timedelta(days=azar.randrange(dias)),
+            activo=azar.random() > 0.03,
+        )
+        for i in range(cantidad)
+    ]
+
+
+def _movimientos(azar, socio, aporte_inicial, hoy):
+    """Aporte inicial y uno por mes desde el ingreso; algunos meses sin aporte y algunos retiros."""
+    monto = azar.choice(MONTOS_APORTE)
+    # Una parte de los socios deja de aportar unos meses antes de hoy (deudores)
+    hasta = hoy - relativedelta(months=azar.randrange(1, 6)) if azar.random() < 0.15 else hoy
+    movimientos = [(socio.fecha_ingreso, 'Aporte inicial', aporte_inicial, Decimal('0.00'))]
+    saldo = aporte_inicial
+    for mes in _meses(socio.fecha_ingreso + relativedelta(months=1), hasta):
+        if azar.random() < 0.05:
+            continue
+        fecha = mes.replace(day=azar.randint(1, 28))
+        movimientos.append((fecha, detalle_por_defecto(mes), monto, Decimal('0.00')))
+        saldo += monto
+        if azar.random() < 0.02 and saldo > 100:
+            retiro = (saldo * Decimal('0.2')).quantize(Decimal('1'))
+            movimientos.append((fecha, 'Retiro parcial', Decimal('0.00'), retiro))
+            saldo -= retiro
+    saldo = Decimal('0.00')
+    for fecha, detalle, entrada, salida in sorted(movimientos, key=lambda m: m[0]):
+        saldo += entrada - salida
+        yield Movimiento(socio=socio, detalle_movimiento=detalle, entrada=entrada, salida=salida,
+                         saldo=saldo, fecha_movimiento=fecha)
+
+
+def _prestamo(azar, socio, garante, estado, interes, plazo_maximo, hoy):
+    plazo = azar.choice([p for p in (6, 12, 18, 24, 36, 48, 60) if p <= plazo_maximo] or [plazo_maximo])
+    monto = Decimal(azar.randrange(5, 101) * 100)
+    # Un préstamo terminado ya venció su última cuota; si el socio es muy nuevo para eso, sigue en curso
+    ultima_aprobacion = hoy - relativedelta(months=plazo)
+    if estado == 'Terminado' and socio.fecha_ingreso >= ultima_aprobacion:
+        estado = 'Aprobado'
+    if estado == 'Terminado':
+        aprobacion = socio.fecha_ingreso + timedelta(days=azar.randrange((ultima_aprobacion - socio.fecha_ingreso).days))
+    elif estado == 'Aprobado':
+        aprobacion = max(socio.fecha_ingreso, hoy - timedelta(days=azar.randrange(1, plazo * 30)))
+    else:
+        aprobacion = None
+    solicitud = (aprobacion or hoy) - timedelta(days=azar.randrange(1, 30))
+    return Prestamo(
+        socio=socio, garante=garante, fecha_prestamo=solicitud, cantidad_solicitada=monto,
+        cantidad_aprobada=monto, plazo=plazo, interes=interes, estado=estado, fecha_aprobacion=aprobacion,
+        interes_distribuido=estado == 'Terminado',
+    )
+
+
+def _pagos(azar, prestamos, hoy):
+    """Tablas de amortización de los préstamos aprobados y terminados, con sus cuotas pagadas."""
+    con_tabla = [p for p in prestamos if p.estado in ('Aprobado', 'Terminado')]
+    tablas = calcular_tablas(
+        DatosPrestamo(p.cantidad_aprobada, p.interes, p.plazo, None, p.fecha_aprobacion) for p in con_tabla
+    )
+    for prestamo, tabla in zip(con_tabla, tablas):
+        prestamo.cuota = tabla['cuota']
+        # Un préstamo en curso de cada cinco se atrasa: deja de pagar unos meses antes de hoy
+        atrasado_desde = hoy - timedelta(days=azar.randrange(1, 150)) if (
+            prestamo.estado == 'Aprobado' and azar.random() < 0.2) else hoy
+        for pago in construir_pagos(prestamo, tabla):
+            if prestamo.estado == 'Terminado' or pago.fecha_a_pagar < atrasado_desde:
+                pago.estado = True
+                pago.fecha_pago = pago.fecha_a_pagar + timedelta(days=azar.randrange(0, 10))
+                pago.detalle_pago = 'Pago de cuota'
+            yield pago
+
+
+def _gastos(azar, socios, gasto_adm, inicio, hoy):
+    ingresos = sorted(socios, key=lambda s: s.fecha_ingreso)
+    gastos = [
+        GastosAdministrativos(fecha=s.fecha_ingreso, descripcion=f'Ingreso por nuevo socio: {s.nombre} {s.apellido}',
+                              entrada=gasto_adm, salida=Decimal('0.00'))
+        for s in ingresos
+    ]
+    for mes in _meses(inicio, hoy):
+        for descripcion, minimo, maximo in GASTOS_MENSUALES:
+            if azar.random() < 0.7:
+                gastos.append(GastosAdministrativos(
+                    fecha=mes.replace(day=azar.randint(1, 28)), descripcion=descripcion,
+                    entrada=Decimal('0.00'), salida=Decimal(azar.randint(minimo, maximo)),
+                ))
+    return sorted((g for g in gastos if g.fecha <= hoy), key=lambda g: g.fecha)
+
+
+def _configuracion():
+    config = Configuracion.objects.first()
+    if config is None:
+        config = Configuracion.objects.create(
+            ruc='0999999999001', nombre_empresa='Caja de Ahorros de Prueba', direccion='Av. Principal',
+            telefono='042000000', email='caja@ejemplo.com', ciudad='Guayaquil', tasa_interes=Decimal('12.00'),
+            plazo_maximo=60, aporte_inicial=Decimal('20.00'), aporte_mensual=Decimal('20.00'),
+            gastos_adm=Decimal('5.00'),
+        )
+    return config
+
+
+def sembrar(socios=500, anios=5, prestamos_por_socio=0.8, semilla=1, hoy=None):
+    """
+    Llena la base con una caja de ahorros sintética: `socios` socios que ingresan a lo largo de
+    `anios` años con su aporte de cada mes, préstamos en todos los estados con su tabla de
+    amortización y cuotas pagadas o vencidas, y los gastos administrativos del período.
+    Con la misma semilla y la misma fecha `hoy` se generan siempre los mismos datos.
+    Todo se escribe con INSERT en lote; los resúmenes se reconstruyen al final.
+    """
+    hoy = hoy or date.today()
+    azar = random.Random(semilla)
+    inicio = hoy - relativedelta(years=anios)
+    if Socio.objects.filter(cedula__startswith=PREFIJO_CEDULA).exists():
+        raise ValueError('La base ya tiene socios sembrados; use una base de datos nueva.')
+
+    with transaction.atomic():
+        config = _configuracion()
+        nuevos = _socios(azar, socios, inicio, hoy)
+        Socio.objects.bulk_create(nuevos, batch_size=500)  # sin la señal que crea el usuario de cada socio
+
+        movimientos = 0
+        lote = []
+        for socio in nuevos:
+            lote.extend(_movimientos(azar, socio, config.aporte_inicial, hoy))
+            if len(lote) >= 5000:
+                Movimiento.objects.bulk_create(lote, batch_size=1000)
+                movimientos += len(lote)
+                lote = []
+        Movimiento.objects.bulk_create(lote, batch_size=1000)
+        movimientos += len(lote)
+
+        estados, pesos = zip(*ESTADOS_PRESTAMO)
+        prestamos = []
+        for _ in range(int(socios * prestamos_por_socio)):
+            socio, garante = azar.sample(nuevos, 2) if len(nuevos) > 1 else (nuevos[0], None)
+            estado = azar.choices(estados, pesos)[0]
+            prestamos.append(_prestamo(azar, socio, garante, estado, config.tasa_interes, config.plazo_maximo, hoy))
+        pagos = list(_pagos(azar, prestamos, hoy))
+        Prestamo.objects.bulk_create(prestamos, batch_size=500)
+        PagoPrestamo.objects.bulk_create(pagos, batch_size=1000)
+
+        gastos = registrar_gastos(_gastos(azar, nuevos, config.gastos_adm, inicio, hoy))
+
+        reconstruir_resumenes([socio.pk for socio in nuevos])
+        busqueda.reconstruir()
+        resumen_mensual.reconstruir()
+        for tabla in ('socios', 'movimientos', 'prestamos', 'pagos'):
+            marcar_cambio(tabla)
+
+    return ResultadoSembrado(len(nuevos), movimientos, len(prestamos), len(pagos), len(gastos))
@@ -1,55 +1,154 @@
 # app_cajaAhorros/signals.py
 
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
-from .models import Socio
+from . import busqueda, resumen_mensual
+from .cartera import programar_corte
+from .configuracion import invalidar_configuracion
+from .decorators import invalidar_roles
+from .models import Configuracion, GastosAdministrativos, PagoPrestamo, Prestamo, Socio
+from .tareas import encolar
+from .versiones import marcar_cambio
 
 @receiver(post_save, sender=Socio)
 def crear_usuario_para_socio(sender, instance, created, **kwargs):
     """
-    Esta señal se dispara automáticamente después de que un Socio es guardado.
-    Ahora también asigna el nuevo usuario al grupo 'Socio'.
+    Al crear un Socio se encola la creación de su usuario (grupo 'Socio').
+    Generar el hash de la contraseña es lento, así que lo hace el worker de tareas.
     """
-    if created and not instance.user:
-        
-        # --- DEBUGGING: Imprimir los datos recibidos en la consola del servidor ---
-        print(f"--- Señal 'crear_usuario_para_socio' disparada para el socio: {instance.nombre} {instance.apellido} ---")
-        print(f"Cédula recibida en la señal: '{instance.cedula}'")
-        print(f"Email recibido en la señal: '{instance.email}'")
-
-        # --- VALIDACIÓN: Asegurarse de que la cédula no esté vacía ---
-        if not instance.cedula:
-            print(f"ERROR: No se puede crear usuario para Socio ID {instance.pk} porque la cédula está vacía.")
-            return # Detiene la ejecución si no hay cédula
-            
-        # Limpiamos el nombre de usuario por si tiene espacios extra
-        username_a_crear = instance.cedula.strip()
-
-        if not User.objects.filter(username=username_a_crear).exists():
-            print(f"Intentando crear nuevo usuario con username: '{username_a_crear}'")
-            
-            # Usamos getattr para más seguridad, aunque los nombres de campo ya deberían ser correctos.
-            nuevo_usuario = User.objects.create_user(
-                username=username_a_crear,
-                email=instance.email,
-                password=username_a_crear, # Usar la cédula como contraseña temporal
-                first_name=getattr(instance, 'nombre', ''),
-                last_name=getattr(instance, 'apellido', '')
-            )
-            
-            # --- LÓGICA PARA AÑADIR AL GRUPO 'Socio' ---
-            try:
-                grupo_socio = Group.objects.get(name='Socio')
-                nuevo_usuario.groups.add(grupo_socio)
-                print(f"Usuario '{username_a_crear}' añadido al grupo 'Socio'.")
-            except Group.DoesNotExist:
-                print("ADVERTENCIA: El grupo 'Socio' no existe. El nuevo usuario no fue asignado a ningún grupo.")
-            
-            # Asignamos el nuevo usuario al socio que se acaba de crear.
-            instance.user = nuevo_usuario
-            instance.save(update_fields=['user']) # Usamos update_fields para evitar que la señal se dispare de nuevo.
-            print(f"Socio ID {instance.pk} actualizado con el nuevo usuario ID {nuevo_usuario.pk}.")
-        else:
-            print(f"ADVERTENCIA: No se creó un nuevo usuario porque el username '{username_a_crear}' ya existe en la base de datos.")
+    if created and not instance.user and instance.cedula:
+        encolar('crear_usuario_socio', socio_id=instance.pk)
 
+
+@receiver(post_save, sender=Configuracion)
+@receiver(post_delete, sender=Configuracion)
+def renovar_cache_configuracion(sender, **kwargs):
+    """
+    Invalida la configuración en caché de todos los procesos.
+    Se repite al confirmar la transacción para que nadie recargue una versión sin confirmar.
+    """
+    invalidar_configuracion()
+    transaction.on_commit(invalidar_configuracion)
+
+
+def _invalidar_roles(user_id=None):
+    # Como la configuración: también al confirmar, para que ninguna petición guarde en la
+    # sesión los grupos de antes del cambio con la versión nueva
+    invalidar_roles(user_id)
+    transaction.on_commit(lambda: invalidar_roles(user_id))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def renovar_roles_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalida los roles guardados en sesión cuando cambian los grupos de un usuario."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        _invalidar_roles(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            _invalidar_roles(user_id)
+    else:
+        # Se vació un grupo desde su lado: no sabemos qué usuarios tenía
+        _invalidar_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def renovar_roles_grupo(sender, **kwargs):
+    _invalidar_roles()
+
+
+# --- Versiones de datos para la caché de reportes (ver cache_reportes.py) ---
+# Los movimientos se marcan en saldos.actualizar_resumen, por donde pasa todo cambio de movimientos.
+
+@receiver(post_save, sender=Socio)
+@receiver(post_delete, sender=Socio)
+def marcar_cambio_socio(sender, instance, **kwargs):
+    marcar_cambio('socios', instance.pk)
+
+
+@receiver(post_save, sender=Prestamo)
+@receiver(post_delete, sender=Prestamo)
+def marcar_cambio_prestamo(sender, instance, **kwargs):
+    marcar_cambio('prestamos', instance.pk)
+
+
+@receiver(post_save, sender=PagoPrestamo)
+@receiver(post_delete, sender=PagoPrestamo)
+def marcar_cambio_pago(sender, instance, **kwargs):
+    marcar_cambio('pagos', instance.prestamo_id)
+    programar_corte()
+
+
+@receiver(post_save, sender=GastosAdministrativos)
+@receiver(post_delete, sender=GastosAdministrativos)
+def marcar_cambio_gasto(sender, instance, **kwargs):
+    marcar_cambio('gastos')
+
+
+# --- Totales mensuales (ver resumen_mensual.py) ---
+# Antes de guardar se toma lo que la fila sumaba según la base; al guardar se aplica la diferencia
+# con lo que suma ahora. Así aprobar, editar, rechazar o pagar desde cualquier lugar (vistas,
+# admin, tareas) deja los totales iguales a los de resumen_mensual.reconstruir().
+
+def _aporte_guardado(modelo, instance, aporte):
+    if instance._state.adding or instance.pk is None:
+        return {}
+    anterior = modelo.objects.filter(pk=instance.pk).first()
+    return aporte(anterior) if anterior is not None else {}
+
+
+@receiver(pre_save, sender=Prestamo)
+def leer_resumen_prestamo(sender, instance, **kwargs):
+    instance._aporte_resumen = _aporte_guardado(Prestamo, instance, resumen_mensual.aporte_prestamo)
+
+
+@receiver(pre_save, sender=PagoPrestamo)
+def leer_resumen_pago(sender, instance, **kwargs):
+    instance._aporte_resumen = _aporte_guardado(PagoPrestamo, instance, resumen_mensual.aporte_pago)
+
+
+@receiver(post_save, sender=Prestamo)
+def actualizar_resumen_prestamo(sender, instance, **kwargs):
+    resumen_mensual.aplicar_diferencia(getattr(instance, '_aporte_resumen', {}),
+                                       resumen_mensual.aporte_prestamo(instance))
+
+
+@receiver(post_save, sender=PagoPrestamo)
+def actualizar_resumen_pago(sender, instance, **kwargs):
+    resumen_mensual.aplicar_diferencia(getattr(instance, '_aporte_resumen', {}),
+                                       resumen_mensual.aporte_pago(instance))
+
+
+@receiver(post_delete, sender=Prestamo)
+def quitar_resumen_prestamo(sender, instance, **kwargs):
+    resumen_mensual.aplicar_diferencia(resumen_mensual.aporte_prestamo(instance), {})
+
+
+@receiver(post_delete, sender=PagoPrestamo)
+def quitar_resumen_pago(sender, instance, **kwargs):
+    resumen_mensual.aplicar_diferencia(resumen_mensual.aporte_pago(instance), {})
+
+
+# --- Índice de búsqueda de socios (ver busqueda.py) ---
+# Las altas en lote (importación, sembrado) no disparan señales: indexan ellas mismas.
+
+@receiver(post_save, sender=Socio)
+@receiver(post_delete, sender=Socio)
+def indexar_socio(sender, instance, **kwargs):
+    busqueda.indexar([instance.pk])
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """Aplica los PRAGMA de settings.SQLITE_PRAGMAS a cada conexión nueva de SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {nombre} = {valor}')
@@ -0,0 +1,217 @@
+# app_cajaAhorros/tareas.py
+
+import logging
+import traceback
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .almacenamiento import almacen_privado
+from .models import Perfil, Prestamo, Socio, Tarea
+from .perfilado import Perfilado, perfilado_activo, toca_muestreo
+
+logger = logging.getLogger(__name__)
+
+# Una tarea que sigue "En proceso" después de este tiempo se da por abandonada
+# (el worker se detuvo a medias) y puede volver a tomarse.
+TIEMPO_MAXIMO = timedelta(minutes=30)
+
+# Espera antes del primer reintento; se duplica en cada intento fallido
+ESPERA_REINTENTO = timedelta(seconds=30)
+
+_TIPOS = {}
+
+
+def registrar_tarea(tipo):
+    """
+    Registra la función que ejecuta las tareas de `tipo`.
+    Recibe la Tarea y sus parámetros como argumentos con nombre; si devuelve
+    (nombre, archivo), el archivo se guarda como resultado de la tarea
+    (o, si es una ruta, se toma el archivo ya guardado en esa ruta).
+    Lo que deje en `tarea.informe` se guarda con la tarea y se muestra en su página de estado.
+    """
+    def registrar(funcion):
+        _TIPOS[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(tipo, usuario=None, max_intentos=3, **parametros):
+    """
+    Guarda una tarea pendiente y la devuelve. Si se llama dentro de una transacción,
+    el worker solo la ve cuando esta se confirma, junto con los datos que necesita.
+    Con TAREAS_EN_LINEA = True (desarrollo sin worker) se ejecuta al confirmar la transacción.
+    Encolada desde una petición perfilada, la tarea también se perfila en el worker.
+    """
+    if tipo not in _TIPOS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    tarea = Tarea.objects.create(tipo=tipo, parametros=parametros, usuario=usuario, max_intentos=max_intentos,
+                                 perfilar=perfilado_activo())
+    if getattr(settings, 'TAREAS_EN_LINEA', False):
+        transaction.on_commit(lambda: tomar_y_ejecutar(tarea.pk))
+    return tarea
+
+
+def _disponibles(ahora):
+    return Tarea.objects.filter(
+        Q(estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora)
+        | Q(estado=Tarea.EN_PROCESO, iniciada__lt=ahora - TIEMPO_MAXIMO)
+    )
+
+
+def tomar(tarea_id=None):
+    """
+    Marca como "En proceso" la siguiente tarea disponible (o la indicada) y la devuelve.
+    La marca es un UPDATE condicional sobre el estado leído: si otro worker la tomó
+    primero no se actualiza ninguna fila y se prueba con la siguiente.
+    """
+    ahora = timezone.now()
+    candidatas = _disponibles(ahora).order_by('ejecutar_desde', 'id')
+    if tarea_id is not None:
+        candidatas = candidatas.filter(pk=tarea_id)
+    for pk, estado, iniciada in candidatas.values_list('pk', 'estado', 'iniciada')[:10]:
+        tomada = Tarea.objects.filter(pk=pk, estado=estado, iniciada=iniciada).update(
+            estado=Tarea.EN_PROCESO, iniciada=ahora, intentos=F('intentos') + 1,
+        )
+        if tomada:
+            return Tarea.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea ya tomada. Si falla vuelve a quedar pendiente con una espera
+    creciente, hasta agotar sus intentos; entonces queda como "Fallida" con el error.
+    """
+    funcion = _TIPOS.get(tarea.tipo)
+    try:
+        if funcion is None:
+            raise LookupError(f"Tipo de tarea desconocido: {tarea.tipo}")
+        if tarea.intentos > tarea.max_intentos:
+            raise RuntimeError("La tarea se abandonó demasiadas veces")
+        with _perfilado(tarea):
+            resultado = funcion(tarea, **tarea.parametros)
+        if resultado:
+            nombre, archivo = resultado
+            if isinstance(archivo, str):
+                # Ya está guardado en el almacenamiento (por ejemplo, en la caché de reportes)
+                tarea.resultado.name = archivo
+            else:
+                with archivo:
+                    tarea.resultado.save(f'{tarea.pk}/{nombre}', File(archivo), save=False)
+            tarea.nombre_resultado = nombre
+    except Exception:
+        logger.exception("Falló la tarea %s (intento %s de %s)", tarea.pk, tarea.intentos, tarea.max_intentos)
+        tarea.error = traceback.format_exc()
+        if tarea.intentos < tarea.max_intentos:
+            tarea.estado = Tarea.PENDIENTE
+            tarea.ejecutar_desde = timezone.now() + ESPERA_REINTENTO * 2 ** (tarea.intentos - 1)
+        else:
+            tarea.estado = Tarea.FALLIDA
+            tarea.terminada = timezone.now()
+    else:
+        tarea.estado = Tarea.TERMINADA
+        tarea.terminada = timezone.now()
+        tarea.error = ''
+    tarea.save(update_fields=['estado', 'ejecutar_desde', 'resultado', 'nombre_resultado', 'informe', 'error',
+                              'terminada'])
+    return tarea
+
+
+def _perfilado(tarea):
+    if tarea.perfilar:
+        motivo = Perfil.PARAMETRO
+    elif toca_muestreo(tarea.tipo):
+        motivo = Perfil.MUESTREO
+    else:
+        return nullcontext()
+    return Perfilado(tarea.tipo, Perfil.TAREA, motivo, ruta=f'Tarea {tarea.pk}', usuario=tarea.usuario)
+
+
+def tomar_y_ejecutar(tarea_id=None):
+    """Toma una tarea y la ejecuta. Devuelve la tarea procesada o None si no había ninguna."""
+    tarea = tomar(tarea_id)
+    return ejecutar(tarea) if tarea else None
+
+
+# --- Tareas ---
+
+@registrar_tarea('exportar_reporte')
+def _exportar_reporte(tarea, reporte, nombre, objeto_id=None, version=None):
+    from .cache_reportes import guardar_en_cache, ruta_en_cache
+    from .reportes import generar_reporte
+    if version is None:
+        return nombre, generar_reporte(reporte, objeto_id)
+    # Con versión de datos el resultado queda en la caché de reportes para las próximas descargas
+    ruta = ruta_en_cache(reporte, version, objeto_id)
+    if not almacen_privado.exists(ruta):
+        with generar_reporte(reporte, objeto_id) as archivo:
+            ruta = guardar_en_cache(reporte, version, archivo, objeto_id)
+    return nombre, ruta
+
+
+@registrar_tarea('importar_socios')
+def _importar_socios(tarea, archivo, nombre):
+    from .importacion import importar_socios
+    # El archivo subido queda en el almacenamiento privado solo mientras se importa
+    try:
+        with almacen_privado.open(archivo, 'rb') as contenido:
+            tarea.informe = importar_socios(contenido, nombre).como_dict()
+    finally:
+        almacen_privado.delete(archivo)
+
+
+@registrar_tarea('generar_amortizacion')
+def _generar_amortizacion(tarea, prestamo_id):
+    from .amortizacion import generar_amortizacion
+    # No hace nada si el préstamo ya tiene su tabla, así que puede reintentarse sin duplicar cuotas
+    generar_amortizacion(Prestamo.objects.get(pk=prestamo_id))
+
+
+@registrar_tarea('distribuir_interes')
+def _distribuir_interes(tarea, prestamo_id, fecha):
+    from .saldos import distribuir_interes_prestamo
+    # El préstamo queda marcado al repartir, un reintento no paga dos veces
+    distribuir_interes_prestamo(Prestamo.objects.get(pk=prestamo_id), fecha=date.fromisoformat(fecha))
+
+
+@registrar_tarea('corte_cartera')
+def _corte_cartera(tarea):
+    from .cartera import actualizar_corte
+    actualizar_corte()
+
+
+@registrar_tarea('crear_usuario_socio')
+def _crear_usuario_socio(tarea, socio_id):
+    """Crea el usuario del socio con la cédula como usuario y contraseña temporal, en el grupo 'Socio'."""
+    socio = Socio.objects.get(pk=socio_id)
+    if socio.user_id or not socio.cedula:
+        return
+    username = socio.cedula.strip()
+    if User.objects.filter(username=username).exists():
+        logger.warning("No se creó el usuario del socio %s: el username '%s' ya existe", socio.pk, username)
+        return
+
+    with transaction.atomic():
+        usuario = User.objects.create_user(
+            username=username,
+            email=socio.email,
+            password=username,
+            first_name=socio.nombre or '',
+            last_name=socio.apellido or '',
+        )
+        grupo = Group.objects.filter(name='Socio').first()
+        if grupo:
+            usuario.groups.add(grupo)
+        else:
+            logger.warning("El grupo 'Socio' no existe; el usuario '%s' quedó sin grupo", username)
+        # update() y no save(): no vuelve a disparar la señal del socio
+        Socio.objects.filter(pk=socio.pk).update(user=usuario)
@@ -1,3 +1,1274 @@
-from django.test import TestCase
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Count, Sum
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.backends.django import Template
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph, Spacer
+
+from .amortizacion import generar_amortizacion
+from .busqueda import _buscar_con_like, buscar, palabras, usa_fts
+from .cartera import consulta_cartera, generar_corte
+from .configuracion import obtener_configuracion
+from .decorators import escritura_inmediata
+from .libros import registrar_gasto, registrar_movimiento, registrar_movimientos
+from .management.commands.benchmark_amortizacion import COLUMNAS_COMPARADAS, _generar_fila_por_fila
+from .medicion_vistas import comparar, medir_vistas
+from .middleware import MedicionPeticion, MedicionPeticionesMiddleware
+from .models import (
+    CarteraPrestamo, Configuracion, CorteCartera, GastosAdministrativos, Movimiento, PagoPrestamo, Perfil, Prestamo, ResumenMensual,
+    SaldoSocio, Socio, Tarea,
+)
+from .morosidad import anotar_morosidad, filtrar_por_estado, meses_faltantes
+from .paginacion import codificar_cursor, paginar_por_clave
+from .saldos import distribuir_interes_prestamo, obtener_resumen, recalcular_saldos
+from . import resumen_mensual
+from .registro import ArchivoRotativo
+from .reportes import ESTILOS, ESTILO_TABLA_LISTADO, escribir_pdf, generar_reporte, tablas_por_partes
+from .sembrado import sembrar
+from .tareas import (
+    ESPERA_REINTENTO, TIEMPO_MAXIMO, _TIPOS, ejecutar, encolar, registrar_tarea, tomar, tomar_y_ejecutar,
+)
+from .versiones import marcar_cambio
+
+
+class PlanesDeConsultaTests(TestCase):
+    """
+    Revisa con EXPLAIN QUERY PLAN las consultas más usadas de las vistas.
+    Si alguna vuelve a recorrer una tabla completa (cualquier SCAN, aunque sea siguiendo un
+    índice), falla, salvo las tablas indicadas en `recorridos_permitidos`.
+    """
+
+    def assertUsaIndice(self, queryset, recorridos_permitidos=()):
+        """
+        `recorridos_permitidos`: recorridos aceptados a propósito, escritos como aparecen en el
+        plan después de SCAN (por ejemplo 'tabla USING INDEX indice').
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('Las pruebas de planes de consulta están escritas para SQLite')
+        plan = queryset.explain()
+        recorridos = [
+            recorrido for recorrido in re.findall(r'\bSCAN (.+)$', plan, re.MULTILINE)
+            if recorrido.strip() not in recorridos_permitidos
+        ]
+        self.assertFalse(recorridos, 'Recorrido completo de ' + '; '.join(recorridos) + f':\n{plan}')
+
+    def test_historial_del_socio(self):
+        self.assertUsaIndice(Movimiento.objects.filter(socio_id=1).order_by('fecha_movimiento'))
+        self.assertUsaIndice(Movimiento.objects.filter(socio_id=1).order_by('-fecha_movimiento'))
+
+    def test_meses_con_aporte(self):
+        self.assertUsaIndice(
+            Movimiento.objects.filter(socio_id=1, entrada__gt=0).dates('fecha_movimiento', 'month')
+        )
+
+    def test_filtro_de_morosidad(self):
+        # El listado filtra a todos los socios: se recorren en orden, pero sus movimientos se buscan por índice
+        socios = ['app_cajaAhorros_socio USING INDEX sqlite_autoindex_app_cajaAhorros_socio_2']
+        self.assertUsaIndice(filtrar_por_estado(Socio.objects.all(), 'deudores'), socios)
+        self.assertUsaIndice(filtrar_por_estado(Socio.objects.all(), 'al_dia'), socios)
+
+    def test_cuotas_pendientes_del_prestamo(self):
+        self.assertUsaIndice(PagoPrestamo.objects.filter(prestamo_id=1, estado=False))
+
+    def test_cartera_pendiente(self):
+        # Todas las cuotas pendientes: recorre solo el índice parcial de pendientes, no la tabla
+        self.assertUsaIndice(PagoPrestamo.objects.filter(estado=False).values('saldo_pago'),
+                             ['app_cajaAhorros_pagoprestamo USING INDEX pago_pendiente_fecha_idx'])
+        self.assertUsaIndice(PagoPrestamo.objects.filter(estado=False, fecha_a_pagar__lt=date.today()))
+
+    def test_cartera_vencida_por_tramos(self):
+        self.assertUsaIndice(consulta_cartera(date.today()))
+        self.assertUsaIndice(CarteraPrestamo.objects.filter(corte_id=1, prestamo_id__in=[1, 2, 3]))
+        self.assertUsaIndice(CorteCartera.objects.filter(fecha=date.today()))
+
+    def test_prestamos_por_estado(self):
+        self.assertUsaIndice(
+            Prestamo.objects.filter(estado__in=['Aprobado', 'Rechazado', 'Terminado'])
+            .values('estado').annotate(cantidad=Count('id'), monto=Sum('cantidad_solicitada')).order_by('estado')
+        )
+        self.assertUsaIndice(Prestamo.objects.filter(estado='Aprobado'))
+
+    def test_prestamos_como_garante(self):
+        self.assertUsaIndice(Prestamo.objects.filter(garante_id=1).exclude(estado='Terminado'))
+        self.assertUsaIndice(Prestamo.objects.filter(garante_id=1, estado='Aprobado'))
+
+    def test_ultimo_gasto_administrativo(self):
+        # Con LIMIT 1 el recorrido del índice por fecha se detiene en la primera fila
+        self.assertUsaIndice(GastosAdministrativos.objects.order_by('-fecha')[:1],
+                             ['app_cajaAhorros_gastosadministrativos USING INDEX gasto_fecha_idx'])
+
+
+class RegistroConcurrenteTests(TransactionTestCase):
+    """
+    Varios hilos registran movimientos y gastos a la vez, cada uno con su propia conexión.
+    Al terminar, el saldo guardado de cada asiento debe coincidir con la suma acumulada.
+    """
+    HILOS = 8
+    ASIENTOS_POR_HILO = 15
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Se necesita una base de pruebas en archivo para abrir varias conexiones')
+        self.socios = [
+            Socio.objects.create(
+                cedula=f'09000000{i}', nombre='Socio', apellido=str(i),
+                fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1),
+            )
+            for i in range(2)
+        ]
+
+    def _registrar(self, numero, errores):
+        try:
+            for i in range(self.ASIENTOS_POR_HILO):
+                socio = self.socios[(numero + i) % len(self.socios)]
+                # Algunos asientos van con fecha anterior para forzar el recálculo del tramo
+                fecha = date(2024, 6, 1) - timedelta(days=(numero * i) % 5)
+                registrar_movimiento(Movimiento(
+                    socio=socio, detalle_movimiento='Aporte', fecha_movimiento=fecha,
+                    entrada=Decimal('10.25') if i % 4 else Decimal('0.00'),
+                    salida=Decimal('0.00') if i % 4 else Decimal('3.10'),
+                ))
+                registrar_gasto(GastosAdministrativos(
+                    fecha=date(2024, 6, 1), descripcion=f'Gasto {numero}-{i}',
+                    entrada=Decimal('1.50'), salida=Decimal('0.00'),
+                ))
+        except Exception as error:
+            errores.append(error)
+        finally:
+            connections.close_all()
+
+    def test_saldos_consistentes_con_escrituras_concurrentes(self):
+        errores = []
+        hilos = [threading.Thread(target=self._registrar, args=(n, errores)) for n in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+
+        total = self.HILOS * self.ASIENTOS_POR_HILO
+        self.assertEqual(Movimiento.objects.count(), total)
+        self.assertEqual(GastosAdministrativos.objects.count(), total)
+
+        for socio in self.socios:
+            saldo = Decimal('0.00')
+            for mov in Movimiento.objects.filter(socio=socio).order_by('fecha_movimiento', 'id'):
+                saldo += mov.entrada - mov.salida
+                self.assertEqual(mov.saldo, saldo)
+            resumen = SaldoSocio.objects.get(pk=socio.pk)
+            self.assertEqual(resumen.saldo, saldo)
+            self.assertEqual(resumen.numero_movimientos, Movimiento.objects.filter(socio=socio).count())
+
+        saldo = Decimal('0.00')
+        for gasto in GastosAdministrativos.objects.order_by('fecha', 'id'):
+            saldo += gasto.entrada - gasto.salida
+            self.assertEqual(gasto.saldo, saldo)
+
+
+class ConfiguracionSQLiteTests(TransactionTestCase):
+    """PRAGMA de settings en cada conexión, WAL solo con activar_wal; las vistas de escritura abren una transacción."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Solo aplica a SQLite')
+
+    def _pragma(self, nombre):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {nombre}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_de_la_conexion(self):
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self._pragma('temp_store'), 2)  # MEMORY
+
+    def test_wal_solo_con_el_comando(self):
+        if connection.is_in_memory_db():
+            self.skipTest('Base en memoria')
+        connection.close()
+        self.assertNotEqual(self._pragma('journal_mode'), 'wal')
+        call_command('activar_wal', stdout=StringIO())
+        connection.close()
+        self.assertEqual(self._pragma('journal_mode'), 'wal')
+        call_command('activar_wal', '--desactivar', stdout=StringIO())
+        self.assertEqual(self._pragma('journal_mode'), 'delete')
+
+    def test_escritura_inmediata_solo_en_post(self):
+        @escritura_inmediata
+        def vista(request):
+            return connection.in_atomic_block
+
+        fabrica = RequestFactory()
+        self.assertFalse(vista(fabrica.get('/')))
+        self.assertTrue(vista(fabrica.post('/')))
+
+
+class BenchmarkVistasTests(TestCase):
+    """La medición de vistas recorre todas las URL del proyecto sobre datos sembrados."""
+
+    def test_todas_las_urls_tienen_muestra(self):
+        resultado = sembrar(socios=20, anios=2, semilla=3, hoy=date(2025, 6, 30))
+        self.assertEqual(resultado.socios, 20)
+        self.assertEqual(Socio.objects.count(), 20)
+        self.assertTrue(PagoPrestamo.objects.filter(estado=False, fecha_a_pagar__lt=date(2025, 6, 30)).exists())
+
+        vistas = medir_vistas(repeticiones=1)
+        sin_muestra = [nombre for nombre, dato in vistas.items()
+                       if dato.get('omitida') in ('sin parámetros de muestra', 'no hay datos de muestra')]
+        self.assertEqual(sin_muestra, [])
+        self.assertGreater(vistas['dashboard']['consultas'], 0)
+
+    def test_comparar_marca_regresiones(self):
+        anterior = {'a': {'tiempo_ms': 10.0, 'consultas': 3}, 'b': {'tiempo_ms': 100.0, 'consultas': 5}}
+        actual = {'a': {'tiempo_ms': 14.0, 'consultas': 3}, 'b': {'tiempo_ms': 130.0, 'consultas': 6}}
+        # 'a' es 40 % más lenta pero solo 4 ms: queda bajo el mínimo
+        self.assertEqual(
+            [nombre for nombre, _ in comparar(actual, anterior, umbral=0.2, minimo_ms=5)],
+            ['b', 'b'],
+        )
+
+
+class MedicionPeticionesTests(TestCase):
+    """Cabecera Server-Timing, consultas repetidas y registro de peticiones lentas."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave')
+
+    def test_cabecera_server_timing(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get('/dashboard/')
+        self.assertEqual(respuesta.status_code, 200)
+        cabecera = respuesta['Server-Timing']
+        self.assertRegex(cabecera, r'total;dur=[\d.]+')
+        self.assertRegex(cabecera, r'sql;dur=[\d.]+;desc="[1-9]\d* consultas"')
+        self.assertGreater(float(re.search(r'plantillas;dur=([\d.]+)', cabecera).group(1)), 0)
+
+    def test_sin_efectos_globales(self):
+        render = Template.render
+        MedicionPeticionesMiddleware(lambda request: None)
+        self.assertIs(Template.render, render)
+
+    def test_consultas_repetidas(self):
+        medicion = MedicionPeticion()
+        for _ in range(4):
+            medicion(lambda *args: None, 'SELECT 1 WHERE id = %s', (1,), False, {})
+        medicion(lambda *args: None, 'SELECT 2', (), False, {})
+        self.assertEqual([(sql, veces) for sql, veces, _ in medicion.repetidas()], [('SELECT 1 WHERE id = %s', 4)])
+        self.assertIn('repetidas;desc="1 consultas repetidas, hasta 4 veces"', medicion.server_timing())
+
+    @override_settings(PETICIONES_LENTAS_MS=0)
+    def test_registro_de_peticiones_lentas(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        with self.assertLogs('app_cajaAhorros.peticiones_lentas', 'WARNING') as registro:
+            cliente.get('/dashboard/')
+        self.assertIn('GET /dashboard/ vista=dashboard estado=200', registro.output[0])
+
+    def test_carpeta_del_registro_al_primer_registro(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'logs', 'peticiones_lentas.log')
+            archivo = ArchivoRotativo(ruta, maxBytes=1024, backupCount=1, delay=True)
+            self.addCleanup(archivo.close)
+            self.assertFalse(os.path.exists(os.path.dirname(ruta)))
+            registro = logging.getLogger('app_cajaAhorros.pruebas.registro')
+            registro.addHandler(archivo)
+            self.addCleanup(registro.removeHandler, archivo)
+            registro.warning('petición lenta')
+            archivo.flush()
+            with open(ruta, encoding='utf-8') as contenido:
+                self.assertIn('petición lenta', contenido.read())
+
+
+@override_settings(ARCHIVOS_PRIVADOS=tempfile.mkdtemp(), TAREAS_EN_LINEA=False)
+class PerfiladoTests(TestCase):
+    """?perfilar=1 solo para el staff, muestreo, tareas encoladas y la página del admin."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave')
+
+    def test_perfil_pedido_por_el_staff(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get('/dashboard/?perfilar=1')
+        perfil = Perfil.objects.get()
+        self.assertEqual((perfil.nombre, perfil.origen, perfil.motivo), ('dashboard', Perfil.PETICION, Perfil.PARAMETRO))
+        self.assertEqual(respuesta['Perfil'], f'/admin/app_cajaAhorros/perfil/{perfil.pk}/change/')
+        self.assertGreater(perfil.memoria_pico_kb, 0)
+
+        pagina = self.client.get(respuesta['Perfil'])
+        self.assertContains(pagina, 'Ordered by: cumulative time')
+        self.assertContains(pagina, 'views.py')
+        descarga = self.client.get(f'/admin/app_cajaAhorros/perfil/{perfil.pk}/descargar/')
+        self.assertEqual(descarga.status_code, 200)
+
+    def test_parametro_ignorado_para_usuarios_sin_staff(self):
+        self.client.force_login(User.objects.create_user('socio', 'socio@ejemplo.com', 'clave'))
+        respuesta = self.client.get('/dashboard/?perfilar=1')
+        self.assertNotIn('Perfil', respuesta)
+        self.assertFalse(Perfil.objects.exists())
+
+    @override_settings(PERFILADO_MUESTREO=1.0, PERFILADO_SOLO=['exportar_socios_excel', 'exportar_reporte'])
+    def test_muestreo_de_peticiones_y_tareas(self):
+        self.client.force_login(self.admin)
+        self.client.get('/dashboard/')
+        respuesta = self.client.get('/socios/exportar/excel/')
+        tomar_y_ejecutar(int(respuesta.url.split('/')[-2]))
+        self.assertEqual(
+            sorted(Perfil.objects.values_list('nombre', 'origen', 'motivo')),
+            [('exportar_reporte', Perfil.TAREA, Perfil.PARAMETRO),
+             ('exportar_socios_excel', Perfil.PETICION, Perfil.MUESTREO)],
+        )
+
+    @override_settings(PERFILADO_MAXIMO=2)
+    def test_conserva_los_ultimos(self):
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            self.client.get('/socios/?perfilar=1')
+        self.assertEqual(Perfil.objects.count(), 2)
+
+
+class AnaliticaTests(TestCase):
+    """Endpoints JSON del panel: ETag, 304 con los datos sin cambios y rango de fechas."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave'))
+        self.socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                          fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, 1, 10))
+
+    def test_no_modificado_hasta_que_cambian_los_datos(self):
+        url = '/api/v1/analitica/flujo_caja/'
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_movimiento(Movimiento(socio=self.socio, detalle_movimiento='Aporte', entrada=Decimal('25.00'),
+                                            salida=Decimal('0.00'), fecha_movimiento=date(2024, 2, 5)))
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.json()['meses'][-1], {
+            'mes': '2024-02', 'entradas': 25.0, 'salidas': 0.0, 'neto': 25.0, 'prestado': 0.0, 'cobrado': 0.0,
+        })
+
+    def test_rango_de_fechas(self):
+        Socio.objects.create(cedula='0102030406', nombre='Luis', apellido='Vera',
+                             fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, 3, 2))
+        datos = self.client.get('/api/v1/analitica/socios/?desde=2024-02-01').json()
+        self.assertEqual(datos['meses'], [{'mes': '2024-03', 'nuevos': 1, 'total': 2}])
+        self.assertEqual(datos['activos'], 2)
+        self.assertEqual(self.client.get('/api/v1/analitica/socios/?desde=2024-13-01').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/analitica/desconocida/').status_code, 404)
+
+    def test_todas_las_series(self):
+        for nombre in ('flujo_caja', 'prestamos_por_estado', 'cartera', 'socios'):
+            respuesta = self.client.get(f'/api/v1/analitica/{nombre}/?desde=2024-01-01&hasta=2024-12-31')
+            self.assertEqual(respuesta.status_code, 200, nombre)
+            self.assertEqual(respuesta.json()['version'], 'v1')
+
+
+class BusquedaSociosTests(TestCase):
+    """Búsqueda de socios con FTS5: relevancia, acentos, sincronía con los cambios y el respaldo con LIKE."""
+
+    def setUp(self):
+        datos = [
+            ('0912345678', 'Ana María', 'Pérez Gómez', 'ana@correo.ec', '0991112233'),
+            ('0923456789', 'Luis', 'Gómez Vera', 'luis.gomez@correo.ec', '0987654321'),
+            ('1712345678', 'Carmen', 'Torres Ruiz', None, None),
+        ]
+        self.socios = [
+            Socio.objects.create(cedula=cedula, nombre=nombre, apellido=apellido, email=email, telefono=telefono,
+                                 fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, 1, 1))
+            for cedula, nombre, apellido, email, telefono in datos
+        ]
+
+    def cedulas(self, texto):
+        return [socio.cedula for socio in buscar(Socio.objects.all(), texto)]
+
+    def test_busqueda_fts(self):
+        if not usa_fts():
+            self.skipTest('SQLite sin FTS5')
+        self.assertEqual(self.cedulas('091'), ['0912345678'])
+        self.assertEqual(self.cedulas('perez'), ['0912345678'])
+        self.assertEqual(self.cedulas('gomez luis'), ['0923456789'])
+        self.assertEqual(self.cedulas('luis.gomez@correo'), ['0923456789'])
+        self.assertEqual(self.cedulas('09876'), ['0923456789'])
+        self.assertEqual(self.cedulas('"OR nombre:*'), [])
+        # La coincidencia en el apellido pesa más que en el email
+        self.assertEqual(self.cedulas('gomez')[0], '0923456789')
+
+    def test_indice_sigue_los_cambios(self):
+        if not usa_fts():
+            self.skipTest('SQLite sin FTS5')
+        carmen = self.socios[2]
+        carmen.apellido = 'Andrade'
+        carmen.save()
+        self.assertEqual(self.cedulas('torres'), [])
+        self.assertEqual(self.cedulas('andrade'), ['1712345678'])
+        carmen.delete()
+        self.assertEqual(self.cedulas('andrade'), [])
+
+    def test_respaldo_con_like(self):
+        def cedulas(texto):
+            return [socio.cedula for socio in _buscar_con_like(Socio.objects.all(), palabras(texto))]
+        self.assertEqual(cedulas('091'), ['0912345678'])
+        self.assertEqual(cedulas('gómez'), ['0923456789', '0912345678'])
+        self.assertEqual(cedulas('maría ana'), ['0912345678'])
+
+    def test_lista_de_socios_con_busqueda(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave'))
+        respuesta = self.client.get('/socios/', {'q': 'Torres'})
+        self.assertEqual([socio.cedula for socio in respuesta.context['socios']], ['1712345678'])
+        self.assertContains(respuesta, 'value="Torres"')
+
+
+class AmortizacionTests(TestCase):
+    """El cálculo en lote da las mismas cuotas al centavo que el cálculo fila por fila anterior."""
+
+    def setUp(self):
+        self.socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                          fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+
+    def prestamo(self, monto, interes, plazo, cuota=None):
+        return Prestamo.objects.create(socio=self.socio, cantidad_solicitada=Decimal(monto), plazo=plazo,
+                                       interes=Decimal(interes), cuota=cuota, estado='Aprobado',
+                                       fecha_aprobacion=date(2025, 1, 31))
+
+    def tabla(self, prestamo):
+        prestamo.refresh_from_db()
+        return prestamo.cuota, list(prestamo.pagos.order_by('cuota_pago').values_list(*COLUMNAS_COMPARADAS))
+
+    def test_igual_al_calculo_fila_por_fila(self):
+        casos = [
+            ('5000.00', '12.00', 12, None),
+            ('5000.00', '12.00', 120, None),
+            ('1234.56', '5.50', 7, None),
+            ('800.00', '18.75', 1, None),
+            ('999.99', '36.00', 60, None),
+            ('1500.00', '0.00', 9, None),
+            ('1000.00', '10.00', 10, None),
+            # Cuota fijada a mano: la última cuota ajusta lo que sobra o falta del saldo
+            ('2000.00', '12.00', 6, Decimal('350.00')),
+            ('2000.00', '12.00', 6, Decimal('340.00')),
+        ]
+        for monto, interes, plazo, cuota in casos:
+            with self.subTest(monto=monto, interes=interes, plazo=plazo, cuota=cuota):
+                anterior = self.prestamo(monto, interes, plazo, cuota)
+                _generar_fila_por_fila(anterior)
+                nuevo = self.prestamo(monto, interes, plazo, cuota)
+                self.assertEqual(len(generar_amortizacion(nuevo)), plazo)
+                self.assertEqual(self.tabla(nuevo), self.tabla(anterior))
+
+    def test_ultima_cuota_cancela_el_saldo(self):
+        prestamo = self.prestamo('1000.00', '10.00', 10)
+        generar_amortizacion(prestamo)
+        pagos = list(prestamo.pagos.order_by('cuota_pago'))
+        self.assertEqual(sum(pago.capital_pago for pago in pagos), Decimal('1000.00'))
+        self.assertEqual(pagos[-1].capital_pago, pagos[-1].saldo_pago)
+        self.assertEqual(pagos[-1].fecha_a_pagar, date(2025, 10, 31))
+
+    def test_generar_es_idempotente(self):
+        prestamo = self.prestamo('5000.00', '12.00', 12)
+        generar_amortizacion(prestamo)
+        tabla = self.tabla(prestamo)
+        # Un reintento de la tarea no duplica cuotas ni cambia la cuota guardada
+        self.assertEqual(generar_amortizacion(Prestamo.objects.get(pk=prestamo.pk)), [])
+        tarea = encolar('generar_amortizacion', prestamo_id=prestamo.pk)
+        self.assertEqual(tomar_y_ejecutar(tarea.pk).estado, Tarea.TERMINADA)
+        self.assertEqual(self.tabla(prestamo), tabla)
+
+
+class CorteCarteraTests(TestCase):
+    """Las vistas solo leen el último corte; lo recalcula la tarea que encolan los cambios en los pagos."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave'))
+        socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                     fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+        self.prestamo = Prestamo.objects.create(socio=socio, fecha_prestamo=date.today() - timedelta(days=90),
+                                                cantidad_solicitada=Decimal('300.00'), plazo=3, estado='Aprobado')
+
+    def crear_cuota(self, numero, dias_atraso):
+        return PagoPrestamo.objects.create(
+            prestamo=self.prestamo, cuota_pago=numero, saldo_pago=Decimal('0.00'), capital_pago=Decimal('100.00'),
+            interes_pago=Decimal('5.00'), plazo_pago=3 - numero, valor_cuota_pago=Decimal('105.00'), estado=False,
+            fecha_a_pagar=date.today() - timedelta(days=dias_atraso),
+        )
+
+    def test_las_vistas_no_recalculan_el_corte(self):
+        self.crear_cuota(1, 45)
+        self.crear_cuota(2, 15)
+        tarea = Tarea.objects.get(tipo='corte_cartera', estado=Tarea.PENDIENTE)
+        for url in ('/prestamos/cartera-vencida/', '/prestamos/', '/api/v1/analitica/cartera/'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.assertFalse(CorteCartera.objects.exists())
+
+        tomar_y_ejecutar(tarea.pk)
+        corte = CorteCartera.objects.get()
+        self.assertEqual((corte.fecha, corte.total_vencido), (date.today(), Decimal('210.00')))
+        respuesta = self.client.get('/prestamos/cartera-vencida/')
+        self.assertEqual([fila.prestamo_id for fila in respuesta.context['prestamos']], [self.prestamo.pk])
+
+    def test_corte_viejo_se_recalcula_y_muestra_su_fecha(self):
+        self.crear_cuota(1, 45)
+        Tarea.objects.filter(tipo='corte_cartera').delete()
+        ayer = date.today() - timedelta(days=1)
+        generar_corte(ayer)
+        for url, texto in [('/dashboard/', f'Corte del {ayer:%d/%m/%Y}'), ('/prestamos/', f'al {ayer:%d/%m/%Y}'),
+                           ('/prestamos/cartera-vencida/', f'Corte del {ayer:%d/%m/%Y}')]:
+            self.assertContains(self.client.get(url), texto, msg_prefix=url)
+        # Una sola tarea para todas las páginas que vieron el corte viejo
+        tarea = Tarea.objects.get(tipo='corte_cartera')
+        tomar_y_ejecutar(tarea.pk)
+        respuesta = self.client.get('/prestamos/cartera-vencida/')
+        self.assertEqual(respuesta.context['corte'].fecha, date.today())
+        self.assertNotContains(respuesta, 'Se está actualizando')
+        self.assertFalse(Tarea.objects.filter(tipo='corte_cartera', estado=Tarea.PENDIENTE).exists())
+
+    def test_corte_de_una_fecha_pasada_no_borra_el_detalle_del_ultimo(self):
+        self.crear_cuota(1, 45)
+        hoy = generar_corte()
+        anterior = generar_corte(date.today() - timedelta(days=10))
+        self.assertEqual(anterior.monto_31_60, Decimal('105.00'))
+        self.assertEqual(list(hoy.prestamos.values_list('prestamo_id', flat=True)), [self.prestamo.pk])
+        self.assertFalse(anterior.prestamos.exists())
+        generar_corte(date.today() + timedelta(days=1))
+        self.assertFalse(CarteraPrestamo.objects.filter(corte=hoy).exists())
+
+
+class AportesMensualesTests(TestCase):
+    """Vista previa y registro del aporte del mes para todos los socios activos."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave'))
+        self.socios = [
+            Socio.objects.create(cedula=cedula, nombre='Socio', apellido=apellido,
+                                 fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+            for cedula, apellido in (('0102030405', 'Andrade'), ('0102030406', 'Borja'))
+        ]
+
+    def enviar(self, accion='', **extra):
+        datos = dict(mes='2024-05', fecha_movimiento='2024-05-10', monto='20.00', detalle='', **extra)
+        if accion:
+            datos['accion'] = accion
+        return self.client.post('/aportes/mensuales/', datos)
+
+    def test_vista_previa_no_registra(self):
+        respuesta = self.enviar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([(fila.monto, marcado) for fila, marcado in respuesta.context['filas']],
+                         [(Decimal('20.00'), True), (Decimal('20.00'), True)])
+        self.assertFalse(Movimiento.objects.exists())
+
+    def test_registrar_y_volver_a_enviar_no_duplica(self):
+        andrade, borja = self.socios
+        datos = dict(socios=[andrade.pk, borja.pk], **{f'monto_{andrade.pk}': '25.50'})
+        self.assertRedirects(self.enviar('registrar', **datos), '/socios/', fetch_redirect_response=False)
+        self.enviar('registrar', **datos)
+        self.assertEqual(
+            sorted(Movimiento.objects.values_list('socio_id', 'entrada', 'detalle_movimiento')),
+            [(andrade.pk, Decimal('25.50'), 'Aporte mensual 05/2024'), (borja.pk, Decimal('20.00'), 'Aporte mensual 05/2024')],
+        )
+
+    def test_montos_no_finitos(self):
+        andrade = self.socios[0]
+        for enviado in ('NaN', 'sNaN', 'Infinity', '-1', 'abc'):
+            respuesta = self.enviar('registrar', socios=[andrade.pk], **{f'monto_{andrade.pk}': enviado})
+            self.assertEqual(respuesta.status_code, 200, enviado)
+            self.assertContains(respuesta, 'Monto inválido')
+        self.assertFalse(Movimiento.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacionSociosTests(TestCase):
+    """Validación por fila, simulación (--simular) e importación desde la vista como tarea."""
+
+    ENCABEZADO = 'cedula;nombre;apellido;email;fecha_nacimiento;fecha_ingreso\n'
+
+    def setUp(self):
+        Socio.objects.create(cedula='0900000001', nombre='Ya', apellido='Existe',
+                             fecha_nacimiento=date(1980, 1, 1), fecha_ingreso=date(2020, 1, 1))
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def archivo(self, filas):
+        ruta = f'{self.directorio.name}/socios.csv'
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(self.ENCABEZADO + ''.join(filas))
+        return ruta
+
+    def importar(self, ruta, *opciones):
+        salida = StringIO()
+        call_command('importar_socios', ruta, *opciones, stdout=salida)
+        return salida.getvalue()
+
+    def test_validacion_y_simulacion(self):
+        ruta = self.archivo([
+            '0900000002;Ana;Pérez;ana@correo.ec;1990-01-31;01/02/2024\n',
+            '0900000002;Ana;Repetida;;1990-01-31;2024-02-01\n',
+            '0900000001;Ya;Existe;;1980-01-01;2020-01-01\n',
+            '0900000003;Luis;;;1990-13-01;2024-02-01\n',
+        ])
+        salida = self.importar(ruta, '--simular')
+        self.assertIn('Simulación: 4 filas leídas, 1 válidas, 3 con errores', salida)
+        self.assertIn('Fila 3 (0900000002): Cédula repetida en el archivo (fila 2).', salida)
+        self.assertIn('Fila 4 (0900000001): Ya existe un socio con esta cédula.', salida)
+        self.assertIn('Fila 5 (0900000003): ', salida)
+        self.assertEqual(Socio.objects.count(), 1)
+
+        self.assertIn('4 filas leídas, 1 socios creados, 3 con errores', self.importar(ruta, '--procesos', '1'))
+        ana = Socio.objects.get(cedula='0900000002')
+        self.assertEqual((ana.fecha_ingreso, ana.user.username), (date(2024, 2, 1), '0900000002'))
+        self.assertTrue(ana.user.check_password('0900000002'))
+        self.assertTrue(Movimiento.objects.filter(socio=ana, detalle_movimiento='Aporte inicial').exists())
+
+    def test_faltan_columnas(self):
+        ruta = f'{self.directorio.name}/socios.csv'
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('cedula;nombre\n0900000002;Ana\n')
+        self.assertIn('Faltan columnas: apellido, fecha_nacimiento, fecha_ingreso', self.importar(ruta))
+
+    def test_la_vista_importa_en_segundo_plano(self):
+        privado = tempfile.TemporaryDirectory()
+        self.addCleanup(privado.cleanup)
+        ajustes = override_settings(ARCHIVOS_PRIVADOS=privado.name, TAREAS_EN_LINEA=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave'))
+        filas = ''.join(f'09100000{i:02d};Socio;Nuevo;;1990-01-01;2024-01-01\n' for i in range(20))
+
+        # La simulación se responde en la misma petición sin guardar nada
+        archivo = SimpleUploadedFile('socios.csv', (self.ENCABEZADO + filas).encode())
+        respuesta = self.client.post('/socios/importar/', {'archivo': archivo, 'simular': 'on'})
+        self.assertEqual(respuesta.context['resultado'].validos, 20)
+        self.assertContains(respuesta, '20 válidas')
+
+        # La importación real no calcula contraseñas en la petición: la hace el worker
+        archivo = SimpleUploadedFile('socios.csv', (self.ENCABEZADO + filas).encode())
+        with mock.patch('app_cajaAhorros.importacion.hashear_claves') as hashear:
+            respuesta = self.client.post('/socios/importar/', {'archivo': archivo})
+        hashear.assert_not_called()
+        self.assertEqual(Socio.objects.count(), 1)
+        tarea = Tarea.objects.get(tipo='importar_socios')
+        self.assertRedirects(respuesta, f'/tareas/{tarea.pk}/', fetch_redirect_response=False)
+        self.assertEqual(tarea.max_intentos, 1)
+
+        with mock.patch('app_cajaAhorros.claves.ProcessPoolExecutor') as pool:
+            tarea = tomar_y_ejecutar(tarea.pk)
+        pool.assert_not_called()
+        self.assertEqual(tarea.estado, Tarea.TERMINADA)
+        self.assertEqual((tarea.informe['creados'], tarea.informe['errores']), (20, []))
+        self.assertEqual(Socio.objects.count(), 21)
+        self.assertEqual(os.listdir(os.path.join(privado.name, 'importaciones')), [])
+        self.assertTrue(self.client.get(f'/tareas/{tarea.pk}/?formato=json').json()['informe'])
+        self.assertContains(self.client.get(f'/tareas/{tarea.pk}/'), '20 socios creados')
+
+
+class SaldosAcumuladosTests(TestCase):
+    """El saldo acumulado de cada movimiento sigue al historial con cambios fuera de orden."""
+
+    def setUp(self):
+        self.socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                          fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+        self.movimientos = [
+            self.registrar(entrada, salida, date(2024, mes, 10))
+            for mes, entrada, salida in ((1, '100.00', '0'), (2, '50.00', '0'), (3, '0', '30.00'), (4, '20.00', '0'))
+        ]
+
+    def registrar(self, entrada, salida, fecha):
+        return registrar_movimiento(Movimiento(socio=self.socio, detalle_movimiento='Movimiento', entrada=Decimal(entrada),
+                                               salida=Decimal(salida), fecha_movimiento=fecha))
+
+    def assertSaldosAcumulados(self):
+        esperado = Decimal('0.00')
+        for movimiento in Movimiento.objects.filter(socio=self.socio).order_by('fecha_movimiento', 'id'):
+            esperado += movimiento.entrada - movimiento.salida
+            self.assertEqual(movimiento.saldo, esperado, movimiento.fecha_movimiento)
+        self.assertEqual(SaldoSocio.objects.get(socio=self.socio).saldo, esperado)
+
+    def cambios_fuera_de_orden(self):
+        self.assertSaldosAcumulados()
+        self.registrar('5.00', '0', date(2024, 1, 20))
+        self.assertSaldosAcumulados()
+        abril = self.movimientos[3]
+        abril.fecha_movimiento = date(2024, 1, 5)
+        abril.entrada = Decimal('40.00')
+        abril.save()
+        self.assertSaldosAcumulados()
+        self.movimientos[1].delete()
+        self.assertSaldosAcumulados()
+        registrar_movimientos([
+            Movimiento(socio=self.socio, detalle_movimiento='Lote', entrada=Decimal('0'), salida=Decimal('12.50'),
+                       fecha_movimiento=date(2023, 12, 31)),
+            Movimiento(socio=self.socio, detalle_movimiento='Lote', entrada=Decimal('7.00'), salida=Decimal('0'),
+                       fecha_movimiento=date(2024, 5, 1)),
+        ])
+        self.assertSaldosAcumulados()
+
+    def test_cambios_fuera_de_orden(self):
+        self.cambios_fuera_de_orden()
+
+    def test_cambios_fuera_de_orden_por_lotes(self):
+        with mock.patch('app_cajaAhorros.saldos._soporta_update_con_ventana', return_value=False):
+            self.cambios_fuera_de_orden()
+
+    def test_solo_reescribe_desde_la_fecha(self):
+        for soporta in (True, False):
+            Movimiento.objects.filter(socio=self.socio).update(saldo=0)
+            with mock.patch('app_cajaAhorros.saldos._soporta_update_con_ventana', return_value=soporta):
+                self.assertEqual(recalcular_saldos(self.socio, date(2024, 3, 1)), 2)
+            saldos = list(Movimiento.objects.filter(socio=self.socio).order_by('fecha_movimiento').values_list('saldo', flat=True))
+            self.assertEqual(saldos, [Decimal('0'), Decimal('0'), Decimal('120.00'), Decimal('140.00')])
+
+
+class ReportesExcelTests(TestCase):
+    """Los libros escritos en modo write-only se vuelven a abrir con sus encabezados, filas y totales."""
+
+    def setUp(self):
+        self.socios = [
+            Socio.objects.create(cedula=f'01020304{i:02d}', nombre=f'Socio {i}', apellido=f'Apellido {i}',
+                                 fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1), activo=i < 3)
+            for i in range(4)
+        ]
+
+    def libro(self, reporte, objeto_id=None):
+        with generar_reporte(reporte, objeto_id) as archivo:
+            libro = load_workbook(BytesIO(archivo.read()))
+        self.assertEqual(len(libro.sheetnames), 1)
+        return list(libro.active.iter_rows(values_only=True))
+
+    def test_socios(self):
+        filas = self.libro('socios_excel')
+        self.assertEqual(filas[0], ('#', 'Cédula', 'Nombres', 'Apellidos', 'Teléfono', 'Email', 'Fecha de Ingreso'))
+        self.assertEqual([fila[1] for fila in filas[1:]], ['0102030400', '0102030401', '0102030402'])
+        self.assertEqual(filas[1][0], 1)
+
+    def test_prestamos(self):
+        for monto in ('500.00', '1500.00'):
+            Prestamo.objects.create(socio=self.socios[0], garante=self.socios[1], cantidad_solicitada=Decimal(monto),
+                                    plazo=12, interes=Decimal('12.00'), fecha_aprobacion=date(2025, 1, 31))
+        filas = self.libro('prestamos_excel')
+        self.assertEqual(filas[0][:4], ('Fecha Aprobación', 'Solicitante', 'Garante', 'Cantidad Solicitada'))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(sum(fila[3] for fila in filas[1:]), 2000.0)
+        self.assertEqual(filas[1][2], 'Socio 1 Apellido 1')
+
+    def test_gastos_con_totales(self):
+        for descripcion, entrada, salida in [('Aporte', '250.00', '0.00'), ('Papelería', '0.00', '40.50'),
+                                             ('Luz', '0.00', '19.25')]:
+            registrar_gasto(GastosAdministrativos(fecha=date(2024, 1, 1), descripcion=descripcion,
+                                                  entrada=Decimal(entrada), salida=Decimal(salida)))
+        filas = self.libro('gastos_excel')
+        self.assertEqual(filas[0], ('Fecha', 'Descripción', 'Entrada', 'Salida', 'Saldo'))
+        self.assertEqual([fila[1] for fila in filas[1:4]], ['Aporte', 'Papelería', 'Luz'])
+        self.assertEqual(filas[3][4], 190.25)
+        totales = dict((fila[1], fila[2]) for fila in filas[5:])
+        self.assertEqual(totales, {'Total Entradas': 250.0, 'Total Salidas': 59.75, 'Saldo Actual': 190.25})
+
+    def test_amortizacion(self):
+        prestamo = Prestamo.objects.create(socio=self.socios[0], cantidad_solicitada=Decimal('1000.00'), plazo=10,
+                                           interes=Decimal('10.00'), estado='Aprobado',
+                                           fecha_aprobacion=date(2025, 1, 31))
+        generar_amortizacion(prestamo)
+        filas = self.libro('amortizacion_excel', prestamo.pk)
+        self.assertEqual(filas[0][:2], ('Solicitante:', 'Socio 0 Apellido 0'))
+        self.assertEqual(filas[6], ('#', 'Saldo', 'Capital', 'Interés', 'Cuota', 'Fecha a Pagar', 'Estado'))
+        cuotas = filas[7:]
+        self.assertEqual(len(cuotas), 10)
+        self.assertAlmostEqual(sum(fila[2] for fila in cuotas), 1000.0, places=2)
+        self.assertEqual(cuotas[-1][5:], ('31/10/2025', 'Pendiente'))
+
+
+class PdfPorPartesTests(TestCase):
+    """Los listados en PDF se arman con tablas cortas, incluidos títulos que van con lo siguiente."""
+
+    def test_pdf_con_titulos_que_van_con_lo_siguiente(self):
+        titulo = ParagraphStyle('TituloSeccion', parent=ESTILOS['Heading2'], keepWithNext=1)
+        secciones = []
+        for numero in range(30):
+            secciones += [Paragraph(f'Sección {numero}', titulo), Paragraph('Detalle', titulo)]
+            secciones += tablas_por_partes(['Cédula', 'Nombre'], [[str(i), 'Socio'] for i in range(15)],
+                                           ESTILO_TABLA_LISTADO, [100, 200])
+        archivo = BytesIO()
+        escribir_pdf(archivo, [Paragraph('Reporte', ESTILOS['Title'])], iter(secciones))
+        self.assertTrue(archivo.getvalue().startswith(b'%PDF'))
+
+
+class DistribucionInteresTests(TestCase):
+    """El interés de un préstamo terminado se reparte una sola vez entre los socios activos."""
+
+    def setUp(self):
+        self.socios = [
+            Socio.objects.create(cedula=f'010203040{i}', nombre='Socio', apellido=str(i), activo=i < 3,
+                                 fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+            for i in range(4)
+        ]
+        self.prestamo = Prestamo.objects.create(socio=self.socios[0], fecha_prestamo=date(2024, 1, 10),
+                                                cantidad_solicitada=Decimal('200.00'), plazo=2, estado='Terminado')
+        for cuota, interes in ((1, '20.00'), (2, '10.00')):
+            PagoPrestamo.objects.create(
+                prestamo=self.prestamo, cuota_pago=cuota, saldo_pago=Decimal('0.00'), capital_pago=Decimal('100.00'),
+                interes_pago=Decimal(interes), plazo_pago=2 - cuota, valor_cuota_pago=Decimal('100.00') + Decimal(interes),
+                estado=True, fecha_a_pagar=date(2024, 1 + cuota, 10),
+            )
+
+    def assertRepartidoUnaVez(self):
+        repartos = Movimiento.objects.filter(detalle_movimiento='Interes generado por prestamo')
+        self.assertEqual(sorted(repartos.values_list('socio__cedula', 'entrada', 'saldo')), [
+            (socio.cedula, Decimal('10.00'), Decimal('10.00')) for socio in self.socios[:3]
+        ])
+        self.assertEqual(sorted(SaldoSocio.objects.values_list('socio__cedula', 'saldo')), [
+            (socio.cedula, Decimal('10.00')) for socio in self.socios[:3]
+        ])
+        self.prestamo.refresh_from_db()
+        self.assertTrue(self.prestamo.interes_distribuido)
+
+    def test_repartir_dos_veces(self):
+        self.assertEqual(distribuir_interes_prestamo(self.prestamo, fecha=date(2024, 4, 1)), 3)
+        self.assertEqual(distribuir_interes_prestamo(Prestamo.objects.get(pk=self.prestamo.pk)), 0)
+        self.assertRepartidoUnaVez()
+
+    def test_socio_con_movimientos_posteriores(self):
+        registrar_movimiento(Movimiento(socio=self.socios[0], detalle_movimiento='Aporte', entrada=Decimal('50.00'),
+                                        salida=Decimal('0.00'), fecha_movimiento=date(2024, 3, 1)))
+        registrar_movimiento(Movimiento(socio=self.socios[0], detalle_movimiento='Retiro', entrada=Decimal('0.00'),
+                                        salida=Decimal('20.00'), fecha_movimiento=date(2024, 5, 1)))
+        self.assertEqual(distribuir_interes_prestamo(self.prestamo, fecha=date(2024, 4, 1)), 3)
+        self.assertEqual(
+            list(Movimiento.objects.filter(socio=self.socios[0]).order_by('fecha_movimiento')
+                 .values_list('detalle_movimiento', 'saldo')),
+            [('Aporte', Decimal('50.00')), ('Interes generado por prestamo', Decimal('60.00')),
+             ('Retiro', Decimal('40.00'))],
+        )
+        self.assertEqual(obtener_resumen(self.socios[0]).saldo, Decimal('40.00'))
+        self.assertEqual(obtener_resumen(self.socios[1]).saldo, Decimal('10.00'))
+
+    def test_tarea_repetida(self):
+        tareas = [encolar('distribuir_interes', prestamo_id=self.prestamo.pk, fecha='2024-04-01') for _ in range(2)]
+        for tarea in tareas:
+            tomar_y_ejecutar(tarea.pk)
+        self.assertEqual(list(Tarea.objects.filter(pk__in=[t.pk for t in tareas]).values_list('estado', flat=True)),
+                         [Tarea.TERMINADA, Tarea.TERMINADA])
+        self.assertRepartidoUnaVez()
+
+
+class PaginacionKeysetTests(TestCase):
+    """Recorrido por cursores en ambos sentidos y cursores alterados o inválidos."""
+
+    def setUp(self):
+        datos = [('Andrade', 3), ('Borja', 1), ('Andrade', 1), ('Cueva', 2), ('Borja', 2), ('Andrade', 2), ('Díaz', 1)]
+        for numero, (apellido, mes) in enumerate(datos):
+            Socio.objects.create(cedula=f'01020304{numero:02d}', nombre='Socio', apellido=apellido,
+                                 fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, mes, 1))
+
+    def recorrer(self, orden):
+        ids, pagina = [], paginar_por_clave(Socio.objects.all(), orden, tamano=3)
+        paginas = [pagina]
+        ids += [socio.pk for socio in pagina]
+        while pagina.has_next:
+            pagina = paginar_por_clave(Socio.objects.all(), orden, despues=pagina.siguiente, tamano=3)
+            paginas.append(pagina)
+            ids += [socio.pk for socio in pagina]
+        return ids, paginas
+
+    def test_recorre_en_orden_sin_repetir(self):
+        for orden in (['apellido', 'id'], ['-fecha_ingreso', 'apellido', '-id']):
+            ids, paginas = self.recorrer(orden)
+            self.assertEqual(ids, list(Socio.objects.order_by(*orden).values_list('pk', flat=True)), orden)
+            self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+            self.assertFalse(paginas[0].has_previous)
+
+            # Hacia atrás desde la última página se vuelve a las mismas páginas
+            pagina = paginar_por_clave(Socio.objects.all(), orden, antes=paginas[-1].anterior, tamano=3)
+            self.assertEqual([socio.pk for socio in pagina], [socio.pk for socio in paginas[1]])
+            pagina = paginar_por_clave(Socio.objects.all(), orden, antes=pagina.anterior, tamano=3)
+            self.assertEqual([socio.pk for socio in pagina], [socio.pk for socio in paginas[0]])
+            self.assertFalse(pagina.has_previous)
+
+    def test_cursores_alterados(self):
+        orden = ['-fecha_ingreso', 'id']
+        primera = [socio.pk for socio in paginar_por_clave(Socio.objects.all(), orden, tamano=3)]
+        valido = paginar_por_clave(Socio.objects.all(), orden, tamano=3).siguiente
+        for cursor in (
+            valido[:-2] + ('A' if valido[-2] != 'A' else 'B') + valido[-1],  # firma que no coincide
+            'no-es-un-cursor',
+            codificar_cursor(['2024-01-01']),  # cantidad de valores distinta a la del orden
+            codificar_cursor(['no-es-fecha', '1']),  # valor que no se convierte al tipo del campo
+        ):
+            for parametro in ('despues', 'antes'):
+                pagina = paginar_por_clave(Socio.objects.all(), orden, tamano=3, **{parametro: cursor})
+                self.assertEqual([socio.pk for socio in pagina], primera, (parametro, cursor))
+                self.assertFalse(pagina.has_previous)
+
+
+class MorosidadTests(TestCase):
+    """Meses sin aporte del socio, igual en la lista detallada y en la anotación de la consulta."""
+
+    def setUp(self):
+        self.socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                          fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, 1, 1))
+        for fecha, entrada, salida in (
+            (date(2024, 1, 5), '20.00', '0'),
+            (date(2024, 2, 10), '0', '5.00'),  # un retiro no cuenta como aporte
+            (date(2024, 3, 31), '20.00', '0'),
+            (date(2024, 3, 1), '20.00', '0'),  # dos aportes en el mismo mes
+            (date(2024, 5, 20), '20.00', '0'),
+        ):
+            registrar_movimiento(Movimiento(socio=self.socio, detalle_movimiento='Movimiento', entrada=Decimal(entrada),
+                                            salida=Decimal(salida), fecha_movimiento=fecha))
+
+    def test_meses_faltantes(self):
+        hoy = date(2024, 6, 15)
+        esperado = [date(2024, mes, 1).strftime('%B %Y') for mes in (2, 4, 6)]
+        self.assertEqual(meses_faltantes(self.socio, hoy=hoy), esperado)
+        self.assertEqual(anotar_morosidad(Socio.objects.filter(pk=self.socio.pk), hoy).get().meses_faltantes, 3)
+        self.assertEqual(meses_faltantes(self.socio, hoy=date(2024, 3, 31)), [esperado[0]])
+
+    def test_socio_sin_movimientos(self):
+        nuevo = Socio.objects.create(cedula='0102030406', nombre='Luis', apellido='Vera',
+                                     fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2024, 1, 1))
+        self.assertEqual(meses_faltantes(nuevo, hoy=date(2024, 6, 15)), [])
+        self.assertIn(nuevo, filtrar_por_estado(Socio.objects.all(), 'deudores', hoy=date(2024, 6, 15)))
+
+
+class TareasTests(TestCase):
+    """Toma de tareas entre workers, reintentos con espera creciente y tareas abandonadas."""
+
+    def setUp(self):
+        self.fallas = 0
+
+        @registrar_tarea('prueba')
+        def prueba(tarea, fallar=False):
+            if fallar:
+                self.fallas += 1
+                raise ValueError(f'falla {self.fallas}')
+        self.addCleanup(_TIPOS.pop, 'prueba')
+
+    def test_una_tarea_se_toma_una_sola_vez(self):
+        tarea = encolar('prueba')
+        tomada = tomar()
+        self.assertEqual((tomada.pk, tomada.estado, tomada.intentos), (tarea.pk, Tarea.EN_PROCESO, 1))
+        self.assertIsNone(tomar())
+        self.assertIsNone(tomar(tarea.pk))
+        self.assertEqual(ejecutar(tomada).estado, Tarea.TERMINADA)
+        self.assertIsNone(tomar_y_ejecutar(tarea.pk))
+
+    def test_tarea_abandonada_se_vuelve_a_tomar(self):
+        tarea = encolar('prueba', max_intentos=2)
+        tomar(tarea.pk)
+        Tarea.objects.filter(pk=tarea.pk).update(iniciada=timezone.now() - TIEMPO_MAXIMO - timedelta(seconds=1))
+        self.assertEqual(tomar_y_ejecutar().estado, Tarea.TERMINADA)
+
+        # Un worker que se detiene en cada intento no la deja en proceso para siempre
+        tarea = encolar('prueba', max_intentos=1)
+        tomar(tarea.pk)
+        Tarea.objects.filter(pk=tarea.pk).update(iniciada=timezone.now() - TIEMPO_MAXIMO - timedelta(seconds=1))
+        with self.assertLogs('app_cajaAhorros.tareas', 'ERROR'):
+            fallida = tomar_y_ejecutar(tarea.pk)
+        self.assertEqual((fallida.estado, fallida.intentos), (Tarea.FALLIDA, 2))
+        self.assertIn('abandonó', fallida.error)
+
+    def test_reintentos_con_espera_creciente(self):
+        tarea = encolar('prueba', max_intentos=3, fallar=True)
+        for intento in (1, 2):
+            antes = timezone.now()
+            with self.assertLogs('app_cajaAhorros.tareas', 'ERROR'):
+                tarea = tomar_y_ejecutar(tarea.pk)
+            espera = ESPERA_REINTENTO * 2 ** (intento - 1)
+            self.assertEqual((tarea.estado, tarea.intentos), (Tarea.PENDIENTE, intento))
+            self.assertTrue(antes + espera <= tarea.ejecutar_desde <= timezone.now() + espera)
+            self.assertIn(f'ValueError: falla {intento}', tarea.error)
+            # Todavía no le toca: ningún worker la toma antes de la espera
+            self.assertIsNone(tomar(tarea.pk))
+            Tarea.objects.filter(pk=tarea.pk).update(ejecutar_desde=timezone.now())
+        with self.assertLogs('app_cajaAhorros.tareas', 'ERROR'):
+            tarea = tomar_y_ejecutar(tarea.pk)
+        self.assertEqual((tarea.estado, tarea.intentos, self.fallas), (Tarea.FALLIDA, 3, 3))
+        self.assertIsNotNone(tarea.terminada)
+        self.assertIsNone(tomar(tarea.pk))
+
+    def test_tipo_desconocido(self):
+        with self.assertRaises(ValueError):
+            encolar('no_existe')
+        tarea = Tarea.objects.create(tipo='no_existe', parametros={}, max_intentos=1)
+        with self.assertLogs('app_cajaAhorros.tareas', 'ERROR'):
+            self.assertIn('LookupError', tomar_y_ejecutar(tarea.pk).error)
+
+
+class ArchivosPrivadosTests(TestCase):
+    """Los reportes generados quedan fuera de MEDIA_ROOT y solo los descarga quien los pidió."""
+
+    def setUp(self):
+        carpetas = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for carpeta in carpetas:
+            self.addCleanup(carpeta.cleanup)
+        self.privado, self.media = (carpeta.name for carpeta in carpetas)
+        ajustes = override_settings(ARCHIVOS_PRIVADOS=self.privado, MEDIA_ROOT=self.media, TAREAS_EN_LINEA=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.usuario = User.objects.create_user('tesorero', 'tesorero@ejemplo.com', 'clave')
+        self.client.force_login(self.usuario)
+
+    def test_resultado_de_la_tarea(self):
+        Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                             fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+        tarea = Tarea.objects.get(pk=self.client.get('/socios/exportar/excel/').url.split('/')[-2])
+        tarea = tomar_y_ejecutar(tarea.pk)
+        self.assertEqual(tarea.estado, Tarea.TERMINADA)
+        self.assertTrue(os.path.isfile(os.path.join(self.privado, tarea.resultado.name)))
+        self.assertEqual(os.listdir(self.media), [])
+        with self.assertRaises(ValueError):
+            tarea.resultado.url
+
+        self.assertEqual(self.client.get(f'/tareas/{tarea.pk}/descargar/').status_code, 200)
+        otro = Client()
+        otro.force_login(User.objects.create_user('otro', 'otro@ejemplo.com', 'clave'))
+        self.assertEqual(otro.get(f'/tareas/{tarea.pk}/descargar/').status_code, 404)
+        self.assertEqual(otro.get(f'/media/{tarea.resultado.name}').status_code, 404)
+
+
+class CacheReportesTests(TestCase):
+    """Reportes enviados desde la caché con ETag/Last-Modified y renovados cuando cambian sus datos."""
+
+    URL = '/gastos/exportar/excel/'
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.privado = carpeta.name
+        ajustes = override_settings(ARCHIVOS_PRIVADOS=self.privado, TAREAS_EN_LINEA=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(User.objects.create_user('tesorero', 'tesorero@ejemplo.com', 'clave'))
+        self.gasto('Cuota inicial', entrada='100.00')
+
+    def gasto(self, descripcion, entrada='0.00', salida='0.00'):
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_gasto(GastosAdministrativos(fecha=date(2024, 1, 1), descripcion=descripcion,
+                                                  entrada=Decimal(entrada), salida=Decimal(salida)))
+
+    def exportar(self, **encabezados):
+        """Pide el reporte; si no estaba en caché ejecuta la tarea encolada y lo vuelve a pedir."""
+        respuesta = self.client.get(self.URL, **encabezados)
+        if respuesta.status_code == 302:
+            tomar_y_ejecutar(int(respuesta.url.split('/')[-2]))
+            respuesta = self.client.get(self.URL, **encabezados)
+        return respuesta
+
+    def archivos(self):
+        carpeta = os.path.join(self.privado, 'cache_reportes', 'gastos_excel', 'todos')
+        return sorted(os.listdir(carpeta))
+
+    def test_304_si_el_navegador_tiene_la_version(self):
+        respuesta = self.exportar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+        etag, ultima_modificacion = respuesta['ETag'], respuesta['Last-Modified']
+
+        respuesta = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_MODIFIED_SINCE=ultima_modificacion).status_code, 304)
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH='"otra"').status_code, 200)
+        self.assertFalse(Tarea.objects.filter(estado=Tarea.PENDIENTE).exists())
+
+    def test_cambio_de_datos_renueva_el_reporte(self):
+        etag = self.exportar()['ETag']
+        anteriores = self.archivos()
+        self.assertEqual(len(anteriores), 1)
+
+        self.gasto('Papelería', salida='30.00')
+        # La versión vieja ya no sirve: se encola una tarea nueva en lugar de enviar 304
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 302)
+        respuesta = self.exportar(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        libro = load_workbook(BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertIn('Papelería', [fila[1] for fila in libro.active.iter_rows(values_only=True)])
+
+        # Solo queda la versión nueva en disco
+        self.assertEqual(len(self.archivos()), 1)
+        self.assertNotEqual(self.archivos(), anteriores)
+
+    def test_cambio_de_otra_tabla_no_lo_invalida(self):
+        etag = self.exportar()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            marcar_cambio('socios')
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class CacheCompartidaTests(TestCase):
+    """Las marcas de versión de la caché compartida se ven entre procesos del mismo proyecto."""
+
+    def test_carpeta_del_proyecto(self):
+        carpeta = os.path.realpath(settings.CACHES[settings.CACHE_COMPARTIDA]['LOCATION'])
+        self.assertTrue(carpeta.startswith(os.path.realpath(settings.BASE_DIR) + os.sep))
+
+    def test_configuracion_cambiada_en_otro_proceso(self):
+        config = Configuracion.objects.create(ruc='1790000000001', nombre_empresa='Caja A', direccion='Centro',
+                                              telefono='022000000', email='caja@ejemplo.com', ciudad='Quito',
+                                              tasa_interes=Decimal('1.00'), plazo_maximo=12)
+        self.assertEqual(obtener_configuracion().nombre_empresa, 'Caja A')
+        # Sin señales: este proceso se queda con su copia hasta que alguien renueve la versión
+        Configuracion.objects.filter(pk=config.pk).update(nombre_empresa='Caja B')
+        self.assertEqual(obtener_configuracion().nombre_empresa, 'Caja A')
+
+        subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup(); '
+             'from app_cajaAhorros.configuracion import invalidar_configuracion; invalidar_configuracion()'],
+            cwd=settings.BASE_DIR, check=True,
+        )
+        self.assertEqual(obtener_configuracion().nombre_empresa, 'Caja B')
+
+
+class RolesTests(TestCase):
+    """Los cambios de grupos se aplican en la siguiente petición aunque los roles estén en la sesión."""
+
+    URL = '/prestamos/cartera-vencida/'  # solo Presidente y Tesorero
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', 'ana@ejemplo.com', 'clave')
+        self.tesorero = Group.objects.create(name='Tesorero')
+        self.client.force_login(self.usuario)
+
+    def assertPuedeEntrar(self, puede):
+        respuesta = self.client.get(self.URL)
+        self.assertEqual(respuesta.status_code, 200 if puede else 302)
+
+    def cambiar(self, funcion, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion(*args)
+
+    def test_agregar_y_quitar_grupo(self):
+        self.assertPuedeEntrar(False)
+        self.cambiar(self.usuario.groups.add, self.tesorero)
+        self.assertPuedeEntrar(True)
+        self.assertPuedeEntrar(True)  # desde la sesión
+        self.cambiar(self.usuario.groups.remove, self.tesorero)
+        self.assertPuedeEntrar(False)
+
+    def test_cambios_desde_el_grupo(self):
+        self.cambiar(self.tesorero.user_set.add, self.usuario)
+        self.assertPuedeEntrar(True)
+        self.cambiar(self.tesorero.user_set.clear)
+        self.assertPuedeEntrar(False)
+        self.cambiar(self.usuario.groups.add, self.tesorero)
+        self.assertPuedeEntrar(True)
+
+        self.tesorero.name = 'Tesorería'
+        self.cambiar(self.tesorero.save)
+        self.assertPuedeEntrar(False)
+        self.tesorero.name = 'Tesorero'
+        self.cambiar(self.tesorero.save)
+        self.assertPuedeEntrar(True)
+        self.cambiar(self.tesorero.delete)
+        self.assertPuedeEntrar(False)
+
+
+def _totales_mensuales():
+    """Filas del resumen mensual sin los meses que quedaron en cero."""
+    return [
+        fila for fila in ResumenMensual.objects.order_by('mes').values('mes', *resumen_mensual.CAMPOS)
+        if any(fila[campo] for campo in resumen_mensual.CAMPOS)
+    ]
+
+
+class ResumenMensualTests(TestCase):
+    """Los totales que se actualizan al guardar préstamos y cuotas coinciden con reconstruir()."""
+
+    def setUp(self):
+        self.socio = Socio.objects.create(cedula='0102030405', nombre='Ana', apellido='Pérez',
+                                          fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2020, 1, 1))
+        self.prestamo = Prestamo.objects.create(socio=self.socio, fecha_prestamo=date(2024, 1, 20),
+                                                cantidad_solicitada=Decimal('1000.00'), plazo=12)
+
+    def assertIgualAReconstruir(self):
+        incremental = _totales_mensuales()
+        resumen_mensual.reconstruir()
+        self.assertEqual(incremental, _totales_mensuales())
+
+    def cambiar_estado(self, estado, fecha_aprobacion=date(2024, 2, 3)):
+        self.prestamo.estado = estado
+        self.prestamo.fecha_aprobacion = fecha_aprobacion
+        self.prestamo.save()
+
+    def test_aprobar_editar_y_volver_a_aprobar(self):
+        self.cambiar_estado('Aprobado')
+        self.cambiar_estado('Pendiente')  # la edición del préstamo lo deja pendiente
+        self.cambiar_estado('Aprobado')
+        self.assertIgualAReconstruir()
+        febrero = ResumenMensual.objects.get(mes=date(2024, 2, 1))
+        self.assertEqual((febrero.prestamos_aprobados, febrero.monto_aprobado), (1, Decimal('1000.00')))
+
+    def test_rechazar_y_aprobar_desde_rechazado(self):
+        self.cambiar_estado('Aprobado')
+        self.cambiar_estado('Rechazado')
+        self.assertFalse(ResumenMensual.objects.filter(prestamos_aprobados__gt=0).exists())
+        self.cambiar_estado('Aprobado', fecha_aprobacion=date(2024, 3, 5))
+        self.assertIgualAReconstruir()
+
+    def test_pagar_corregir_y_borrar_cuotas(self):
+        self.cambiar_estado('Aprobado')
+        pago = PagoPrestamo.objects.create(
+            prestamo=self.prestamo, cuota_pago=1, saldo_pago=Decimal('900.00'), capital_pago=Decimal('100.00'),
+            interes_pago=Decimal('10.00'), plazo_pago=11, valor_cuota_pago=Decimal('110.00'), estado=False,
+            fecha_a_pagar=date(2024, 3, 3),
+        )
+        pago.estado = True
+        pago.fecha_pago = '2024-03-04'  # como llega del formulario de registrar_pago
+        pago.save()
+        pago.save()  # guardarlo otra vez no lo cuenta dos veces
+        self.assertIgualAReconstruir()
+        pago.fecha_pago = date(2024, 4, 1)
+        pago.valor_cuota_pago = Decimal('120.00')
+        pago.save()
+        self.assertIgualAReconstruir()
+        self.prestamo.delete()
+        self.assertEqual(_totales_mensuales(), [])
+
+
+class ResumenMensualConcurrenteTests(TransactionTestCase):
+    """Dos conexiones que suman a la vez en un mes que todavía no existe no chocan."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Se necesita una base de pruebas en archivo para abrir varias conexiones')
+
+    def test_mes_nuevo_desde_varios_hilos(self):
+        errores = []
+        barrera = threading.Barrier(4)
+
+        def sumar():
+            try:
+                barrera.wait()
+                for _ in range(5):
+                    resumen_mensual.sumar({date(2024, 5, 1): {'entradas': Decimal('2.50')}})
+            except Exception as error:
+                errores.append(error)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=sumar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(ResumenMensual.objects.get(mes=date(2024, 5, 1)).entradas, Decimal('50.00'))
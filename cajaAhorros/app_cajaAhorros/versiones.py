@@ -0,0 +1,62 @@
+# app_cajaAhorros/versiones.py
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Si un cambio toca más objetos que estos, se marca la tabla completa en lugar de uno por uno
+MAXIMO_MARCAS_INDIVIDUALES = 20
+
+
+def _cache():
+    return caches[settings.CACHE_COMPARTIDA]
+
+
+def obtener_version(clave):
+    """
+    Devuelve la marca de versión guardada en la caché compartida entre procesos.
+    Si la marca no existe (caché nueva o vaciada) se crea una distinta a cualquier anterior.
+    """
+    cache = _cache()
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, uuid.uuid4().hex, None)
+        version = cache.get(clave)
+    return version
+
+
+def obtener_versiones(*claves):
+    guardadas = _cache().get_many(claves)
+    return tuple(guardadas.get(clave) or obtener_version(clave) for clave in claves)
+
+
+def renovar_version(clave):
+    _cache().set(clave, uuid.uuid4().hex, None)
+
+
+def clave_datos(tabla, objeto_id=None):
+    """
+    Marca de versión de los datos de una tabla: 'datos:<tabla>' cambia con cualquier escritura,
+    'datos:<tabla>:<id>' con las del objeto y 'datos:<tabla>:*' con las que no indican objeto.
+    """
+    return f'datos:{tabla}' if objeto_id is None else f'datos:{tabla}:{objeto_id}'
+
+
+def marcar_cambio(tabla, *ids):
+    """
+    Registra que cambiaron datos de `tabla` (de los objetos `ids`, o de cualquiera si no se indican).
+    Se renueva también al confirmar la transacción, para que nadie guarde en caché un resultado
+    calculado con la versión nueva pero con los datos todavía sin confirmar.
+    """
+    ids = set(ids)
+    if not ids or len(ids) > MAXIMO_MARCAS_INDIVIDUALES:
+        ids = {'*'}
+    claves = [clave_datos(tabla)] + [clave_datos(tabla, objeto_id) for objeto_id in ids]
+
+    def renovar():
+        _cache().set_many(dict((clave, uuid.uuid4().hex) for clave in claves), None)
+
+    renovar()
+    transaction.on_commit(renovar)
@@ -1,41 +1,51 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-from django.db.models.functions import TruncMonth
-from django.db.models import Count, Sum
+from django.db.models import Sum
 from django.contrib import messages
-from .models import Movimiento, Socio, Cargo, Prestamo, PagoPrestamo, Configuracion, GastosAdministrativos
-from .forms import SocioForm, PrestamoForm, ConfiguracionForm, GastoAdministrativoForm
-from datetime import date, datetime
-from dateutil.relativedelta import relativedelta
+from .models import Movimiento, Socio, Cargo, Prestamo, PagoPrestamo, GastosAdministrativos, Tarea
+from .forms import SocioForm, PrestamoForm, ConfiguracionForm, GastoAdministrativoForm, ImportarSociosForm, AporteMensualForm
+from datetime import date
 from django.core.paginator import Paginator
+from copy import copy
 from decimal import Decimal
 from django.utils import timezone
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from django.http import HttpResponse
-from openpyxl import Workbook
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from urllib.parse import urlencode
 from django.utils.timezone import now
-from openpyxl.styles import Font
 
 # Importamos el decorador de roles que creamos
-from .decorators import role_required
+from .decorators import escritura_inmediata, obtener_roles, role_required
+from .morosidad import filtrar_por_estado, meses_faltantes
+from .configuracion import obtener_configuracion
+from .cartera import CAMPOS_TRAMO, TRAMOS, cartera_por_socio, detalle_del_corte, obtener_corte, tramos_del_corte
+from .almacenamiento import almacen_privado
+from .busqueda import buscar as buscar_socios
+from .cache_reportes import respuesta_en_cache, respuesta_guardada, version_reporte
+from .reportes import REPORTES
+from .libros import registrar_gasto, registrar_movimiento
+from .paginacion import paginar_por_clave
+from .prestamos import ORDEN_POR_DEFECTO, ORDENES, anotar_avance, filtrar_prestamos
+from .saldos import obtener_resumen
+from .tareas import encolar
+from . import analitica, aportes_mensuales, importacion
 
 # --- Función Auxiliar para obtener el Rol ---
-def get_user_role(user):
-    if user.is_superuser:
+def get_user_role(request):
+    if request.user.is_superuser:
         return 'Administrador' # El superusuario siempre es Administrador
     # Devuelve el nombre del primer grupo del usuario, o None si no pertenece a ninguno.
-    return user.groups.first().name if user.groups.exists() else None
+    roles = obtener_roles(request)
+    return roles[0] if roles else None
 @login_required
 def dashboard(request):
     """
     Esta vista actúa como un centro de redirección después del login.
     Dirige a cada usuario a su página principal correspondiente.
     """
-    role = get_user_role(request.user)
+    role = get_user_role(request)
 
     if role == 'Secretaria':
         return redirect('socio_list') # La secretaria va a la lista de socios.
@@ -56,16 +66,12 @@ def dashboard(request):
 def mi_perfil(request):
     try:
         socio = get_object_or_404(Socio, user=request.user)
-        movimientos = Movimiento.objects.filter(socio=socio).order_by('-fecha_movimiento')
         prestamos = Prestamo.objects.filter(socio=socio).order_by('-fecha_prestamo')
-        
-        total_aportes = movimientos.filter(salida=0).aggregate(total=Sum('entrada'))['total'] or 0
-        total_retiros = movimientos.filter(entrada=0).aggregate(total=Sum('salida'))['total'] or 0
-        saldo = total_aportes - total_retiros
+        saldo = obtener_resumen(socio).saldo
         
         context = {
             'socio': socio,
-            'movimientos': movimientos,
+            'movimientos': pagina_movimientos(socio),
             'prestamos': prestamos,
             'saldo': saldo
         }
@@ -79,38 +85,14 @@ def socio_list(request):
     filtro = request.GET.get('filtro', 'todos')
     socios = Socio.objects.filter(activo=True)
     cargos = Cargo.objects.all()
-    hoy = date.today().replace(day=1)
-
-    def meses_faltantes(socio):
-        movimientos = Movimiento.objects.filter(socio=socio, entrada__gt=0).order_by('fecha_movimiento')
-        if not movimientos.exists():
-            return True
-        fechas_aportes = movimientos.dates('fecha_movimiento', 'month')
-        meses_aporte_set = set((d.year, d.month) for d in fechas_aportes)
-        
-        # Corrección: Asegurarse de que `movimientos.first()` no sea None
-        if not movimientos:
-            return True
-            
-        inicio = movimientos.first().fecha_movimiento.replace(day=1)
-        actual = inicio
-        while actual <= hoy:
-            if (actual.year, actual.month) not in meses_aporte_set:
-                return True
-            actual += relativedelta(months=1)
-        return False
-
-    socios_filtrados = []
-    for socio in socios:
-        faltante = meses_faltantes(socio)
-        if filtro == 'todos' or (filtro == 'al_dia' and not faltante) or (filtro == 'deudores' and faltante):
-            socios_filtrados.append(socio)
+
+    socios_filtrados = filtrar_por_estado(socios, filtro).order_by('id')
 
     paginator = Paginator(socios_filtrados, 10)
     page = request.GET.get('page')
     socios_paginados = paginator.get_page(page)
 
-    role = get_user_role(request.user)
+    role = get_user_role(request)
     is_read_only = role == 'Presidente'
     
     context = {
@@ -124,6 +106,7 @@ def socio_list(request):
 
 @login_required
 @role_required(allowed_roles=['Secretaria'])
+@escritura_inmediata
 def crear_socio(request):
     if request.method == 'POST':
         form = SocioForm(request.POST, request.FILES)
@@ -131,37 +114,27 @@ def crear_socio(request):
             socio = form.save()
 
             # Obtener configuración general
-            config = Configuracion.objects.first()
+            config = obtener_configuracion()
             aporte_inicial = config.aporte_inicial if config else Decimal('0.00')
             gasto_adm = config.gastos_adm if config else Decimal('0.00')
             fecha_hoy = now().date()
 
-            # Registrar el primer aporte como movimiento
-            ultimo_mov = Movimiento.objects.filter(socio=socio).order_by('-fecha_movimiento').first()
-            saldo_anterior = ultimo_mov.saldo if ultimo_mov else Decimal('0.00')
-            nuevo_saldo = saldo_anterior + aporte_inicial
-
-            Movimiento.objects.create(
+            # Registrar el primer aporte como movimiento (el saldo se calcula al registrar)
+            registrar_movimiento(Movimiento(
                 socio=socio,
                 detalle_movimiento="Aporte inicial",
                 entrada=aporte_inicial,
                 salida=Decimal('0.00'),
-                saldo=nuevo_saldo,
                 fecha_movimiento=fecha_hoy
-            )
+            ))
 
             # Registrar gasto administrativo
-            saldo_gasto = GastosAdministrativos.objects.order_by('-fecha').first()
-            saldo_anterior_gasto = saldo_gasto.saldo if saldo_gasto else Decimal('0.00')
-            nuevo_saldo_gasto = saldo_anterior_gasto + gasto_adm
-
-            GastosAdministrativos.objects.create(
+            registrar_gasto(GastosAdministrativos(
                 fecha = socio.fecha_ingreso,
                 descripcion="Ingreso por nuevo socio: " + socio.nombre + " " + socio.apellido,
                 entrada=gasto_adm,
                 salida=Decimal('0.00'),
-                saldo=nuevo_saldo_gasto
-            )
+            ))
 
             return redirect('socio_list')
     else:
@@ -170,6 +143,33 @@ def crear_socio(request):
 
 @login_required
 @role_required(allowed_roles=['Secretaria'])
+def importar_socios(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarSociosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            if form.cleaned_data['simular']:
+                # Validar no calcula contraseñas ni escribe: se responde en la misma petición
+                resultado = importacion.importar_socios(archivo, archivo.name, simulacion=True)
+            else:
+                # Guardar cientos de socios (y sus contraseñas) se hace en el worker de tareas.
+                # Sin reintentos: los lotes ya guardados aparecerían como cédulas repetidas
+                ruta = almacen_privado.save(f'importaciones/{archivo.name}', archivo)
+                tarea = encolar('importar_socios', usuario=request.user, max_intentos=1,
+                                archivo=ruta, nombre=archivo.name)
+                return redirect('estado_tarea', pk=tarea.pk)
+    else:
+        form = ImportarSociosForm()
+    return render(request, 'socios/importar_socios.html', {
+        'form': form,
+        'resultado': resultado,
+        'columnas': importacion.COLUMNAS,
+    })
+
+@login_required
+@role_required(allowed_roles=['Secretaria'])
+@escritura_inmediata
 def eliminar_socio(request, pk):
     socio = get_object_or_404(Socio, pk=pk)
 
@@ -190,42 +190,72 @@ def eliminar_socio(request, pk):
     return render(request, 'socios/eliminar_socio.html', {'socio': socio})
 
 
+def pagina_movimientos(socio, despues=None):
+    """Movimientos del socio del más reciente al más antiguo, por páginas de tamaño fijo."""
+    return paginar_por_clave(
+        Movimiento.objects.filter(socio=socio), ('-fecha_movimiento', '-id'), despues=despues,
+    )
+
+
+def _contexto_aportaciones(socio):
+    # Los totales salen del resumen de saldos; la tabla muestra solo la primera página
+    resumen = obtener_resumen(socio)
+    return {
+        'socio': socio,
+        'movimientos': pagina_movimientos(socio),
+        'total_aportes': resumen.total_aportes,
+        'total_retiros': resumen.total_retiros,
+        'saldo': resumen.saldo,
+        'numero_movimientos': resumen.numero_movimientos,
+        'meses_faltantes': meses_faltantes(socio),
+    }
+
+
+def _respuesta_movimientos(request, socio):
+    """Página de movimientos más antiguos en JSON, para cargarlos al desplazarse."""
+    pagina = pagina_movimientos(socio, despues=request.GET.get('despues'))
+    return JsonResponse({
+        'html': render_to_string('aportes/filas_movimientos.html', {'movimientos': pagina}, request=request),
+        'movimientos': [
+            {
+                'id': m.id,
+                'fecha': m.fecha_movimiento.isoformat(),
+                'detalle': m.detalle_movimiento,
+                'entrada': str(m.entrada),
+                'salida': str(m.salida),
+                'saldo': str(m.saldo),
+            }
+            for m in pagina
+        ],
+        'siguiente': pagina.siguiente,
+    })
+
+
 @login_required
 @role_required(allowed_roles=['Presidente', 'Secretaria'])
 def ver_aportaciones_socio(request, socio_id):
     socio = get_object_or_404(Socio, pk=socio_id)
-    movimientos = Movimiento.objects.filter(socio=socio).order_by('fecha_movimiento')
-
-    total_aportes = movimientos.filter(salida=0).aggregate(total=Sum('entrada'))['total'] or 0
-    total_retiros = movimientos.filter(entrada=0).aggregate(total=Sum('salida'))['total'] or 0
-    saldo = total_aportes - total_retiros
-
-    meses_con_aporte = movimientos.filter(entrada__gt=0).dates('fecha_movimiento', 'month')
-    meses_con_aporte_set = set((m.year, m.month) for m in meses_con_aporte)
-
-    meses_faltantes = []
-    if movimientos.exists():
-        inicio = movimientos.first().fecha_movimiento.replace(day=1)
-        fin = date.today().replace(day=1)
-        actual = inicio
-        while actual <= fin:
-            if (actual.year, actual.month) not in meses_con_aporte_set:
-                meses_faltantes.append(actual.strftime('%B %Y'))
-            actual += relativedelta(months=1)
-            
-    context = {
-        'socio': socio,
-        'movimientos': movimientos,
-        'total_aportes': total_aportes,
-        'total_retiros': total_retiros,
-        'saldo': saldo,
-        'meses_faltantes': meses_faltantes,
-        'is_read_only': get_user_role(request.user) == 'Presidente', # Presidente no puede modificar aportes
-    }
+    context = _contexto_aportaciones(socio)
+    context['is_read_only'] = get_user_role(request) == 'Presidente' # Presidente no puede modificar aportes
     return render(request, 'aportes/ver_aportaciones_socio.html', context)
 
+
+@login_required
+@role_required(allowed_roles=['Presidente', 'Secretaria'])
+def movimientos_socio(request, socio_id):
+    socio = get_object_or_404(Socio, pk=socio_id)
+    return _respuesta_movimientos(request, socio)
+
+
+@login_required
+@role_required(allowed_roles=['Socio'])
+def mis_movimientos(request):
+    socio = get_object_or_404(Socio, user=request.user)
+    return _respuesta_movimientos(request, socio)
+
 @login_required
 @role_required(allowed_roles=['Secretaria'])
+@escritura_inmediata
 def agregar_aporte(request, socio_id):
     socio = get_object_or_404(Socio, id=socio_id)
 
@@ -244,25 +274,78 @@ def agregar_aporte(request, socio_id):
         entrada = monto_decimal if tipo == 'entrada' else Decimal('0.00')
         salida = monto_decimal if tipo == 'salida' else Decimal('0.00')
 
-        # Calcula el saldo actual del socio
-        ultimo_mov = Movimiento.objects.filter(socio=socio).order_by('-fecha_movimiento').first()
-        saldo_anterior = ultimo_mov.saldo if ultimo_mov else Decimal('0.00')
-        nuevo_saldo = saldo_anterior + entrada - salida
-
-        Movimiento.objects.create(
+        # El saldo se calcula con el libro del socio bloqueado
+        registrar_movimiento(Movimiento(
             socio=socio,
             detalle_movimiento=detalle,
             entrada=entrada,
             salida=salida,
             fecha_movimiento=fecha,
-            saldo=nuevo_saldo,
-        )
+        ))
 
         return redirect('ver_aportaciones_socio', socio.id)
 
 
 @login_required
 @role_required(allowed_roles=['Secretaria'])
+def registrar_aportes_mensuales(request):
+    """
+    Registro del aporte del mes para todos los socios activos: primero una vista previa con el
+    monto de la configuración, donde se puede cambiar el monto o quitar socios, y luego se
+    guardan todos los movimientos juntos.
+    """
+    filas = None
+    if request.method == 'POST':
+        form = AporteMensualForm(request.POST)
+        if form.is_valid():
+            mes = form.cleaned_data['mes']
+            detalle = form.cleaned_data['detalle'] or aportes_mensuales.detalle_por_defecto(mes)
+            filas = aportes_mensuales.filas_aporte_mensual(mes, form.cleaned_data['monto'])
+            registrar = request.POST.get('accion') == 'registrar'
+            # En la vista previa quedan marcados los socios que aún no aportaron en el mes
+            seleccionados = set(request.POST.getlist('socios')) if registrar else {
+                str(fila.socio.pk) for fila in filas if not fila.ya_aporto
+            }
+
+            montos, errores = {}, []
+            for i, fila in enumerate(filas):
+                enviado = request.POST.get(f'monto_{fila.socio.pk}', '') if registrar else ''
+                try:
+                    monto = Decimal(enviado).quantize(Decimal('0.01')) if enviado else fila.monto
+                    # NaN pasa por quantize sin error pero no se puede comparar ni guardar
+                    if not monto.is_finite():
+                        raise ArithmeticError
+                except ArithmeticError:
+                    monto = None
+                if monto is None or monto < 0:
+                    errores.append(f'Monto inválido para {fila.socio}: "{enviado}"')
+                    continue
+                filas[i] = fila._replace(monto=monto)
+                if str(fila.socio.pk) in seleccionados:
+                    montos[fila.socio.pk] = monto
+
+            if registrar and not errores:
+                creados = aportes_mensuales.registrar_aportes(montos, form.cleaned_data['fecha_movimiento'], detalle, mes)
+                total = sum((mov.entrada for mov in creados), Decimal('0.00'))
+                messages.success(request, f'Se registraron {len(creados)} aportes de {mes:%m/%Y} por ${total:,.2f}.')
+                return redirect('socio_list')
+            for error in errores:
+                messages.error(request, error)
+            filas = [(fila, str(fila.socio.pk) in seleccionados) for fila in filas]
+    else:
+        config = obtener_configuracion()
+        hoy = now().date()
+        form = AporteMensualForm(initial={
+            'mes': hoy.replace(day=1),
+            'fecha_movimiento': hoy,
+            'monto': config.aporte_mensual if config else Decimal('0.00'),
+        })
+    return render(request, 'aportes/aportes_mensuales.html', {'form': form, 'filas': filas})
+
+
+@login_required
+@role_required(allowed_roles=['Secretaria'])
+@escritura_inmediata
 def editar_aporte(request, aporte_id):
     aporte = get_object_or_404(Movimiento, pk=aporte_id)
     if request.method == 'POST':
@@ -291,34 +374,65 @@ def editar_aporte(request, aporte_id):
 
 @login_required
 @role_required(allowed_roles=['Secretaria'])
+@escritura_inmediata
 def eliminar_aporte(request, aporte_id):
     aporte = get_object_or_404(Movimiento, pk=aporte_id)
     socio_id = aporte.socio.id
     if request.method == 'POST':
+        # Al borrar se recalcula el saldo de los movimientos posteriores (ver Movimiento.delete)
         aporte.delete()
-        # Se debería recalcular el saldo de los movimientos posteriores
         return redirect('ver_aportaciones_socio', socio_id=socio_id)
     return render(request, 'eliminar_aporte_confirm.html', {'aporte': aporte})
 
 # --- Vistas de Préstamos ---
+def _contexto_lista_prestamos(request):
+    """
+    Filtros, orden y paginación por clave de la lista de préstamos.
+    Cada fila trae su avance de pagos anotado en la misma consulta y lo vencido
+    según el último corte de cartera.
+    """
+    prestamos, filtros = filtrar_prestamos(anotar_avance(Prestamo.objects.all()), request.GET)
+    orden = request.GET.get('orden')
+    if orden not in ORDENES:
+        orden = ORDEN_POR_DEFECTO
+    pagina = paginar_por_clave(
+        prestamos, ORDENES[orden],
+        despues=request.GET.get('despues'), antes=request.GET.get('antes'),
+    )
+    corte = obtener_corte()
+    vencidos = dict(
+        (fila.prestamo_id, fila)
+        for fila in detalle_del_corte(corte).filter(prestamo_id__in=[prestamo.pk for prestamo in pagina])
+    )
+    for prestamo in pagina:
+        prestamo.vencido = vencidos.get(prestamo.pk)
+    return {
+        'prestamos': pagina,
+        'corte': corte,
+        'filtros': filtros,
+        'orden': orden,
+        'estados': Prestamo.ESTADOS,
+        'socios': Socio.objects.order_by('apellido', 'nombre').values_list('id', 'apellido', 'nombre'),
+        'parametros': urlencode(dict(filtros, orden=orden)),
+    }
+
 @login_required
 @role_required(allowed_roles=['Presidente', 'Tesorero'])
 def prestamo_list(request):
-    prestamos = Prestamo.objects.all()
-    role = get_user_role(request.user)
-    is_read_only = role == 'Presidente'
-    context = {
-        'prestamos': prestamos,
+    context = _contexto_lista_prestamos(request)
+    role = get_user_role(request)
+    context.update({
         'role': role,
-        'is_read_only': is_read_only,
-    }
+        'is_read_only': role == 'Presidente',
+    })
     return render(request, 'prestamo/prestamo_list.html', context)
 
 @login_required
 @role_required(allowed_roles=['Tesorero'])
+@escritura_inmediata
 def crear_o_editar_prestamo(request, pk=None):
     prestamo = get_object_or_404(Prestamo, pk=pk) if pk else None
-    config = Configuracion.objects.first()
+    config = obtener_configuracion()
     if request.method == 'POST':
         form = PrestamoForm(request.POST, instance=prestamo)
         if form.is_valid():
@@ -337,71 +451,29 @@ def crear_o_editar_prestamo(request, pk=None):
             form.initial['cuota'] = ''
     return render(request, 'prestamo/crear_editar_prestamo.html', {'form': form})
 
+@login_required
 def exportar_aportaciones_pdf(request, socio_id):
     socio = get_object_or_404(Socio, pk=socio_id)
-    movimientos = Movimiento.objects.filter(socio=socio).order_by('fecha_movimiento')
-
-    total_aportes = movimientos.filter(salida=0).aggregate(total=Sum('entrada'))['total'] or 0
-    total_retiros = movimientos.filter(entrada=0).aggregate(total=Sum('salida'))['total'] or 0
-    saldo = total_aportes - total_retiros
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="aportaciones_{socio.cedula}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    fecha_actual = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-    elements.append(Paragraph(f"Aportaciones del socio: <b>{socio.nombre} {socio.apellido}</b>", styles['Title']))
-    elements.append(Paragraph(f"Cédula: {socio.cedula}", styles['Normal']))
-    elements.append(Paragraph(f"Fecha de generación: {fecha_actual}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    data = [['Fecha', 'Descripción', 'Entrada', 'Salida']]
-    for m in movimientos:
-        data.append([
-            m.fecha_movimiento.strftime('%d/%m/%Y'),
-            m.detalle_movimiento,
-            f"${m.entrada:,.2f}" if m.entrada else "",
-            f"${m.salida:,.2f}" if m.salida else "",
-        ])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph(f"<b>Total Aportes:</b> ${total_aportes:,.2f}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Total Retiros:</b> ${total_retiros:,.2f}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Saldo:</b> ${saldo:,.2f}", styles['Normal']))
-    elements.append(Spacer(1, 36))
-    elements.append(Paragraph("Firma Tesorero: _________________________", styles['Normal']))
-
-    doc.build(elements)
-    return response
+    return _exportar(request, 'aportaciones_pdf', f"aportaciones_{socio.cedula}.pdf", socio)
 
 
 @login_required
 @role_required(allowed_roles=['Tesorero'])
 @require_POST
+@escritura_inmediata
 def aprobar_prestamo(request, pk):
     prestamo = get_object_or_404(Prestamo, pk=pk)
     prestamo.estado = 'Aprobado'
     prestamo.fecha_aprobacion = date.today()
     prestamo.save()
-    generar_amortizacion(prestamo)
+    # La tabla de amortización la genera el worker de tareas
+    encolar('generar_amortizacion', usuario=request.user, prestamo_id=prestamo.pk)
     return redirect('prestamo_list')
 
 @login_required
 @role_required(allowed_roles=['Tesorero'])
 @require_POST
+@escritura_inmediata
 def rechazar_prestamo(request, pk):
     prestamo = get_object_or_404(Prestamo, pk=pk)
     prestamo.estado = 'Rechazado'
@@ -412,33 +484,17 @@ def rechazar_prestamo(request, pk):
 @login_required
 def socio_list(request):
     filtro = request.GET.get('filtro', 'todos')
+    q = request.GET.get('q', '').strip()
     socios = Socio.objects.filter(activo=True)  # 👈 Solo activos
     cargos = Cargo.objects.all()
-    hoy = date.today().replace(day=1)
-
-    def meses_faltantes(socio):
-        movimientos = Movimiento.objects.filter(socio=socio, entrada__gt=0).order_by('fecha_movimiento')
-        if not movimientos.exists():
-            return True
-        fechas_aportes = movimientos.dates('fecha_movimiento', 'month')
-        meses_aporte_set = set((d.year, d.month) for d in fechas_aportes)
-        inicio = movimientos.first().fecha_movimiento.replace(day=1)
-        actual = inicio
-        while actual <= hoy:
-            if (actual.year, actual.month) not in meses_aporte_set:
-                return True
-            actual += relativedelta(months=1)
-        return False
-
-    socios_filtrados = []
-    for socio in socios:
-        faltante = meses_faltantes(socio)
-        if filtro == 'al_dia' and not faltante:
-            socios_filtrados.append(socio)
-        elif filtro == 'deudores' and faltante:
-            socios_filtrados.append(socio)
-        elif filtro == 'todos':
-            socios_filtrados.append(socio)
+
+    # El filtro al día / deudores, la búsqueda y la paginación se resuelven en la base de datos
+    socios_filtrados = filtrar_por_estado(socios, filtro)
+    if q:
+        # Por cédula, nombre, apellido, email o teléfono, de la más relevante a la menos
+        socios_filtrados = buscar_socios(socios_filtrados, q)
+    else:
+        socios_filtrados = socios_filtrados.order_by('id')
 #paginacion
     paginator = Paginator(socios_filtrados, 10)
     page = request.GET.get('page')
@@ -447,11 +503,13 @@ def socio_list(request):
     return render(request, 'socios/socio_list.html', {
         'socios': socios_paginados,
         'filtro': filtro,
+        'q': q,
         'cargos': cargos,
     })
 
 
 # Editar socio
+@escritura_inmediata
 def editar_socio(request, pk):
     socio = get_object_or_404(Socio, pk=pk)
     if request.method == 'POST':
@@ -469,35 +527,7 @@ def editar_socio(request, pk):
 # Calcular totales por socio
 def ver_aportaciones_socio(request, socio_id):
     socio = get_object_or_404(Socio, pk=socio_id)
-    movimientos = Movimiento.objects.filter(socio=socio).order_by('fecha_movimiento')
-
-    total_aportes = movimientos.filter(salida=0).aggregate(total=Sum('entrada'))['total'] or 0
-    total_retiros = movimientos.filter(entrada=0).aggregate(total=Sum('salida'))['total'] or 0
-    saldo = total_aportes - total_retiros
-
-    # Detectar meses faltantes
-    meses_con_aporte = movimientos.filter(entrada__gt=0).dates('fecha_movimiento', 'month')
-    meses_con_aporte_set = set((m.year, m.month) for m in meses_con_aporte)
-
-    meses_faltantes = []
-    if movimientos.exists():
-        inicio = movimientos.first().fecha_movimiento.replace(day=1)
-        fin = date.today().replace(day=1)
-        actual = inicio
-
-        while actual <= fin:
-            if (actual.year, actual.month) not in meses_con_aporte_set:
-                meses_faltantes.append(actual.strftime('%B %Y'))
-            actual += relativedelta(months=1)
-
-    return render(request, 'aportes/ver_aportaciones_socio.html', {
-        'socio': socio,
-        'movimientos': movimientos,
-        'total_aportes': total_aportes,
-        'total_retiros': total_retiros,
-        'saldo': saldo,
-        'meses_faltantes': meses_faltantes,
-    })
+    return render(request, 'aportes/ver_aportaciones_socio.html', _contexto_aportaciones(socio))
 
 
 # Detalle del socio
@@ -513,6 +543,7 @@ def detalle_socio(request, pk):
 
 
 # Eliminar aporte
+@escritura_inmediata
 def eliminar_aporte(request, aporte_id):
     aporte = get_object_or_404(Movimiento, pk=aporte_id)
     socio_id = aporte.socio.id
@@ -525,6 +556,7 @@ def eliminar_aporte(request, aporte_id):
 
 
 @require_POST
+@escritura_inmediata
 def agregar_cargo(request):
     nombre = request.POST.get('nombre_cargo')
     estado = request.POST.get('estado') == 'true'
@@ -532,6 +564,7 @@ def agregar_cargo(request):
     return redirect('socio_list')
 
 @require_POST
+@escritura_inmediata
 def editar_cargo(request, id):
     cargo = get_object_or_404(Cargo, id=id)
     cargo.nombre_cargo = request.POST.get('nombre_cargo')
@@ -540,19 +573,20 @@ def editar_cargo(request, id):
     return redirect('socio_list')
 
 @require_POST
+@escritura_inmediata
 def eliminar_cargo(request, id):
     cargo = get_object_or_404(Cargo, id=id)
     cargo.delete()
     return redirect('socio_list')
 
 def prestamo_list(request):
-    prestamos = Prestamo.objects.all()
-    return render(request, 'prestamo/prestamo_list.html', {'prestamos': prestamos})
+    return render(request, 'prestamo/prestamo_list.html', _contexto_lista_prestamos(request))
 
 # Crear préstamo
+@escritura_inmediata
 def crear_o_editar_prestamo(request, pk=None):
     prestamo = get_object_or_404(Prestamo, pk=pk) if pk else None
-    config = Configuracion.objects.first()  # Obtiene la configuración actual
+    config = obtener_configuracion()  # Obtiene la configuración actual
     
     if request.method == 'POST':
         form = PrestamoForm(request.POST, instance=prestamo)
@@ -586,34 +620,30 @@ def crear_o_editar_prestamo(request, pk=None):
 
 #aprobar prestamo
 @require_POST
+@escritura_inmediata
 def aprobar_prestamo(request, pk):
     prestamo = get_object_or_404(Prestamo, pk=pk)
     prestamo.estado = 'Aprobado'
     # Obtener la configuración activa
-    config = Configuracion.objects.first()
+    config = obtener_configuracion()
     # Registrar gasto administrativo
-    saldo_gasto = GastosAdministrativos.objects.order_by('-fecha').first()
-    saldo_anterior_gasto = saldo_gasto.saldo if saldo_gasto else Decimal('0.00')
-    nuevo_saldo_gasto = saldo_anterior_gasto + (prestamo.cantidad_aprobada * config.tasa_prestamo) / Decimal('100.00')
-   # Crear gasto administrativo
-    gasto = GastosAdministrativos(
+    registrar_gasto(GastosAdministrativos(
         fecha=prestamo.fecha_aprobacion,
         descripcion=f'Tasa del {config.tasa_prestamo}% por préstamo aprobado de ' + str(prestamo.socio),
         entrada=(prestamo.cantidad_aprobada * config.tasa_prestamo) / Decimal('100.00'),
         salida=Decimal('0.00'),
-        saldo=nuevo_saldo_gasto
-
-    )
-    gasto.save()
+    ))
 
     #prestamo.fecha_aprobacion = date.today()
     prestamo.save()
-    generar_amortizacion(prestamo)
+    # La tabla de amortización la genera el worker de tareas
+    encolar('generar_amortizacion', usuario=request.user, prestamo_id=prestamo.pk)
     return redirect('prestamo_list')
 
 
 #rechazar prestamo
 @require_POST
+@escritura_inmediata
 def rechazar_prestamo(request, pk):
     prestamo = get_object_or_404(Prestamo, pk=pk)
     prestamo.estado = 'Rechazado'
@@ -635,6 +665,7 @@ def pagos_prestamo(request, prestamo_id):
 #registros de pagos de  prestamos
 @require_POST
 @login_required
+@escritura_inmediata
 def registrar_pago(request, pago_id):
     pago = get_object_or_404(PagoPrestamo, id=pago_id)
     prestamo = pago.prestamo
@@ -657,513 +688,166 @@ def registrar_pago(request, pago_id):
         prestamo.estado = 'Terminado'
         prestamo.save()
 
-        # Calcular el total de intereses generados
-        total_interes = prestamo.pagos.aggregate(total=Sum('interes_pago'))['total'] or Decimal('0.00')
-
-        # Obtener todos los socios activos
-        socios = Socio.objects.filter(activo=True)
-        num_socios = socios.count()
-
-        if num_socios > 0 and total_interes > 0:
-            interes_por_socio = total_interes / num_socios
-            interes_por_socio = interes_por_socio.quantize(Decimal('0.01'))  # Redondear a 2 decimales
-
-            for socio in socios:
-                ultimo_mov = Movimiento.objects.filter(socio=socio).order_by('-fecha_movimiento').first()
-                saldo_anterior = ultimo_mov.saldo if ultimo_mov else Decimal('0.00')
-                nuevo_saldo = saldo_anterior + interes_por_socio
-
-                Movimiento.objects.create(
-                    socio=socio,
-                    detalle_movimiento="Interes generado por prestamo",
-                    entrada=interes_por_socio,
-                    salida=Decimal('0.00'),
-                    saldo=nuevo_saldo,
-                    fecha_movimiento=timezone.now().date()
-                )
+        # Repartir el interés generado entre los socios activos (lo hace el worker de tareas)
+        encolar('distribuir_interes', usuario=request.user, prestamo_id=prestamo.id,
+                fecha=timezone.now().date().isoformat())
 
     return redirect('pagos_prestamo', prestamo_id=prestamo.id)
 
 
-#tabla amortizacion
-def generar_amortizacion(prestamo):
-    if prestamo.estado == 'Aprobado' and not prestamo.pagos.exists():
-        capital_prestado = prestamo.cantidad_aprobada
-        plazo = prestamo.plazo
-        interes_anual = prestamo.interes
-        saldo = capital_prestado
-
-        # Tasa mensual en decimales
-        tasa_mensual = (interes_anual / 100) / 12
-
-        # Calcular cuota si no está definida
-        if not prestamo.cuota:
-            if tasa_mensual == 0:
-                cuota = capital_prestado / plazo
-            else:
-                cuota = capital_prestado * (
-                    tasa_mensual * (1 + tasa_mensual) ** plazo
-                ) / ((1 + tasa_mensual) ** plazo - 1)
-            prestamo.cuota = round(cuota, 2)
-            prestamo.save()
-        else:
-            cuota = prestamo.cuota
-
-        fecha = prestamo.fecha_aprobacion or timezone.now().date()
-
-        for i in range(plazo):
-            interes = saldo * tasa_mensual
-            capital = cuota - interes
-
-            # Redondeo para evitar errores por flotantes
-            interes = round(interes, 2)
-            capital = round(capital, 2)
-            cuota_real = round(capital + interes, 2)
-
-            # Última cuota ajustada
-            if i == plazo - 1:
-                capital = saldo
-                interes = max(0, cuota - capital)
-                cuota_real = round(capital + interes, 2)
-
-            # Guardar cuota con saldo actual antes de restar
-            PagoPrestamo.objects.create(
-                prestamo=prestamo,
-                cuota_pago=i + 1,
-                saldo_pago=round(saldo, 2),
-                capital_pago=capital,
-                interes_pago=interes,
-                plazo_pago=plazo - i,
-                valor_cuota_pago=cuota_real,
-                estado=False,
-                fecha_a_pagar=fecha + relativedelta(months=i)
-            )
-
-            # Luego de registrar el pago, restamos el capital
-            saldo -= capital
-            saldo = round(saldo, 2)
+# --- Exportaciones: se generan en segundo plano y se descargan cuando están listas ---
 
+def _exportar(request, reporte, nombre, objeto=None):
+    """
+    Si el reporte ya está generado para la versión actual de sus datos se envía desde disco;
+    si no, se encola su generación y se lleva a la página que avisa cuando se puede descargar.
+    """
+    objeto_id = objeto.pk if objeto is not None else None
+    version = version_reporte(reporte, objeto)
+    respuesta = respuesta_en_cache(request, reporte, nombre, version, objeto_id)
+    if respuesta is not None:
+        return respuesta
+    tarea = encolar('exportar_reporte', usuario=request.user, reporte=reporte, nombre=nombre,
+                    objeto_id=objeto_id, version=version)
+    return redirect('estado_tarea', pk=tarea.pk)
 
+@login_required
 def exportar_amortizacion_pdf(request, pk):
-    prestamo = Prestamo.objects.get(pk=pk)
-    pagos = prestamo.pagos.all()
-    socio = prestamo.socio
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="amortizacion_prestamo_{pk}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    # Título principal
-
-    elements.append(Paragraph(f'Tabla de Amortización - Préstamo #{pk}', styles['Title']))
-    elements.append(Spacer(1, 12))
-# Información del solicitante
-    info_solicitante = f"""
-        <strong>Solicitante:</strong> {socio.nombre} {socio.apellido}<br/>
-        <strong>Fecha del Aprobación:</strong> {prestamo.fecha_aprobacion.strftime('%d/%m/%Y')}<br/>
-        <strong>Plazo:</strong> {prestamo.plazo} meses<br/>
-        <strong>Monto Aprobado:</strong> ${prestamo.cantidad_aprobada:,.2f}<br/>
-        <strong>Interés:</strong> {prestamo.interes:,.2f}%
-    """
-    elements.append(Paragraph(info_solicitante, styles['Normal']))
-    elements.append(Spacer(1, 12))
-     # Cabecera de tabla
-    datos = [['#', 'Saldo', 'Capital', 'Interés', 'Cuota', 'Fecha a Pagar', 'Estado']]
-
-    for pago in pagos:
-        datos.append([
-            pago.cuota_pago,
-            f"${pago.saldo_pago}",
-            f"${pago.capital_pago}",
-            f"${pago.interes_pago}",
-            f"${pago.valor_cuota_pago}",
-            pago.fecha_a_pagar.strftime('%d/%m/%Y'),
-            "Pagado" if pago.estado else "Pendiente"
-        ])
-
-    tabla = Table(datos, repeatRows=1)
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#d3d3d3')),
-        ('TEXTCOLOR',(0,0),(-1,0),colors.black),
-        ('ALIGN',(0,0),(-1,-1),'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-    ]))
-
-    elements.append(tabla)
-     # Firma
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("__________________________", styles['Normal']))
-    elements.append(Paragraph("Firma del Tesorero", styles['Normal']))
-    doc.build(elements)
-    return response
+    prestamo = get_object_or_404(Prestamo, pk=pk)
+    return _exportar(request, 'amortizacion_pdf', f"amortizacion_prestamo_{pk}.pdf", prestamo)
 
+@login_required
 def exportar_amortizacion_excel(request, pk):
-    prestamo = Prestamo.objects.get(pk=pk)
-    pagos = prestamo.pagos.all()
-    socio = prestamo.socio
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Amortización"
-
-    # 🔹 Información del solicitante
-    ws.append(["Solicitante:", f"{socio.nombre} {socio.apellido}"])
-    ws.append(["Fecha del Aprobación:", prestamo.fecha_aprobacion.strftime('%d/%m/%Y') if prestamo.fecha_aprobacion else ""])
-    ws.append(["Plazo (meses):", prestamo.plazo])
-    ws.append(["Monto Aprobado:", float(prestamo.cantidad_aprobada)])
-    ws.append(["Interés (%):", float(prestamo.interes)])
-    ws.append([])  # Fila vacía
-     # 🔹 Cabecera de tabla
-    headers = ['#', 'Saldo', 'Capital', 'Interés', 'Cuota', 'Fecha a Pagar', 'Estado']
-    ws.append(headers)
-
-    for pago in pagos:
-        ws.append([
-            pago.cuota_pago,
-            pago.saldo_pago,
-            pago.capital_pago,
-            pago.interes_pago,
-            pago.valor_cuota_pago,
-            pago.fecha_a_pagar.strftime('%d/%m/%Y'),
-            'Pagado' if pago.estado else 'Pendiente'
-        ])
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="amortizacion_prestamo_{pk}.xlsx"'
-    wb.save(response)
-    return response
+    prestamo = get_object_or_404(Prestamo, pk=pk)
+    return _exportar(request, 'amortizacion_excel', f"amortizacion_prestamo_{pk}.xlsx", prestamo)
 
+@login_required
 def exportar_socios_pdf(request):
-    socios = Socio.objects.filter(activo=True).order_by('apellido')
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="listado_socios.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Título
-    fecha_actual = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    elements.append(Paragraph("Listado de Socios Activos", styles['Title']))
-    elements.append(Paragraph(f"📅 Generado el: {fecha_actual}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Cabecera de tabla
-    datos = [['#', 'Cédula', 'Nombres', 'Apellidos', 'Teléfono', 'Email', 'Fecha de Ingreso']]
-
-    # Filas de socios
-    for i, socio in enumerate(socios, start=1):
-        datos.append([
-            i,
-            socio.cedula,
-            socio.nombre,
-            socio.apellido,
-            socio.telefono or '',
-            socio.email or '',
-            socio.fecha_ingreso.strftime('%d/%m/%Y')
-        ])
-
-    tabla = Table(datos, repeatRows=1)
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(tabla)
-     # Firma
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("__________________________", styles['Normal']))
-    elements.append(Paragraph("Firma del Secretario(a)", styles['Normal']))
-    doc.build(elements)
-    return response
+    return _exportar(request, 'socios_pdf', "listado_socios.pdf")
 
+@login_required
 def exportar_socios_excel(request):
-    socios = Socio.objects.filter(activo=True).order_by('apellido')
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Socios Activos"
-
-    # Cabecera
-    headers = ['#', 'Cédula', 'Nombres', 'Apellidos', 'Teléfono', 'Email', 'Fecha de Ingreso']
-    ws.append(headers)
-
-    # Estilo para la cabecera
-    for col in range(1, len(headers) + 1):
-        ws.cell(row=1, column=col).font = Font(bold=True)
-
-    # Contenido
-    for i, socio in enumerate(socios, start=1):
-        ws.append([
-            i,
-            socio.cedula,
-            socio.nombre,
-            socio.apellido,
-            socio.telefono or '',
-            socio.email or '',
-            socio.fecha_ingreso.strftime('%d/%m/%Y')
-        ])
-
-    # Generar archivo
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="listado_socios.xlsx"'
-    wb.save(response)
-    return response
+    return _exportar(request, 'socios_excel', "listado_socios.xlsx")
 
  # exportar listado de prestamos
+@login_required
 def exportar_prestamos_pdf(request):
-    prestamos = Prestamo.objects.all().order_by('-fecha_aprobacion')
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="prestamos_lista.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    fecha_actual = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    elements.append(Paragraph("📄 Lista de Préstamos", styles['Title']))
-    elements.append(Paragraph(f"📅 Generado el: {fecha_actual}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    datos = [[
-        'Fecha Aprob', 'Solicitante', 'Garante', 
-        'Solicitado', 'Aprobado', 'Plazo', 'Estado'
-    ]]
-
-    for p in prestamos:
-        datos.append([
-            p.fecha_aprobacion.strftime('%d/%m/%Y') if p.fecha_aprobacion else '',
-            f"{p.socio.nombre} {p.socio.apellido}",
-            f"{p.garante.nombre} {p.garante.apellido}" if p.garante else '---',
-            f"${p.cantidad_solicitada:,.2f}",
-            f"${p.cantidad_aprobada:,.2f}" if p.cantidad_aprobada else '$0.00',
-            f"{p.plazo} meses",
-            p.estado
-        ])
-
-    tabla = Table(datos, repeatRows=1)
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-    ]))
-
-    elements.append(tabla)
-     # Firma
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("__________________________", styles['Normal']))
-    elements.append(Paragraph("Firma del Tesorero", styles['Normal']))
-    doc.build(elements)
-    return response
+    return _exportar(request, 'prestamos_pdf', "prestamos_lista.pdf")
 
+@login_required
 def exportar_prestamos_excel(request):
-    prestamos = Prestamo.objects.all().order_by('-fecha_aprobacion')
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Préstamos"
-
-    headers = [
-        'Fecha Aprobación', 'Solicitante', 'Garante', 
-        'Cantidad Solicitada', 'Cantidad Aprobada', 'Plazo', 'Estado'
-    ]
-    ws.append(headers)
-
-    for col in range(1, len(headers) + 1):
-        ws.cell(row=1, column=col).font = Font(bold=True)
-
-    for p in prestamos:
-        ws.append([
-            p.fecha_aprobacion.strftime('%d/%m/%Y') if p.fecha_aprobacion else '',
-            f"{p.socio.nombre} {p.socio.apellido}",
-            f"{p.garante.nombre} {p.garante.apellido}" if p.garante else '',
-            float(p.cantidad_solicitada),
-            float(p.cantidad_aprobada or 0),
-            p.plazo,
-            p.estado
-        ])
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="prestamos_lista.xlsx"'
-    wb.save(response)
-    return response
+    return _exportar(request, 'prestamos_excel', "prestamos_lista.xlsx")
 
+@login_required
 def exportar_gastosadministrativos_pdf(request):
-    gastos = GastosAdministrativos.objects.order_by('fecha')
-    total_entrada = sum(g.entrada for g in gastos)
-    total_salida = sum(g.salida for g in gastos)
-    saldo_actual = total_entrada - total_salida
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="gastos_administrativos.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    # Título y fecha
-    fecha_actual = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    elements.append(Paragraph("📄 Reporte de Gastos Administrativos", styles['Title']))
-    elements.append(Paragraph(f"📅 Generado el: {fecha_actual}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Tabla de datos
-    data = [['Fecha', 'Descripción', 'Entrada', 'Salida']]
-    for g in gastos:
-        data.append([
-            g.fecha.strftime('%d/%m/%Y'),
-            g.descripcion,
-            f"${g.entrada:,.2f}",
-            f"${g.salida:,.2f}",
-        ])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-
-    # Totales
-    elements.append(Paragraph(f"<strong>Total Entradas:</strong> ${total_entrada:,.2f}", styles['Normal']))
-    elements.append(Paragraph(f"<strong>Total Salidas:</strong> ${total_salida:,.2f}", styles['Normal']))
-    elements.append(Paragraph(f"<strong>Saldo Actual:</strong> ${saldo_actual:,.2f}", styles['Normal']))
-    elements.append(Spacer(1, 36))
-
-    # Firma
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("__________________________", styles['Normal']))
-    elements.append(Paragraph("Firma del Tesorero", styles['Normal']))
-
-    doc.build(elements)
-    return response
+    return _exportar(request, 'gastos_pdf', "gastos_administrativos.pdf")
 
+@login_required
 def exportar_gastosadministrativos_excel(request):
-    gastos = GastosAdministrativos.objects.order_by('fecha')
-    total_entrada = sum(g.entrada for g in gastos)
-    total_salida = sum(g.salida for g in gastos)
-    saldo_actual = total_entrada - total_salida
+    return _exportar(request, 'gastos_excel', "gastos_administrativos.xlsx")
+
+def _tarea_del_usuario(request, pk):
+    filtros = {} if request.user.is_superuser else {'usuario': request.user}
+    return get_object_or_404(Tarea, pk=pk, **filtros)
+
+def _datos_tarea(tarea):
+    listo = tarea.estado == Tarea.TERMINADA and bool(tarea.resultado)
+    return {
+        'id': tarea.pk,
+        'estado': tarea.estado,
+        'finalizada': tarea.finalizada,
+        'intentos': tarea.intentos,
+        'descarga': reverse('descargar_tarea', args=[tarea.pk]) if listo else None,
+        'informe': bool(tarea.informe),
+        'nombre': tarea.nombre_resultado,
+    }
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Gastos Administrativos"
-
-    headers = ['Fecha', 'Descripción', 'Entrada', 'Salida', 'Saldo']
-    ws.append(headers)
-
-    for col in range(1, len(headers) + 1):
-        ws.cell(row=1, column=col).font = Font(bold=True)
-
-    for g in gastos:
-        ws.append([
-            g.fecha.strftime('%d/%m/%Y'),
-            g.descripcion,
-            float(g.entrada),
-            float(g.salida),
-            float(g.saldo),
-        ])
-
-    # Totales al final
-    ws.append([])
-    ws.append(['', 'Total Entradas', float(total_entrada)])
-    ws.append(['', 'Total Salidas', float(total_salida)])
-    ws.append(['', 'Saldo Actual', float(saldo_actual)])
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="gastos_administrativos.xlsx"'
-    wb.save(response)
-    return response
+@login_required
+def estado_tarea(request, pk):
+    tarea = _tarea_del_usuario(request, pk)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(_datos_tarea(tarea))
+    return render(request, 'tareas/estado_tarea.html', {'tarea': tarea, 'datos': _datos_tarea(tarea)})
+
+@login_required
+def descargar_tarea(request, pk):
+    tarea = _tarea_del_usuario(request, pk)
+    if tarea.estado != Tarea.TERMINADA or not tarea.resultado:
+        return redirect('estado_tarea', pk=tarea.pk)
+    reporte = tarea.parametros.get('reporte')
+    content_type = REPORTES[reporte][1] if reporte in REPORTES else None
+    if tarea.parametros.get('version'):
+        return respuesta_guardada(request, tarea.resultado.name, tarea.nombre_resultado,
+                                  content_type, tarea.parametros['version'])
+    return FileResponse(tarea.resultado.open('rb'), as_attachment=True,
+                        filename=tarea.nombre_resultado, content_type=content_type)
 
 #dashboard
 @login_required
 def dashboard(request):
-    socios_activos = Socio.objects.filter(activo=True).count()
+    # Solo la estructura de la página: las cifras y los gráficos los pide el navegador en
+    # paralelo a los endpoints de analítica, que responden 304 si los datos no cambiaron
+    prestamos_recientes = Prestamo.objects.select_related('socio').order_by('-id')[:5]
 
-    total_aportes = Movimiento.objects.filter(entrada__gt=0).aggregate(total=Sum('entrada'))['total'] or 0
-    total_retiros = Movimiento.objects.filter(salida__gt=0).aggregate(total=Sum('salida'))['total'] or 0
-    saldo_total = total_aportes - total_retiros
-
-    # Totales por estado
-    estados_deseados = ['Aprobado', 'Rechazado', 'Terminado']
-    prestamos_estado_montos = Prestamo.objects.filter(estado__in=estados_deseados).values('estado').annotate(
-        cantidad=Count('id'),
-        monto=Sum('cantidad_solicitada')
-    )
+    return render(request, 'dashboard.html', {
+        'corte': obtener_corte(),
+        'tramos_cartera': [(campo, etiqueta) for campo, etiqueta, _, _ in TRAMOS],
+        'series': dict((nombre, reverse('analitica', args=[nombre])) for nombre in analitica.SERIES),
+        'prestamos_recientes': prestamos_recientes,
+    })
 
-    # Para gráfico pastel
-    total_aprobados = Prestamo.objects.filter(estado='Aprobado').aggregate(total=Sum('cantidad_solicitada'))['total'] or 0
-    cartera_vencida = PagoPrestamo.objects.filter(estado=False).aggregate(
-        total=Sum('saldo_pago'))['total'] or 0
 
-    movimientos_por_mes = Movimiento.objects.annotate(
-        mes=TruncMonth('fecha_movimiento')
-    ).values('mes').annotate(
-        total_entradas=Sum('entrada'),
-        total_salidas=Sum('salida'),
-    ).order_by('mes')
+@login_required
+def analitica_serie(request, serie):
+    """Datos de un gráfico del panel en JSON; acepta ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD."""
+    if serie not in analitica.SERIES:
+        raise Http404("Serie desconocida")
+    try:
+        desde, hasta = analitica.rango_de_fechas(request.GET)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return analitica.respuesta_serie(request, serie, desde, hasta)
 
-    prestamos_recientes = Prestamo.objects.order_by('-id')[:5]
 
-    return render(request, 'dashboard.html', {
-        'socios_activos': socios_activos,
-        'total_aportes': total_aportes,
-        'total_retiros': total_retiros,
-        'saldo_total': saldo_total,
-        'prestamos_estado_montos': prestamos_estado_montos,
-        'total_aprobados': total_aprobados,
-        'cartera_vencida': cartera_vencida,
-        'movimientos_por_mes': movimientos_por_mes,
-        'prestamos_recientes': prestamos_recientes,
-    })           
+@login_required
+@role_required(allowed_roles=['Presidente', 'Tesorero'])
+def cartera_vencida(request):
+    """Detalle del corte de cartera vencida: totales por tramo, por socio y por préstamo."""
+    corte = obtener_corte()
+    tramo = request.GET.get('tramo')
+    if tramo not in CAMPOS_TRAMO:
+        tramo = None
+    return render(request, 'prestamo/cartera_vencida.html', {
+        'corte': corte,
+        'tramos': tramos_del_corte(corte),
+        'tramo': tramo,
+        'socios': cartera_por_socio(corte, tramo),
+        'prestamos': detalle_del_corte(corte, tramo),
+    })
 
 
+@escritura_inmediata
 def configuracion(request):
-    config = Configuracion.objects.first()
+    config = obtener_configuracion()
+    # El formulario trabaja sobre una copia para no alterar la configuración en caché
+    instancia = copy(config) if config else None
     if request.method == 'POST':
-        form = ConfiguracionForm(request.POST, request.FILES, instance=config)
+        form = ConfiguracionForm(request.POST, request.FILES, instance=instancia)
         if form.is_valid():
             form.save()
             return redirect('dashboard')
     else:
-        form = ConfiguracionForm(instance=config)
+        form = ConfiguracionForm(instance=instancia)
     return render(request, 'configuracion/configuracion.html', {'form': form, 'configuracion': config})
 
 
 #Gastos administrativos
+@escritura_inmediata
 def gastos_administrativos(request, action=None, pk=None):
     if action == 'agregar':
         form = GastoAdministrativoForm(request.POST or None)
         if request.method == 'POST' and form.is_valid():
-            nuevo = form.save(commit=False)
-            ultimo = GastosAdministrativos.objects.order_by('-fecha').first()
-            saldo_anterior = ultimo.saldo if ultimo else Decimal('0.00')
-            nuevo.saldo = saldo_anterior + nuevo.entrada - nuevo.salida
-            nuevo.save()
+            registrar_gasto(form.save(commit=False))
             return redirect('gastos_admin')
         return render(request, 'gastos/form_gasto_admin.html', {
             'form': form,
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
    ]
 
 MIDDLEWARE = [
+    # Primero, para que el tiempo total de la petición incluya al resto
+    'app_cajaAhorros.middleware.MedicionPeticionesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,13 +56,16 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
+    # Después de la autenticación: ?perfilar=1 solo vale para usuarios del staff
+    'app_cajaAhorros.middleware.PerfiladoMiddleware',
 ]
 
 ROOT_URLCONF = 'cajaAhorros.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de plantillas de cada petición
+        'BACKEND': 'app_cajaAhorros.plantillas.PlantillasMedidas',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,6 +74,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'app_cajaAhorros.context_processors.configuracion',
+                'app_cajaAhorros.context_processors.roles',
 
             ],
         },
@@ -85,9 +91,74 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Cada hilo del servidor reutiliza su conexión entre peticiones (y los PRAGMA ya aplicados)
+        'CONN_MAX_AGE': 300,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Segundos que una conexión espera el candado de escritura antes de fallar
+            # con "database is locked"
+            'timeout': 20,
+            # BEGIN IMMEDIATE: la transacción toma el candado de escritura al empezar y espera
+            # su turno, en lugar de fallar al pasar de lectura a escritura a mitad de camino
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Base de pruebas en archivo: las pruebas de concurrencia abren varias conexiones
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# PRAGMA que se aplican a cada conexión nueva de SQLite (ver signals.configurar_sqlite).
+# Solo ajustes de la conexión: el modo WAL (los lectores no bloquean al que escribe) queda
+# guardado en el archivo de la base, así que se activa una sola vez en el servidor con
+# `python manage.py activar_wal` y no desde aquí, para que cualquier comando no convierta la base.
+SQLITE_PRAGMAS = {
+    # Con WAL, NORMAL solo sincroniza el disco en los checkpoints y sigue siendo seguro ante caídas del proceso
+    'synchronous': 'NORMAL',
+    # Caché de páginas de 64 MB por conexión (negativo = KiB)
+    'cache_size': -64000,
+    # Lee la base mapeada en memoria, hasta 256 MB
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'compartida' vive en disco para que todos los procesos del servidor vean las mismas
+# versiones (por ejemplo, al invalidar la configuración de la caja).
+# Guarda una marca de versión por tabla, por socio, préstamo y usuario que cambiaron (ver
+# versiones.marcar_cambio y los roles en decorators.py). Al pasar de MAX_ENTRIES Django borra
+# un tercio de las entradas al azar y todo lo que dependía de ellas se recalcula: el límite
+# por defecto (300) se llena con pocos socios, así que se deja muy por encima de lo esperable.
+# La carpeta es del proyecto (no la temporal del sistema, que comparten todas las copias del
+# servidor): otra instancia o las pruebas de otra copia no pueden coincidir con sus marcas.
+# Al restaurar la base de datos de un respaldo se borra esta carpeta para invalidarlo todo.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'compartida': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+}
+CACHE_COMPARTIDA = 'compartida'
+
+
+# Tareas en segundo plano (app_cajaAhorros/tareas.py)
+# Las ejecuta el comando `python manage.py procesar_tareas`. Con True se ejecutan al
+# encolarlas, dentro de la misma petición (útil en desarrollo cuando no hay worker).
+
+TAREAS_EN_LINEA = False
+
+
+# El registro de aportes del mes envía dos campos por socio (marca y monto)
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +203,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
+
+# Archivos subidos (fotos, logos, comprobantes). En DEBUG los sirve urls.py desde MEDIA_URL.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Resultados de tareas, reportes en caché y perfiles (ver almacenamiento.AlmacenPrivado):
+# fuera de MEDIA_ROOT para que ninguna ruta pública los sirva
+ARCHIVOS_PRIVADOS = BASE_DIR / 'privado'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -149,4 +229,51 @@ ACCOUNT_SESSION_REMEMBER = True
 ACCOUNT_UNIQUE_EMAIL = True
 ACCOUNT_ALLOW_REGISTRATION = False
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-SITE_ID = 1
\ No newline at end of file
+SITE_ID = 1
+
+
+# Medición de peticiones (app_cajaAhorros/middleware.py)
+# Las peticiones que tardan más que esto se escriben, con sus consultas más costosas,
+# en logs/peticiones_lentas.log (se rota al llegar a 5 MB y se guardan 5 archivos).
+
+PETICIONES_LENTAS_MS = 500
+
+# La carpeta se crea con el primer registro (ver app_cajaAhorros/registro.py)
+LOGS_DIR = BASE_DIR / 'logs'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'fecha': {'format': '{asctime} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'peticiones_lentas': {
+            'class': 'app_cajaAhorros.registro.ArchivoRotativo',
+            'filename': LOGS_DIR / 'peticiones_lentas.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'fecha',
+        },
+    },
+    'loggers': {
+        'app_cajaAhorros.peticiones_lentas': {
+            'handlers': ['peticiones_lentas'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Perfilado bajo demanda (app_cajaAhorros/perfilado.py)
+# Un usuario del staff perfila una petición agregando ?perfilar=1 a la URL (las tareas que
+# encole se perfilan también). Además se perfila al azar esta fracción de peticiones y tareas;
+# PERFILADO_SOLO limita el muestreo a esas vistas o tipos de tarea. Los perfiles se ven en el
+# admin y se conservan los últimos PERFILADO_MAXIMO.
+
+PERFILADO_MUESTREO = 0.0
+PERFILADO_SOLO = []
+PERFILADO_MAXIMO = 200
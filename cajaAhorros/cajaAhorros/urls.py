@@ -27,11 +27,15 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('socios/', views.socio_list, name='socio_list'),
     path('socios/crear/', views.crear_socio, name='crear_socio'),
+    path('socios/importar/', views.importar_socios, name='importar_socios'),
     path('mi_perfil/', views.mi_perfil, name='mi_perfil'),
+    path('mi_perfil/movimientos/', views.mis_movimientos, name='mis_movimientos'),
     path('socios/<int:pk>/editar/', views.editar_socio, name='editar_socio'),
     path('socios/eliminar/<int:pk>/', views.eliminar_socio, name='eliminar_socio'),
     path('socio/<int:socio_id>/aportaciones/', views.ver_aportaciones_socio, name='ver_aportaciones_socio'),
+    path('socio/<int:socio_id>/aportaciones/movimientos/', views.movimientos_socio, name='movimientos_socio'),
     path('socio/<int:socio_id>/agregar-aporte/', views.agregar_aporte, name='agregar_aporte'),
+    path('aportes/mensuales/', views.registrar_aportes_mensuales, name='registrar_aportes_mensuales'),
     path('aportes/editar/<int:aporte_id>/', views.editar_aporte, name='editar_aporte'),
     path('aportes/eliminar/<int:aporte_id>/', views.eliminar_aporte, name='eliminar_aporte'),
     path('cargos/agregar/', views.agregar_cargo, name='agregar_cargo'),
@@ -40,16 +44,18 @@ urlpatterns = [
     path('socios/<int:pk>/', views.detalle_socio, name='detalle_socio'),
     path('accounts/', include('allauth.urls')),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('api/v1/analitica/<str:serie>/', views.analitica_serie, name='analitica'),
     path('accounts/profile/', views.dashboard, name='profile'),
     path('prestamos/', views.prestamo_list, name='prestamo_list'),
     path('prestamos/nuevo/', views.crear_o_editar_prestamo, name='prestamo_create'),
     path('prestamos/editar/<int:pk>/', views.crear_o_editar_prestamo, name='prestamo_edit'),
     path('prestamos/aprobar/<int:pk>/', views.aprobar_prestamo, name='aprobar_prestamo'),
     path('prestamos/<int:pk>/rechazar/', views.rechazar_prestamo, name='prestamo_rechazado'),
+    path('prestamos/cartera-vencida/', views.cartera_vencida, name='cartera_vencida'),
     path('pagos/prestamo/<int:prestamo_id>/', views.pagos_prestamo, name='pagos_prestamo'),
     path('pagos/registrar/<int:pago_id>/', views.registrar_pago, name='registrar_pago'),
     path('prestamo/<int:pk>/exportar-pdf/', views.exportar_amortizacion_pdf, name='exportar_amortizacion_pdf'),
-    path('prestamo/<int:pk>/exportar-pdf/', views.exportar_amortizacion_excel, name='exportar_amortizacion_excel'),
+    path('prestamo/<int:pk>/exportar-excel/', views.exportar_amortizacion_excel, name='exportar_amortizacion_excel'),
     path('socios/exportar/pdf/', views.exportar_socios_pdf, name='exportar_socios_pdf'),
     path('socios/exportar/excel/', views.exportar_socios_excel, name='exportar_socios_excel'),
     path('prestamos/exportar/pdf/', views.exportar_prestamos_pdf, name='exportar_prestamos_pdf'),
@@ -62,6 +68,9 @@ urlpatterns = [
     path('gastos/editar/<int:pk>/', views.gastos_administrativos, {'action': 'editar'}, name='gasto_editar'),
     path('gastos/<str:action>/<int:pk>/', views.gastos_administrativos, name='gastos_administrativos_action_pk'),
     path('aportaciones/<int:socio_id>/exportar/pdf/', views.exportar_aportaciones_pdf, name='exportar_aportaciones_pdf'),
+    path('tareas/<int:pk>/', views.estado_tarea, name='estado_tarea'),
+    path('tareas/<int:pk>/descargar/', views.descargar_tarea, name='descargar_tarea'),
 ]
 
+# Solo MEDIA_ROOT (archivos subidos); los archivos privados se descargan por sus vistas
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file